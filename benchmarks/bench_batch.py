@@ -0,0 +1,58 @@
+"""
+批量取出的基准测试：不同线程数量下，``batch_size`` 为1（逐个取出）与批量取出时每秒执行的协程步数
+
+在仓库根目录运行： python -m benchmarks.bench_batch [--tasks 200] [--steps 100] [--threads 1,2,4,8] [--batch 16]
+"""
+import argparse
+import time
+
+from consign import WorkArea, AsyncWorker, coroutine, wait
+
+
+@coroutine
+def step_run(step_num: int):
+    for _ in range(step_num):
+        yield
+    return step_num
+
+
+def measure(thread_num: int, batch_size: int, task_num: int, step_num: int) -> float:
+    """
+    在独立的 ``WorkArea`` 中以 ``thread_num`` 个线程执行 ``task_num`` 个协程
+
+    :return: 每秒执行的步数
+    """
+    with WorkArea("bench_batch_{thread_num}_{batch_size}".format(
+            thread_num=thread_num, batch_size=batch_size)) as work_area:
+        async_worker = AsyncWorker(work_area=work_area, batch_size=batch_size)
+        # 先提交再启动线程，计时只包含执行
+        tasks = [step_run(step_num) for _ in range(task_num)]
+        start = time.perf_counter()
+        async_worker.init_thread(thread_num)
+        for task in tasks:
+            wait(task)
+        elapsed = time.perf_counter() - start
+        async_worker.stop(join=True, time_out=1)
+
+    # 每个协程的步数：初始化一次、yield step_num 次
+    return task_num * (step_num + 1) / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--tasks", type=int, default=200)
+    parser.add_argument("--steps", type=int, default=100)
+    parser.add_argument("--threads", default="1,2,4,8")
+    parser.add_argument("--batch", type=int, default=16)
+    args = parser.parse_args()
+
+    print("{:>8} {:>16} {:>16} {:>8}".format("threads", "batch=1 steps/s",
+                                             "batch={} steps/s".format(args.batch), "ratio"))
+    for thread_num in (int(i) for i in args.threads.split(",")):
+        before = measure(thread_num, 1, args.tasks, args.steps)
+        after = measure(thread_num, args.batch, args.tasks, args.steps)
+        print("{:>8} {:>16.0f} {:>16.0f} {:>8.2f}".format(thread_num, before, after, after / before))
+
+
+if __name__ == "__main__":
+    main()
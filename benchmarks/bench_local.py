@@ -0,0 +1,51 @@
+"""
+单线程区域的基准测试：只有一个 ``CoroutineWorker().loop_work()`` 时，默认区域与 ``single_thread`` 区域每秒执行的协程步数
+
+在仓库根目录运行： python -m benchmarks.bench_local [--tasks 100] [--steps 1000] [--repeat 3]
+"""
+import argparse
+import time
+
+from consign import WorkArea, CoroutineWorker, coroutine
+
+
+@coroutine
+def step_run(step_num: int):
+    for _ in range(step_num):
+        yield
+    return step_num
+
+
+def measure(single_thread: bool, task_num: int, step_num: int) -> float:
+    """
+    在独立的 ``WorkArea`` 中以当前线程执行 ``task_num`` 个协程
+
+    :return: 每秒执行的步数
+    """
+    name = "bench_local_{single_thread}".format(single_thread=single_thread)
+    with WorkArea(name, single_thread=single_thread) as work_area:
+        for _ in range(task_num):
+            step_run(step_num)
+        start = time.perf_counter()
+        CoroutineWorker(work_area=work_area).loop_work(forever=False)
+        elapsed = time.perf_counter() - start
+
+    # 每个协程的步数：初始化一次、yield step_num 次
+    return task_num * (step_num + 1) / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--tasks", type=int, default=100)
+    parser.add_argument("--steps", type=int, default=1000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    before = max(measure(False, args.tasks, args.steps) for _ in range(args.repeat))
+    after = max(measure(True, args.tasks, args.steps) for _ in range(args.repeat))
+    print("{:>16} {:>16} {:>8}".format("default steps/s", "single steps/s", "ratio"))
+    print("{:>16.0f} {:>16.0f} {:>8.2f}".format(before, after, after / before))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,53 @@
+"""
+内存的基准测试：每个等待中（已提交未执行）的 ``Task`` 与每个已完成的 ``Task`` 占用的字节数
+
+等待中的字节数包含队列中的内容与协程的生成器，已完成的字节数只包含调用者持有的 ``Task``
+
+在仓库根目录运行： python -m benchmarks.bench_memory [--tasks 100000]
+"""
+import argparse
+import gc
+import tracemalloc
+
+from consign import WorkArea, CoroutineWorker, coroutine
+
+
+@coroutine
+def step_run(step_num: int):
+    for _ in range(step_num):
+        yield
+    return step_num
+
+
+def measure(task_num: int):
+    """
+    :return: (每个等待中的Task的字节数, 每个已完成的Task的字节数)
+    """
+    with WorkArea("bench_memory") as work_area:
+        gc.collect()
+        tracemalloc.start()
+        start = tracemalloc.get_traced_memory()[0]
+        tasks = [step_run(1) for _ in range(task_num)]
+        pending = tracemalloc.get_traced_memory()[0] - start
+
+        CoroutineWorker(work_area=work_area).loop_work(forever=False)
+        gc.collect()
+        completed = tracemalloc.get_traced_memory()[0] - start
+        tracemalloc.stop()
+        assert all(task.value == 1 for task in tasks)
+
+    return pending / task_num, completed / task_num
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--tasks", type=int, default=100000)
+    args = parser.parse_args()
+
+    pending, completed = measure(args.tasks)
+    print("{:>16} {:>16}".format("pending B/task", "completed B/task"))
+    print("{:>16.0f} {:>16.0f}".format(pending, completed))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+"""
+单步调度的微基准测试：单线程 ``CoroutineWorker`` 在不同yield的内容下每秒执行的协程步数
+
+    1. plain：yield 普通的值（ yield / yield ... ），最常见的情况
+
+    2. callable：yield 无参的可调用对象，由 ``Worker`` 调用
+
+    3. task：yield 另一个协程的 ``Task``
+
+每一种同时测量单步执行期间临时分配的字节数（ ``tracemalloc`` 的峰值，中位数）：
+
+    plain 只剩下 ``RunQueue`` 的锁在 ``with`` 退出时的少量分配，调度本身不再创建对象
+
+    callable 与 task 还包括被调用的对象、子协程的 ``Task`` 自身的分配
+
+``BASELINE`` 是改为直接以 ``Task`` 作为队列内容之前（每一步创建tuple、 ``CheckChainReaction`` 与 ``AutoReceipts`` ）
+在同一台机器上运行此脚本的结果，输出时一并列出，便于比较
+
+在仓库根目录运行： python -m benchmarks.bench_step [--tasks 100] [--steps 1000] [--repeat 3]
+"""
+import argparse
+import statistics
+import time
+import tracemalloc
+
+from consign import WorkArea, CoroutineWorker, coroutine
+
+
+# 旧的调度方式的结果：yield的内容 -> (steps/s, 单步临时分配的字节数)
+BASELINE = {
+    "plain": (214538, 888),
+    "callable": (211220, 888),
+    "task": (327368, 896),
+}
+
+
+def nothing():
+    return None
+
+
+@coroutine
+def plain_run(step_num: int):
+    for _ in range(step_num):
+        yield ...
+    return step_num
+
+
+@coroutine
+def callable_run(step_num: int):
+    for _ in range(step_num):
+        yield nothing
+    return step_num
+
+
+@coroutine
+def task_run(step_num: int):
+    for _ in range(step_num):
+        yield plain_run(0)
+    return step_num
+
+
+def measure(func, task_num: int, step_num: int) -> float:
+    """
+    在独立的 ``WorkArea`` 中以当前线程执行 ``task_num`` 个协程
+
+    :return: 每秒执行的步数，包括yield出的 ``Task`` 自身的步数
+    """
+    with WorkArea("bench_step_{name}".format(name=func.__name__)) as work_area:
+        tasks = [func(step_num) for _ in range(task_num)]
+        start = time.perf_counter()
+        CoroutineWorker(work_area=work_area).loop_work(forever=False)
+        elapsed = time.perf_counter() - start
+        assert all(task.value == step_num for task in tasks)
+
+    # 每个协程的步数：初始化一次、yield step_num 次，task_run 的每个子协程还有初始化与完成两步
+    step_total = task_num * (step_num + 1) * (3 if func is task_run else 1)
+    return step_total / elapsed
+
+
+def transient_bytes(func, step_num: int, sample_num: int = 1000) -> float:
+    """
+    以 ``work_once`` 逐步执行一个协程，测量每一步期间临时分配的最大字节数
+
+    :return: 中位数，单步执行完毕后被释放的对象同样计算在内
+    """
+    with WorkArea("bench_step_bytes_{name}".format(name=func.__name__)) as work_area:
+        task = func(step_num)
+        worker = CoroutineWorker(work_area=work_area)
+        for _ in range(10):
+            # 跳过初始化
+            worker.work_once(0)
+        samples = []
+        tracemalloc.start()
+        try:
+            for _ in range(sample_num):
+                start, _ = tracemalloc.get_traced_memory()
+                tracemalloc.reset_peak()
+                worker.work_once(0)
+                samples.append(tracemalloc.get_traced_memory()[1] - start)
+        finally:
+            tracemalloc.stop()
+        worker.loop_work(forever=False)
+        assert task.value == step_num
+    return statistics.median(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--tasks", type=int, default=100)
+    parser.add_argument("--steps", type=int, default=1000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    print("{:>10} {:>12} {:>12} {:>8} {:>12} {:>12}".format(
+        "yield", "steps/s", "baseline", "speedup", "bytes/step", "baseline"))
+    for func in (plain_run, callable_run, task_run):
+        name = func.__name__[:-4]
+        steps = max(measure(func, args.tasks, args.steps) for _ in range(args.repeat))
+        base_steps, base_bytes = BASELINE[name]
+        print("{:>10} {:>12.0f} {:>12} {:>7.2f}x {:>12.0f} {:>12}".format(
+            name, steps, base_steps, steps / base_steps, transient_bytes(func, max(args.steps, 2000)), base_bytes))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,259 @@
+"""
+consign调度原语的基准测试集，结果以JSON输出，并且可以比较两次运行的结果
+
+    1. steps_per_sec：单线程 ``CoroutineWorker.loop_work`` 每秒执行的协程步数
+
+    2. task_create_us：每次调用 ``coroutine`` 修饰的函数（创建并提交 ``Task`` ）的耗时
+
+    3. wait_latency_us：一个空协程的 ``wait`` 耗时（中位数与p99）
+
+    4. asleep_late_ms：大量协程繁忙时 ``asleep`` 的唤醒延迟（平均与p99）
+
+    5. chain_reaction_us_per_level：每一层 ``chain_reaction`` 嵌套的耗时
+
+    6. async_worker_steps_per_sec_N：N个线程的 ``AsyncWorker`` 每秒执行的协程步数
+
+    7. pending_task_bytes / completed_task_bytes：每个等待中、已完成的 ``Task`` 占用的字节数
+
+在仓库根目录运行：
+
+    python -m benchmarks.suite --output before.json
+
+    python -m benchmarks.suite --output after.json
+
+    python -m benchmarks.suite --compare before.json after.json
+"""
+import argparse
+import json
+import platform
+import statistics
+import sys
+import time
+
+import consign
+from consign import WorkArea, CoroutineWorker, coroutine, chain_reaction, asleep, wait
+
+from . import bench_local, bench_memory, bench_stealing
+
+
+def metric(value, unit, better):
+    """
+    :param value: 测量值
+    :param str unit: 单位
+    :param str better: "higher" 或者 "lower"，表示数值越大越好还是越小越好
+    :return: 写入JSON的dict
+    """
+    return {"value": value, "unit": unit, "better": better}
+
+
+def percentile(values, percent):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * percent / 100))]
+
+
+@coroutine
+def empty_run():
+    yield
+    return None
+
+
+@coroutine
+def busy_run(done: list):
+    while not done:
+        yield
+
+
+@coroutine
+def sleep_late_run(secs: float, lates: list):
+    start = time.monotonic()
+    yield asleep(secs)
+    lates.append(time.monotonic() - start - secs)
+
+
+@coroutine
+def _chain_level(level: int):
+    if level > 0:
+        return (yield (lambda: chain_level(level - 1))) + 1
+    yield
+    return 0
+
+
+chain_level = chain_reaction(_chain_level)
+
+
+@coroutine
+def chain_root(level: int):
+    return (yield (lambda: chain_level(level)))
+
+
+def bench_steps(scale):
+    return {"steps_per_sec": metric(bench_local.measure(False, 100, 1000 * scale), "steps/s", "higher")}
+
+
+def bench_task_create(scale):
+    num = 20000 * scale
+    with WorkArea("bench_suite_task_create") as work_area:
+        start = time.perf_counter()
+        for _ in range(num):
+            empty_run()
+        elapsed = time.perf_counter() - start
+        CoroutineWorker(work_area=work_area).loop_work(forever=False)
+    return {"task_create_us": metric(elapsed / num * 1e6, "us", "lower")}
+
+
+def bench_wait_latency(scale):
+    latencies = []
+    with WorkArea("bench_suite_wait"):
+        for _ in range(2000 * scale):
+            start = time.perf_counter()
+            wait(empty_run())
+            latencies.append(time.perf_counter() - start)
+    return {
+        "wait_latency_us_p50": metric(statistics.median(latencies) * 1e6, "us", "lower"),
+        "wait_latency_us_p99": metric(percentile(latencies, 99) * 1e6, "us", "lower"),
+    }
+
+
+def bench_asleep(scale):
+    done, lates = [], []
+    with WorkArea("bench_suite_asleep") as work_area:
+        for _ in range(100):
+            busy_run(done)
+        sleepers = [sleep_late_run(0.002 * (i % 10 + 1), lates) for i in range(50 * scale)]
+
+        @coroutine
+        def stop_busy():
+            # 所有sleeper唤醒后结束繁忙的协程
+            while len(lates) < len(sleepers):
+                yield
+            done.append(True)
+
+        stop_busy()
+        CoroutineWorker(work_area=work_area).loop_work(forever=False)
+    return {
+        "asleep_late_ms_mean": metric(statistics.mean(lates) * 1e3, "ms", "lower"),
+        "asleep_late_ms_p99": metric(percentile(lates, 99) * 1e3, "ms", "lower"),
+    }
+
+
+def bench_chain_reaction(scale):
+    depth, repeat = 50, 200 * scale
+
+    def measure(level):
+        with WorkArea("bench_suite_chain_{level}".format(level=level)) as work_area:
+            start = time.perf_counter()
+            tasks = [chain_root(level) for _ in range(repeat)]
+            CoroutineWorker(work_area=work_area).loop_work(forever=False)
+            elapsed = time.perf_counter() - start
+            assert all(task.value == level for task in tasks)
+        return elapsed / repeat
+
+    return {"chain_reaction_us_per_level": metric((measure(depth) - measure(0)) / depth * 1e6, "us", "lower")}
+
+
+def bench_async_worker(scale):
+    return {
+        "async_worker_steps_per_sec_{num}".format(num=thread_num): metric(
+            bench_stealing.measure(thread_num, "shared", 100, 100 * scale), "steps/s", "higher")
+        for thread_num in (1, 2, 4, 8)
+    }
+
+
+def bench_memory_per_task(scale):
+    pending, completed = bench_memory.measure(20000 * scale)
+    return {
+        "pending_task_bytes": metric(pending, "B", "lower"),
+        "completed_task_bytes": metric(completed, "B", "lower"),
+    }
+
+
+BENCHMARKS = {
+    "steps": bench_steps,
+    "task_create": bench_task_create,
+    "wait_latency": bench_wait_latency,
+    "asleep": bench_asleep,
+    "chain_reaction": bench_chain_reaction,
+    "async_worker": bench_async_worker,
+    "memory": bench_memory_per_task,
+}
+
+
+def run(names, scale):
+    """
+    运行基准测试
+
+    :param names: 需要运行的基准测试名，见 ``BENCHMARKS``
+    :param int scale: 规模倍数，越大越稳定，也越慢
+    :return: 可以写入JSON的dict
+    """
+    results = {}
+    for name in names:
+        print("running {name} ...".format(name=name), file=sys.stderr)
+        results.update(BENCHMARKS[name](scale))
+    return {
+        "meta": {
+            "consign": consign.__version__,
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "scale": scale,
+        },
+        "results": results,
+    }
+
+
+def compare(old, new, threshold):
+    """
+    比较两次运行的结果并打印表格
+
+    :param dict old: 旧的结果
+    :param dict new: 新的结果
+    :param float threshold: 变差超过此比例时视为退化
+    :return: 退化的指标名列表
+    """
+    regressions = []
+    print("{:<34} {:>14} {:>14} {:>9}".format("metric", "old", "new", "change"))
+    for name, new_metric in new["results"].items():
+        old_metric = old["results"].get(name, None)
+        if old_metric is None:
+            print("{:<34} {:>14} {:>14.2f}".format(name, "-", new_metric["value"]))
+            continue
+
+        old_value, new_value = old_metric["value"], new_metric["value"]
+        change = (new_value - old_value) / old_value if old_value else 0.0
+        # 统一为正数表示变好
+        improvement = change if new_metric["better"] == "higher" else -change
+        flag = ""
+        if improvement < -threshold:
+            flag = "REGRESSION"
+            regressions.append(name)
+        print("{:<34} {:>14.2f} {:>14.2f} {:>+8.1%} {}".format(name, old_value, new_value, change, flag))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--output", help="将结果写入此JSON文件，默认输出到标准输出")
+    parser.add_argument("--only", help="只运行这些基准测试，逗号分隔：{names}".format(names=",".join(BENCHMARKS)))
+    parser.add_argument("--scale", type=int, default=1, help="规模倍数，越大越稳定，也越慢")
+    parser.add_argument("--compare", nargs=2, metavar=("OLD", "NEW"), help="比较两次运行的JSON结果")
+    parser.add_argument("--threshold", type=float, default=0.1, help="比较时变差超过此比例视为退化，默认0.1")
+    args = parser.parse_args()
+
+    if args.compare:
+        with open(args.compare[0], encoding="utf-8") as old_file, open(args.compare[1], encoding="utf-8") as new_file:
+            regressions = compare(json.load(old_file), json.load(new_file), args.threshold)
+        # 存在退化时以非0退出，方便在CI中使用
+        sys.exit(1 if regressions else 0)
+
+    names = args.only.split(",") if args.only else list(BENCHMARKS)
+    result = json.dumps(run(names, args.scale), indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as output_file:
+            output_file.write(result)
+    else:
+        print(result)
+
+
+if __name__ == "__main__":
+    main()
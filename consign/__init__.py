@@ -10,3 +10,7 @@ from .workarea import *
 from .worker import *
 from .decorator import *
 from .utils import *
+from .utils import map
+
+# map与内置函数同名，只能通过 consign.map 使用，不会被 from consign import * 导入
+__all__ = [name for name in dir() if not name.startswith("_") and name != "map"]
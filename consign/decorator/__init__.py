@@ -1,3 +1,4 @@
 from .consigndecorator import coroutine
 from .chainreactiondecorator import chain_reaction
 from .repeatedcalldecorator import repeated_call
+from .cacheddecorator import cached_coroutine, CoroutineCache, CacheInfo
@@ -0,0 +1,212 @@
+from collections import OrderedDict, namedtuple
+from functools import wraps
+from multiprocessing.dummy import Lock
+from time import monotonic
+
+from .consigndecorator import coroutine
+from ..worker.suspend import AwaitDone
+
+
+#: ``cached_coroutine`` 的统计，与 ``functools.lru_cache`` 的 ``cache_info`` 类似
+CacheInfo = namedtuple("CacheInfo", ("hits", "misses", "coalesced", "maxsize", "currsize", "inflight"))
+
+# 参数中关键字参数的分隔，不会与任何参数相等
+_kwargs_mark = object()
+
+
+def make_key(args, kwargs):
+    """
+    默认的缓存键，参数需要是可哈希的
+
+    :param args: 位置参数
+    :param kwargs: 关键字参数
+    :return: 可哈希的键
+    """
+    if not kwargs:
+        return args
+    return args + (_kwargs_mark,) + tuple(sorted(kwargs.items()))
+
+
+class CoroutineCache(object):
+    """CoroutineCache是 ``cached_coroutine`` 的缓存，以参数为键保存 ``Task``
+
+    1. 执行中的 ``Task`` 保存在 ``inflight`` 中，相同参数的调用共用同一个 ``Task`` （single-flight）
+
+    2. 完成的 ``Task`` 保存在LRU中，最多 ``maxsize`` 个，超过 ``ttl`` 秒后失效
+
+    3. 被取消的 ``Task`` 不会被缓存，之后的调用会重新执行
+
+    :param int maxsize: 最多缓存的结果数量，为None时不限制，为0时只合并执行中的调用
+
+    :param float ttl: 结果的有效时长（秒），为None时一直有效
+    """
+
+    def __init__(self, maxsize=128, ttl=None):
+        assert maxsize is None or maxsize >= 0, "maxsize 必须大于等于0"
+        self.maxsize, self.ttl = maxsize, ttl
+        #: 键: (完成的 ``Task`` , 失效的时间)
+        self.results = OrderedDict()
+        #: 键: 执行中的 ``Task``
+        self.inflight = {}
+        self.hits = self.misses = self.coalesced = 0
+        self.mutex = Lock()
+
+    def lookup(self, key):
+        """
+        在持有mutex时调用
+
+        :return: 缓存或者执行中的 ``Task`` ，都没有时返回None
+        """
+        entry = self.results.get(key, None)
+        if entry is not None:
+            task, expires_at = entry
+            if expires_at is None or expires_at > monotonic():
+                self.results.move_to_end(key)
+                self.hits += 1
+                return task
+            del self.results[key]
+        task = self.inflight.get(key, None)
+        if task is not None:
+            self.coalesced += 1
+        return task
+
+    def call(self, key, create):
+        """
+        获取 ``key`` 对应的 ``Task`` ，没有时调用 ``create`` 创建
+
+        :param key: 缓存键
+        :param create: 无参的函数，返回新的 ``Task``
+        :return: ``Task``
+        """
+        with self.mutex:
+            task = self.lookup(key)
+            if task is not None:
+                return task
+
+        # 创建时可能阻塞（例如有界的WorkArea），所以不持有mutex，随后再次检查
+        task = create()
+        with self.mutex:
+            other = self.lookup(key)
+            if other is None:
+                self.misses += 1
+                self.inflight[key] = task
+        if other is not None:
+            # 同时有其他调用创建了相同的Task，放弃此次创建
+            task.cancel()
+            return other
+
+        task.add_done_callback(lambda done: self.task_done(key, done))
+        return task
+
+    def task_done(self, key, task):
+        with self.mutex:
+            if self.inflight.get(key, None) is task:
+                del self.inflight[key]
+            if task.cancelled() or self.maxsize == 0:
+                return
+            self.results[key] = (task, None if self.ttl is None else monotonic() + self.ttl)
+            self.results.move_to_end(key)
+            if self.maxsize is not None:
+                while len(self.results) > self.maxsize:
+                    self.results.popitem(last=False)
+
+    def info(self):
+        """
+        :return: ``CacheInfo``
+        """
+        with self.mutex:
+            return CacheInfo(self.hits, self.misses, self.coalesced, self.maxsize, len(self.results),
+                             len(self.inflight))
+
+    def clear(self):
+        """
+        清空缓存的结果与统计，执行中的 ``Task`` 不受影响，但之后相同参数的调用会重新执行
+
+        :return: None
+        """
+        with self.mutex:
+            self.results.clear()
+            self.inflight.clear()
+            self.hits = self.misses = self.coalesced = 0
+
+
+def cached_coroutine(debug: bool = False, *, maxsize: int = 128, ttl: float = None, key=None, **kwargs):
+    """cached_coroutine是带缓存的 ``coroutine`` ，以参数为键缓存 ``Task``
+
+    适用于幂等的查询，相同参数的调用：
+
+        1. 有执行中的 ``Task`` 时直接返回他，不会再次执行（single-flight）
+
+        2. 有缓存的结果时直接返回完成的 ``Task`` ，缓存以LRU淘汰，超过 ``ttl`` 秒后失效
+
+    .. code-block:: python
+
+        @cached_coroutine(maxsize=1024, ttl=60)
+        def get_user(user_id):
+            ...
+
+        @coroutine
+        def handler(user_id):
+            user = yield get_user.acall(user_id)
+
+    被修饰的函数与 ``coroutine`` 相同，调用时返回 ``Task`` ，此外拥有：
+
+        1. ``acall`` ：协程中挂起直到结果完成，协程以返回值作为yield的返回值
+
+        2. ``cache_info`` ：返回 ``CacheInfo`` ，包含命中、未命中、合并的次数
+
+        3. ``cache_clear`` ：清空缓存
+
+        4. ``cache`` ：``CoroutineCache``
+
+    .. warning::
+
+        相同参数的调用共用同一个 ``Task`` ，取消他会影响所有的调用者
+
+        共用的 ``Task`` 无法被 ``chain_reaction`` 链式等待，协程中请使用 ``acall`` ，他可以被任意多个协程同时等待
+
+    :param bool debug: 与 ``coroutine`` 相同，为True时不缓存
+
+    :param int maxsize: 最多缓存的结果数量，为None时不限制，为0时只合并执行中的调用
+
+    :param float ttl: 结果的有效时长（秒），为None时一直有效
+
+    :param key: 计算缓存键的函数，参数与被修饰函数相同，默认使用全部参数，此时参数需要是可哈希的
+
+    :param kwargs: 其余参数传递给 ``coroutine`` ，例如 ``timeout`` 、 ``max_concurrency``
+
+    :return:
+    """
+
+    def decorator(func):
+        coroutine_func = coroutine(debug, **kwargs)(func)
+        if debug is True:
+            return coroutine_func
+
+        cache = CoroutineCache(maxsize, ttl)
+
+        @wraps(func)
+        def cached_func(*args, **func_kwargs):
+            cache_key = make_key(args, func_kwargs) if key is None else key(*args, **func_kwargs)
+            return cache.call(cache_key, lambda: coroutine_func(*args, **func_kwargs))
+
+        def acall(*args, **func_kwargs):
+            """
+            :return: ``AwaitDone`` ，需要被协程yield，协程以返回值作为yield的返回值
+            """
+            return AwaitDone(cached_func(*args, **func_kwargs))
+
+        setattr(cached_func, "order", coroutine_func.order)
+        setattr(cached_func, "cache", cache)
+        setattr(cached_func, "acall", acall)
+        setattr(cached_func, "cache_info", cache.info)
+        setattr(cached_func, "cache_clear", cache.clear)
+        return cached_func
+
+    if callable(debug):
+        # 此时修饰器没有被call
+        # 所以debug是被修饰函数
+        func, debug = debug, False
+        return decorator(func)
+
+    return decorator
@@ -3,6 +3,43 @@ from functools import wraps
 from ..worker.iterationcontext import AutoReceipts
 
 
+def _chain_reaction_callback(order):
+    """
+    包装 ``order`` 的 ``complete_callback`` ，子协程完成时把返回值交给等待中的父协程
+
+    :param ConsignOrder order: 被 ``chain_reaction`` 修饰的委托函数的订单
+    :return: 新的 ``complete_callback``
+    """
+    order.old_complete_callback = old_complete_callback = order.complete_callback
+
+    def chain_reaction_callback(task):
+        parent_task = getattr(task, "_chain_reaction", None)
+
+        if parent_task is not None:
+            task._chain_reaction = None
+            if parent_task.work_area.tracer is not None:
+                parent_task.work_area.tracer.wake(parent_task, "chain_reaction")
+            if parent_task.cancel_exception is not None:
+                # 父协程已经被取消，下一步时在yield处抛出
+                task.submit(parent_task)
+            else:
+                with AutoReceipts(parent_task):
+                    # 回调在完成信号之前执行，此时状态还不是TaskDone，task.cancelled()总是False
+                    if task.cancel_exception is not None and task.value is task.cancel_exception:
+                        # 子协程被取消（例如超时），在父协程的yield处抛出
+                        parent_task.yield_value = parent_task.generator.throw(task.value)
+                    else:
+                        parent_task.yield_value = parent_task.generator.send(task.value)
+                    task.submit(parent_task)
+
+        if old_complete_callback is not None:
+            old_complete_callback(task)
+
+    # 标记所属的order，再次经过chain_reaction时据此跳过包装
+    chain_reaction_callback.chain_reaction_order = order
+    return chain_reaction_callback
+
+
 def chain_reaction(func):
     """chain_reaction使得嵌套协程函数可以以链式的方式运行.
 
@@ -93,25 +130,15 @@ def chain_reaction(func):
 
     order = getattr(func, "order", None)
     assert order, "{func_name} 不是被 coroutine 修饰的委托函数".format(func_name=func.__name__)
-    default = (None, None)
-    order.old_complete_callback = old_complete_callback = order.complete_callback
-
-    def chain_reaction_callback(task):
-        generator, receipts = getattr(task, "_chain_reaction", default)
-
-        if generator is not None and receipts is not None:
-            setattr(task, "_chain_reaction", default)
-            with AutoReceipts(receipts):
-                yield_value = generator.send(task.value)
-                task.submit((yield_value, generator, receipts))
-
-        if old_complete_callback is not None:
-            old_complete_callback(task)
+    # Task不再复制complete_callback，而是在完成时从order中获取，所以在修饰时就替换
+    # 没有被设置_chain_reaction的Task（例如直接调用原委托函数）只会调用原本的complete_callback
+    # 在调用处使用（yield chain_reaction(child)(i)）时每次都会经过这里，同一个order只包装一次
+    if getattr(order.complete_callback, "chain_reaction_order", None) is not order:
+        order.complete_callback = _chain_reaction_callback(order)
 
     @wraps(func)
     def decorator(*args, **kwargs):
         order.chain_reaction_flag = True
-        order.complete_callback = chain_reaction_callback
 
         return func(*args, **kwargs)
 
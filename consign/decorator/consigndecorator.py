@@ -5,9 +5,11 @@ import builtins
 
 from .consigntask import Task
 from .consignorder import ConsignOrder
+from ..worker.limit import Semaphore, TokenBucket, throttle, admit_new_task
 
 
-def coroutine(debug: bool = False, *, create_callback=None, complete_callback=None):
+def coroutine(debug: bool = False, *, create_callback=None, complete_callback=None, priority: int = 0,
+              timeout: float = None, max_concurrency=None, rate=None):
     """consign的核心，coroutine使得被修饰函数可以以协程的方式被执行
 
     他的作用很简单，就是包裹函数，无论是普通函数还是生成器函数，使得consign得以运行他们
@@ -100,31 +102,97 @@ def coroutine(debug: bool = False, *, create_callback=None, complete_callback=No
 
          ``complete_callback`` 需要一个参数用于接收此次运行时的  ``Task``
 
+    :param int priority:
+
+        协程的优先级，默认为0，数值越大越先执行，记录在 ``ConsignOrder`` 中
+
+        每次调用时可以通过 ``with_priority`` 覆盖，例如 ``my_function.with_priority(10)(*args, **kwargs)``
+
+        .. warning::
+
+            优先级只在优先级队列的 ``WorkArea`` 中生效，例如 ``WorkArea(name, prioritized=True)``
+
+            默认的 ``WorkArea`` 依旧先进先出
+
+    :param float timeout:
+
+        每次调用的超时时长（秒），默认为None表示不超时
+
+        超时后 ``Task`` 会被取消，协程在yield处收到 ``TimeoutError`` ，详情请查看 ``Task.cancel``
+
+    :param max_concurrency:
+
+        同时执行的最大数量，默认为None表示不限制，为int时创建 ``Semaphore`` ，也可以传入多个函数共用的 ``Semaphore``
+
+        超出数量的调用在第一步被挂起，直到有调用完成，挂起中的调用不在队列中，不会被轮询
+
+    :param rate:
+
+        每秒开始执行的最大数量，默认为None表示不限制，为数字时创建 ``TokenBucket`` ，也可以传入多个函数共用的 ``TokenBucket``
+
+        超出速率的调用在第一步被挂起到定时器堆中，直到令牌足够
+
+        .. code-block:: python
+
+            @coroutine(max_concurrency=10, rate=100)
+            def call_api(url):
+                ...
+
     :return:
     """
 
     def decorator(func):
         # 构造时创建
-        order = ConsignOrder(func, create_callback=create_callback, complete_callback=complete_callback)
+        # 每个被修饰的函数拥有自己的限制，传入的Semaphore与TokenBucket则被共用
+        semaphore = max_concurrency
+        if semaphore is not None and not isinstance(semaphore, Semaphore):
+            semaphore = Semaphore(semaphore)
+        token_bucket = rate
+        if token_bucket is not None and not isinstance(token_bucket, TokenBucket):
+            token_bucket = TokenBucket(token_bucket)
+        order = ConsignOrder(func, create_callback=create_callback, complete_callback=complete_callback,
+                             priority=priority, timeout=timeout, semaphore=semaphore, token_bucket=token_bucket)
 
         def _temp_yield_coroutine_func(*args, **kwargs):
             yield ...
             return func(*args, **kwargs)
 
-        # 用于是生成器函数的修饰，同时适配旧版本
-        def coroutine_func(*args, **kwargs):
-            order.run_area = builtins.DEFAULT_WORK_AREA.get()
-            task = Task(order=order)
+        def create_task(priority, args, kwargs):
+            order.run_area = work_area = builtins.DEFAULT_WORK_AREA.get()
+            if work_area.admission is not None:
+                # 有界的WorkArea，名额已满时按照overflow处理
+                admit_new_task(work_area)
+            task = Task(order=order, priority=priority)
 
             _yield_coroutine_func = func if isgeneratorfunction(func) else _temp_yield_coroutine_func
 
-            # generator, receipts = _yield_coroutine_func(*args, **kwargs), task.create_receipts()
-            # task.submit((None, generator, receipts))
-
-            task.submit((None, _yield_coroutine_func(*args, **kwargs), task.create_receipts()))
+            # Task本身就是队列中的内容，Worker通过task记录开始与结束
+            task.generator = _yield_coroutine_func(*args, **kwargs)
+            if order.semaphore is not None or order.token_bucket is not None:
+                # 先获取令牌与信号量再执行，获取不到时挂起而不是留在队列中
+                task.generator = throttle(task.generator, order.semaphore, order.token_bucket)
+            task.submit()
+            if order.timeout is not None:
+                task.cancel_after(order.timeout)
 
             return task
 
+        # 用于是生成器函数的修饰，同时适配旧版本
+        def coroutine_func(*args, **kwargs):
+            return create_task(None, args, kwargs)
+
+        def with_priority(priority: int):
+            """
+            以指定的优先级调用，覆盖 ``ConsignOrder`` 中的优先级，只对此次调用生效
+
+            :param int priority: 此次调用的优先级
+            :return: 与委托函数参数相同的函数，调用时返回 ``Task``
+            """
+            @wraps(func)
+            def priority_func(*args, **kwargs):
+                return create_task(priority, args, kwargs)
+            return priority_func
+
         def debug_func(*args, **kwargs):
             func_result = func(*args, **kwargs)
 
@@ -143,6 +211,7 @@ def coroutine(debug: bool = False, *, create_callback=None, complete_callback=No
             return wraps(func)(debug_func)
 
         setattr(coroutine_func, "order", order)
+        setattr(coroutine_func, "with_priority", with_priority)
 
         return wraps(func)(coroutine_func)  # 考虑将if debug 放到这里来
 
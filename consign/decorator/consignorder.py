@@ -2,7 +2,12 @@ import builtins
 
 
 class ConsignOrder(object):
-    def __init__(self, consignor_func, create_callback=None, complete_callback=None):
+    __slots__ = ("consignor_func", "complete_callback", "create_callback", "create_area", "run_area",
+                 "chain_reaction_flag", "old_complete_callback", "priority", "timeout",
+                 "semaphore", "token_bucket")
+
+    def __init__(self, consignor_func, create_callback=None, complete_callback=None, priority=0, timeout=None,
+                 semaphore=None, token_bucket=None):
         """
         协程订单类型
         他的作用是记录协程的部分信息，他在修饰器创建时就被定义（而非运行调用时）
@@ -19,12 +24,24 @@ class ConsignOrder(object):
             1.必须有一个参数位
                 这个参数位用于传入清单本身（self)
         当这个函数被调用时，说明清单已经更新并且协程已经结束
+
+        :param priority: 默认的优先级，数值越大越先执行，每次调用时可以被覆盖
+        :param timeout: 每次调用的超时时长（秒），超时后 ``Task`` 以 ``TimeoutError`` 被取消，为None时不超时
+        :param semaphore: 限制同时执行的数量的 ``Semaphore`` ，为None时不限制
+        :param token_bucket: 限制每秒开始执行的数量的 ``TokenBucket`` ，为None时不限制
         """
         self.consignor_func = consignor_func
         self.complete_callback = complete_callback
         self.create_callback = create_callback
         self.create_area = builtins.DEFAULT_WORK_AREA.get()
+        self.run_area = self.create_area
         self.chain_reaction_flag = False
+        # chain_reaction 修饰时记录原本的 complete_callback
+        self.old_complete_callback = complete_callback
+        self.priority = priority
+        self.timeout = timeout
+        self.semaphore = semaphore
+        self.token_bucket = token_bucket
 
     def all_info(self):
         # 未来抽象出一个类，用于自动获取成员和对应的值
@@ -33,6 +50,8 @@ class ConsignOrder(object):
             "create_area": self.create_area,
             "create_callback": self.create_callback,
             "complete_callback": self.complete_callback,
+            "priority": self.priority,
+            "timeout": self.timeout,
         }
 
     def __str__(self):
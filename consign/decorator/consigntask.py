@@ -1,5 +1,21 @@
 import builtins
+from asyncio import get_event_loop, CancelledError
 from enum import Enum
+from multiprocessing.dummy import Lock
+from time import perf_counter, monotonic
+from weakref import ref
+
+from ..worker.suspend import Resume
+
+
+# 所有Task共用一把锁，只用于保护完成时的回调列表，不会在每次Work时获取
+_done_lock = Lock()
+
+
+def _set_future_result(future, value):
+    # 在事件循环所在的线程中调用，await的一方可能已经取消了等待
+    if not future.done():
+        future.set_result(value)
 
 
 class TaskResult(Enum):
@@ -14,55 +30,312 @@ class TaskState(Enum):
     TaskDone = "TaskDone"
 
 
+# Task内部使用int记录状态，下标对应TaskState，对外通过task_state转换
+NO_START, RUN_CREATE_CALLBACK, TASK_RUNNING, RUN_COMPLETE_CALLBACK, TASK_DONE = range(5)
+_task_states = tuple(TaskState)
+_task_state_codes = {task_state: code for code, task_state in enumerate(_task_states)}
+
+
+class TaskTimeout(object):
+    """
+    ``Task.cancel_after`` 放入定时器堆的句柄，只持有 ``Task`` 的弱引用
+
+    定时器堆在截止时间之前一直持有句柄，已经完成且不再被引用的 ``Task`` 与他的返回值可以被立即释放
+    """
+    __slots__ = ("task_ref",)
+
+    def __init__(self, task):
+        self.task_ref = ref(task)
+
+    def expire(self):
+        task = self.task_ref()
+        if task is not None:
+            task.expire()
+
+
 class Task(object):
-    def __init__(self, order):
+    # 同时存在的Task可能非常多，使用__slots__节省内存，回调与原函数从order中获取而不是复制
+    __slots__ = ("order", "work_area", "state", "value", "priority", "generator", "yield_value", "_done_callbacks",
+                 "_chain_reaction", "created_at", "queued_at", "cancel_exception", "__weakref__")
+
+    def __init__(self, order, priority=None):
         """
         单次任务清单
 
-        通过create_receipts函数创建回执
-        回执 被用来得到协程的函数返回值
-        清单本身 被用来告知外界协程的情况
+        通过start和finish记录协程的开始与结束，同时调用回调
+        清单本身 被用来告知外界协程的情况，以及得到协程的函数返回值
 
+        :param order: 协程订单 ``ConsignOrder``
+        :param priority: 此次调用的优先级，为None时使用 ``ConsignOrder`` 的优先级
         """
         self.order = order
-        self.create_callback = order.create_callback
-        self.complete_callback = order.complete_callback
-        self.consignor_func = order.consignor_func
-
         self.work_area = builtins.DEFAULT_WORK_AREA.get()
-        self.task_state = TaskState.NoStart
+        # 状态码，对外请使用task_state
+        self.state = NO_START
         self.value = TaskResult.NoGet
+        # 优先级，数值越大越先执行，只在优先级队列的WorkArea中生效
+        self.priority = order.priority if priority is None else priority
+        # 协程的生成器，以及下一步需要处理的yield_value，Task本身就是WorkArea队列中的内容，每一步被重复使用
+        self.generator = None
+        self.yield_value = None
+        # 完成信号，完成时依次调用，没有等待者时为None以节省内存
+        self._done_callbacks = None
+        # 创建与最近一次放入队列的时间，只在WorkArea开启了运行指标时记录
+        self.created_at = self.queued_at = None
+        # 被取消时需要在协程中抛出的异常，未被取消时为None
+        self.cancel_exception = None
+        metrics = self.work_area.metrics
+        if metrics is not None:
+            metrics.task_created()
+            self.created_at = perf_counter()
+        tracer = self.work_area.tracer
+        if tracer is not None:
+            tracer.task_created(self)
 
-    def create_receipts(self):
+    @property
+    def task_state(self):
+        return _task_states[self.state]
+
+    @task_state.setter
+    def task_state(self, task_state):
+        self.state = _task_state_codes[task_state]
+
+    @property
+    def consignor_func(self):
+        return self.order.consignor_func
+
+    @property
+    def create_callback(self):
+        return self.order.create_callback
+
+    @property
+    def complete_callback(self):
+        return self.order.complete_callback
+
+    def start(self):
         """
-        不建议自行调用，它会在被修饰函数启动时创建
-        :return:
+        不建议自行调用，协程第一次执行前由 ``Worker`` 调用
+
+        :return: None
         """
+        admission = self.work_area.admission
+        if admission is not None:
+            # 开始执行，归还提交时占用的名额
+            admission.release()
         self.create()
+        self.state = TASK_RUNNING
+
+    def finish(self, value):
+        """
+        不建议自行调用，协程返回时由 ``Worker`` 调用，记录返回值并发出完成信号
 
-        self.task_state = TaskState.TaskRunning
-        self.value = yield self.consignor_func
+        :param value: 协程函数的返回值
+        :return: None
+        """
+        self.value = value
+        # 协程已经结束，不再持有生成器
+        self.generator = self.yield_value = None
         self.complete()
-        self.task_state = TaskState.TaskDone
+
+        metrics = self.work_area.metrics
+        if metrics is not None:
+            metrics.task_completed(None if self.created_at is None else perf_counter() - self.created_at)
+        tracer = self.work_area.tracer
+        if tracer is not None:
+            tracer.task_done(self)
+
+        with _done_lock:
+            self.state = TASK_DONE
+            done_callbacks, self._done_callbacks = self._done_callbacks, None
+
+        for done_callback in done_callbacks or ():
+            done_callback(self)
+
+    def cancel(self, exception=None):
+        """
+        取消此 ``Task`` ，协程会在下一步时在yield处收到 ``exception`` ，随后被释放，不再占用任何一次Work
+
+        被挂起的协程（例如 ``asleep`` 、 ``readable`` ）会被立即唤醒， ``chain_reaction`` 中等待的子协程会被一同取消
+
+        .. code-block:: python
+
+            task = my_coroutine()
+            task.cancel()
+            wait(task)  # raise CancelledError
+
+        .. note::
+
+            协程可以捕获 ``exception`` 并做清理，清理后返回的值会作为 ``value`` ，此时不视为被取消
+
+            如果捕获后依旧yield，那么协程会被直接关闭
+
+        :param exception: 抛出的异常，默认为 ``asyncio.CancelledError()``
+
+        :return:
+
+            返回bool类型，False 表示 ``Task`` 已经完成或者已经被取消过了，此次调用没有生效
+        """
+        if self.state == TASK_DONE or self.cancel_exception is not None:
+            return False
+        self.cancel_exception = exception = CancelledError() if exception is None else exception
+
+        yield_value = self.yield_value
+        if yield_value.__class__ is Task:
+            if yield_value._chain_reaction is self:
+                # 正在等待链式反应的子协程，子协程完成时会把父协程重新提交
+                yield_value.cancel(exception)
+        elif getattr(yield_value, "task", None) is self and callable(getattr(yield_value, "resume", None)):
+            # 被 Suspend 挂起，立即唤醒；正在挂起中的情况由 Suspend.park 检查
+            yield_value.resume(exception=exception)
+        return True
+
+    def cancel_after(self, secs):
+        """
+        ``secs`` 秒后仍未完成时以 ``TimeoutError`` 取消此 ``Task`` ，详情请查看 ``cancel``
+
+        ``coroutine(timeout=...)`` 修饰的函数在每次调用时都会调用
+
+        :param float secs: 超时时长
+        :return: None
+        """
+        work_area = self.work_area
+        # 定时器堆中放入只持有弱引用的句柄，提前完成的Task不会被保留到截止时间
+        if work_area.timer.push(monotonic() + secs, TaskTimeout(self)):
+            # 成为最早到期的对象时，唤醒正在按截止时间等待的线程重新计算等待时长
+            work_area.queue.wakeup(work_area.timer.watcher, keep=True)
+
+    def expire(self):
+        """
+        ``cancel_after`` 的定时器到期时被 ``Worker`` 调用
+
+        :return: None
+        """
+        if self.state != TASK_DONE:
+            self.cancel(TimeoutError("{func} 超时".format(func=getattr(
+                self.order.consignor_func, "__qualname__", self.order.consignor_func))))
+
+    def cancelled(self):
+        """
+        :return: 返回bool类型，True 表示此 ``Task`` 已经因取消而完成，此时 ``value`` 是取消时的异常
+        """
+        return self.state == TASK_DONE and self.cancel_exception is not None and self.value is self.cancel_exception
+
+    def throw_cancel(self):
+        """
+        不建议自行调用，被取消的协程在下一步时由 ``Worker`` 调用，在yield处抛出取消的异常并完成
+
+        :return: None
+        """
+        exception, generator = self.cancel_exception, self.generator
+        if self.state == NO_START and self.work_area.admission is not None:
+            # 开始前被取消，同样归还名额
+            self.work_area.admission.release()
+        yield_value = self.yield_value
+        # 下一步可能是还没有被执行的Suspend，他的suspend是方法而不是发出凭证的Suspend
+        if yield_value.__class__ is Resume and yield_value.suspend is not None:
+            # 唤醒凭证没有被送达，例如获取到的信号量需要归还
+            yield_value.suspend.abandon(yield_value)
+        try:
+            generator.throw(exception)
+        except StopIteration as e:
+            # 协程处理了取消并返回
+            self.finish(e.value)
+            return
+        except BaseException as e:
+            if e is not exception:
+                raise
+        else:
+            # 协程捕获后依旧yield，不再继续执行
+            generator.close()
+        self.finish(exception)
+
+    def create_receipts(self):
+        """
+        旧版的回执，不建议自行调用， ``Worker`` 现在直接调用 ``start`` 与 ``finish``
+
+        :return:
+        """
+        self.start()
+        self.finish((yield self.consignor_func))
 
     def create(self):
-        if self.create_callback is not None:
-            self.task_state = TaskState.RunCreateCallBack
-            self.create_callback(self)
+        create_callback = self.order.create_callback
+        if create_callback is not None:
+            self.state = RUN_CREATE_CALLBACK
+            create_callback(self)
+
+    def submit(self, task=None):
+        """
+        提交到 ``WorkArea`` 队列，不建议自行调用
 
-    def submit(self, something):
-        self.work_area.queue.put(something)
+        :param task: 需要提交的 ``Task`` ，为None时提交自身
+        :return: None
+        """
+        task = self if task is None else task
+        if task.work_area.metrics is not None:
+            task.queued_at = perf_counter()
+        self.work_area.queue.put(task)
 
     def complete(self):
-        if self.complete_callback is not None:
-            self.task_state = TaskState.RunCompleteCallBack
-            self.complete_callback(self)
+        complete_callback = self.order.complete_callback
+        if complete_callback is not None:
+            self.state = RUN_COMPLETE_CALLBACK
+            complete_callback(self)
+
+    def add_done_callback(self, done_callback):
+        """
+        添加完成信号的回调，回调会在 ``Task`` 状态变为 ``TaskDone`` 后被调用
+
+        如果 ``Task`` 已经完成，那么回调会被立刻调用
+
+        .. note::
+
+            与 ``complete_callback`` 不同， ``complete_callback`` 属于 ``ConsignOrder`` ，每次调用都会执行
+
+            而 ``add_done_callback`` 只作用于此次的 ``Task`` ，通常用于等待此次的 ``Task`` 完成，例如 ``wait``
+
+        :param done_callback: 回调函数，需要一个参数用于接收此次的 ``Task``
+        :return: None
+        """
+        with _done_lock:
+            if self.state != TASK_DONE:
+                if self._done_callbacks is None:
+                    self._done_callbacks = []
+                self._done_callbacks.append(done_callback)
+                return
+
+        done_callback(self)
+
+    def __await__(self):
+        """
+        ``Task`` 可以在asyncio的协程中被await，await的结果是协程函数的返回值
+
+        .. code-block:: python
+
+            async def main():
+                value = await my_coroutine()
+
+        .. warning::
+
+            await只是等待完成信号，并不会参与工作，``Task`` 需要有 ``Worker`` 工作，例如 ``AsyncioWorker``
+
+        """
+        if self.state != TASK_DONE:
+            loop = get_event_loop()
+            future = loop.create_future()
+            self.add_done_callback(
+                lambda task: loop.call_soon_threadsafe(_set_future_result, future, task.value))
+            yield from future
+        if self.cancelled():
+            raise self.value
+        return self.value
 
     def all_info(self):
         return {
             "task_state": self.task_state,
             "value": self.value,
             "work_area": self.work_area,
+            "priority": self.priority,
             "order": self.order
         }
 
@@ -1 +1,11 @@
 from .sleep import asleep
+from .offload import in_thread, in_process, Offload, set_offload_executor
+from .readiness import readable, writable
+from .gather import gather, agather, wait_any, await_any, as_completed, AsCompleted, Completion, AwaitDone
+from .channel import Channel, ChannelClosed
+from .mapping import map, imap_unordered
+
+# 不导出与内置函数同名的 map，请使用 consign.map
+__all__ = ["asleep", "in_thread", "in_process", "Offload", "set_offload_executor", "readable", "writable",
+           "gather", "agather", "wait_any", "await_any", "as_completed", "AsCompleted", "Completion", "AwaitDone",
+           "Channel", "ChannelClosed", "imap_unordered"]
@@ -0,0 +1,337 @@
+import builtins
+from collections import deque
+from multiprocessing.dummy import Lock
+from queue import Empty, Full
+
+from .gather import Completion
+from ..worker.suspend import Suspend
+from ..worker.wait import Supervisor
+
+# get没有传入default时使用
+_no_default = object()
+
+
+class ChannelClosed(Exception):
+    """
+    ``Channel`` 已经关闭：放入时总是抛出，取出时在剩余的内容被取完后抛出
+    """
+
+
+class ChannelWaiter(Completion):
+    """
+    阻塞在 ``Channel`` 上的线程，由 ``Channel.put_wait`` 与 ``Channel.get_wait`` 创建
+
+    与 ``ChannelGet`` 、 ``ChannelPut`` 拥有相同的唤醒方法，等待期间与 ``wait`` 一样参与 ``WorkArea`` 的工作
+    """
+    __slots__ = ()
+
+    def receive(self, item):
+        return self.set(item)
+
+    def accept(self):
+        return self.set(None)
+
+    def channel_closed(self):
+        return self.set(ChannelClosed("Channel 已经关闭"), failed=True)
+
+
+class Channel(object):
+    """Channel是协程之间的有界通道，用于流式的传递内容
+
+    协程通过yield ``put`` 与 ``get`` 放入与取出，通道已满或者为空时协程被挂起，不在队列中，也不会被轮询
+
+    对方到来时直接唤醒被挂起的一方，内容直接交给等待中的取出者，先到先得
+
+    .. code-block:: python
+
+        channel = Channel(100)
+
+        @coroutine
+        def producer():
+            for item in range(1000):
+                yield channel.put(item)
+            channel.close()
+
+        @coroutine
+        def consumer():
+            while True:
+                try:
+                    item = yield channel.get()
+                except ChannelClosed:
+                    break
+
+    普通的线程使用 ``put_wait`` 与 ``get_wait`` ，或者直接迭代，阻塞期间与 ``wait`` 一样参与工作：
+
+    .. code-block:: python
+
+        for item in channel:
+            print(item)
+
+    ``close`` 之后不能再放入，取出者取完剩余的内容后收到 ``ChannelClosed`` ，迭代随之结束
+
+    :param int capacity: 最多缓存的内容数量，为0时放入者需要等待取出者（同步交接）
+
+    :raise AssertionError: 当 ``capacity`` 小于0时抛出
+    """
+
+    def __init__(self, capacity: int=1):
+        assert capacity >= 0, "capacity 必须大于等于0"
+        self.capacity = capacity
+        self.buffer = deque()
+        # 等待中的取出者，以及等待中的放入者与他们的内容，先进先出
+        self.getters = deque()
+        self.putters = deque()
+        #: 是否已经关闭
+        self.closed = False
+        self.mutex = Lock()
+
+    def offer(self, item):
+        """
+        在持有mutex时调用，交给等待中的取出者或者放入缓存
+
+        :return: 返回bool类型，False 表示没有空位
+        """
+        getters = self.getters
+        while getters:
+            # 被取消的取出者不会再接收，交给下一个
+            if getters.popleft().receive(item):
+                return True
+        if len(self.buffer) < self.capacity:
+            self.buffer.append(item)
+            return True
+        return False
+
+    def take(self):
+        """
+        在持有mutex时调用，从缓存或者等待中的放入者处取出
+
+        :return: (是否取到, 内容)
+        """
+        buffer, putters = self.buffer, self.putters
+        if buffer:
+            item = buffer.popleft()
+            # 空出的位置交给等待中的放入者
+            while putters:
+                putter, putter_item = putters.popleft()
+                if putter.accept():
+                    buffer.append(putter_item)
+                    break
+            return True, item
+        while putters:
+            putter, putter_item = putters.popleft()
+            if putter.accept():
+                return True, putter_item
+        return False, None
+
+    def give_back(self, item):
+        """
+        取出者取出后没有收到时调用（例如协程同时被取消），内容交给下一个取出者或者放回缓存的最前面
+
+        :param item: 取出的内容
+        :return: None
+        """
+        with self.mutex:
+            getters = self.getters
+            while getters:
+                if getters.popleft().receive(item):
+                    return
+            self.buffer.appendleft(item)
+
+    def put(self, item):
+        """
+        协程中放入
+
+        :param item: 放入的内容
+        :return: ``ChannelPut`` ，需要被协程yield，通道已满时协程被挂起，已经关闭时在yield处抛出 ``ChannelClosed``
+        """
+        return ChannelPut(self, item)
+
+    def get(self, default=_no_default):
+        """
+        协程中取出
+
+        :param default: 通道已经关闭且取完时作为yield的返回值，没有传入时在yield处抛出 ``ChannelClosed``
+        :return: ``ChannelGet`` ，需要被协程yield，协程以取出的内容作为yield的返回值，通道为空时协程被挂起
+        """
+        return ChannelGet(self, default)
+
+    def put_nowait(self, item):
+        """
+        不等待的放入
+
+        :param item: 放入的内容
+        :return: None
+
+        :raise Full: 通道已满时抛出
+        :raise ChannelClosed: 通道已经关闭时抛出
+        """
+        with self.mutex:
+            if self.closed:
+                raise ChannelClosed("Channel 已经关闭")
+            if not self.offer(item):
+                raise Full("Channel 已满")
+
+    def get_nowait(self):
+        """
+        不等待的取出
+
+        :return: 取出的内容
+
+        :raise Empty: 通道为空时抛出
+        :raise ChannelClosed: 通道已经关闭且取完时抛出
+        """
+        with self.mutex:
+            received, item = self.take()
+            if received:
+                return item
+            if self.closed:
+                raise ChannelClosed("Channel 已经关闭")
+            raise Empty
+
+    def put_wait(self, item, *, timeout=None):
+        """
+        线程中放入，通道已满时阻塞，期间参与当前 ``WorkArea`` 的工作
+
+        :param item: 放入的内容
+        :param timeout: 最多等待的时长（秒），默认为None表示一直等待
+        :return: None
+
+        :raise TimeoutError: 超过 ``timeout`` 时依旧没有空位时抛出，内容没有被放入
+        :raise ChannelClosed: 通道已经关闭时抛出
+        """
+        with self.mutex:
+            if self.closed:
+                raise ChannelClosed("Channel 已经关闭")
+            if self.offer(item):
+                return
+            waiter = ChannelWaiter(builtins.DEFAULT_WORK_AREA.get())
+            self.putters.append((waiter, item))
+        self.wait(waiter, self.putters, (waiter, item), timeout)
+
+    def get_wait(self, *, timeout=None):
+        """
+        线程中取出，通道为空时阻塞，期间参与当前 ``WorkArea`` 的工作
+
+        :param timeout: 最多等待的时长（秒），默认为None表示一直等待
+        :return: 取出的内容
+
+        :raise TimeoutError: 超过 ``timeout`` 时依旧没有内容时抛出
+        :raise ChannelClosed: 通道已经关闭且取完时抛出
+        """
+        with self.mutex:
+            received, item = self.take()
+            if received:
+                return item
+            if self.closed:
+                raise ChannelClosed("Channel 已经关闭")
+            waiter = ChannelWaiter(builtins.DEFAULT_WORK_AREA.get())
+            self.getters.append(waiter)
+        return self.wait(waiter, self.getters, waiter, timeout)
+
+    def wait(self, waiter, waiters, entry, timeout):
+        try:
+            return Supervisor(waiter).run_until_complete(timeout=timeout)
+        except TimeoutError:
+            with self.mutex:
+                if entry in waiters:
+                    # 放弃等待
+                    waiters.remove(entry)
+                    raise
+        # 放弃等待的同时被唤醒了
+        if waiter.failed:
+            raise waiter.value
+        return waiter.value
+
+    def close(self):
+        """
+        关闭通道，等待中的放入者收到 ``ChannelClosed`` ，缓存中剩余的内容依旧可以被取出
+
+        :return: None
+        """
+        with self.mutex:
+            self.closed = True
+            waiters = list(self.getters) + [putter for putter, _ in self.putters]
+            self.getters.clear()
+            self.putters.clear()
+            for waiter in waiters:
+                waiter.channel_closed()
+
+    def __iter__(self):
+        while True:
+            try:
+                yield self.get_wait()
+            except ChannelClosed:
+                return
+
+    def __len__(self):
+        return len(self.buffer)
+
+
+class ChannelPut(Suspend):
+    """
+    挂起协程直到内容被放入 ``Channel`` ，通过 ``Channel.put`` 创建
+
+    :param Channel channel: 放入的通道
+    :param item: 放入的内容
+    """
+
+    def __init__(self, channel, item):
+        self.channel, self.item = channel, item
+
+    def suspend(self):
+        channel = self.channel
+        with channel.mutex:
+            if not channel.closed and not channel.offer(self.item):
+                channel.putters.append((self, self.item))
+                return
+            closed = channel.closed
+        if closed:
+            self.resume(exception=ChannelClosed("Channel 已经关闭"))
+        else:
+            self.resume()
+
+    def accept(self):
+        return self.resume()
+
+    def channel_closed(self):
+        return self.resume(exception=ChannelClosed("Channel 已经关闭"))
+
+
+class ChannelGet(Suspend):
+    """
+    挂起协程直到从 ``Channel`` 中取出内容，通过 ``Channel.get`` 创建
+
+    :param Channel channel: 取出的通道
+    :param default: 通道已经关闭且取完时的返回值
+    """
+
+    def __init__(self, channel, default=_no_default):
+        self.channel, self.default = channel, default
+        self.received = False
+
+    def suspend(self):
+        channel = self.channel
+        with channel.mutex:
+            received, item = channel.take()
+            if not received and not channel.closed:
+                channel.getters.append(self)
+                return
+        if not received:
+            self.channel_closed()
+        elif not self.receive(item):
+            # 挂起的同时协程被取消了
+            channel.give_back(item)
+
+    def receive(self, item):
+        self.received = self.resume(item)
+        return self.received
+
+    def channel_closed(self):
+        if self.default is _no_default:
+            return self.resume(exception=ChannelClosed("Channel 已经关闭"))
+        return self.resume(self.default)
+
+    def abandon(self, resume):
+        if self.received:
+            # 取出后协程在继续执行前被取消
+            self.channel.give_back(resume.value)
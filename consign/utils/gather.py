@@ -0,0 +1,325 @@
+import builtins
+from collections import deque
+from multiprocessing.dummy import Lock
+
+from ..decorator.consigntask import TaskResult
+from ..worker.suspend import AwaitDone
+from ..worker.wait import Supervisor
+
+
+class Completion(object):
+    """
+    一次性的完成信号，接口与 ``Task`` 的完成信号相同，所以可以被 ``Supervisor`` 阻塞等待，也可以被 ``AwaitDone`` 挂起等待
+
+    ``gather`` 、 ``wait_any`` 与 ``as_completed`` 在每个 ``Task`` 上只添加一次完成信号的回调，满足条件时 ``set`` 此完成信号
+
+    :param WorkArea work_area: 阻塞等待时参与工作的 ``WorkArea``
+    """
+    __slots__ = ("work_area", "value", "failed", "done", "_callbacks", "mutex")
+
+    def __init__(self, work_area):
+        self.work_area = work_area
+        self.value = TaskResult.NoGet
+        self.failed = self.done = False
+        self._callbacks = []
+        self.mutex = Lock()
+
+    def set(self, value, failed=False):
+        """
+        发出完成信号，只有第一次调用会生效
+
+        :param value: 等待者得到的值
+        :param bool failed: 为True时 ``value`` 是异常，等待者会收到抛出的 ``value``
+        :return: 返回bool类型，False 表示已经完成过了，此次调用没有生效
+        """
+        with self.mutex:
+            if self.done:
+                return False
+            self.value, self.failed, self.done = value, failed, True
+            callbacks, self._callbacks = self._callbacks, None
+
+        for callback in callbacks:
+            callback(self)
+        return True
+
+    def add_done_callback(self, done_callback):
+        """
+        与 ``Task.add_done_callback`` 相同，已经完成时立刻调用
+
+        :param done_callback: 回调函数，需要一个参数用于接收此 ``Completion``
+        :return: None
+        """
+        with self.mutex:
+            if not self.done:
+                self._callbacks.append(done_callback)
+                return
+
+        done_callback(self)
+
+    def cancelled(self):
+        # 与Task.cancelled相同，Supervisor在等待结束时据此抛出value
+        return self.failed
+
+
+def _work_area(tasks):
+    # 阻塞等待时参与第一个 Task 所在的 WorkArea 的工作，没有 Task 时使用当前的 WorkArea
+    return tasks[0].work_area if tasks else builtins.DEFAULT_WORK_AREA.get()
+
+
+def _gather(tasks, return_exceptions):
+    tasks = list(tasks)
+    completion, mutex = Completion(_work_area(tasks)), Lock()
+    remaining = [len(tasks)]
+    if not tasks:
+        # 与 asyncio.gather() 相同，没有 Task 时立即完成
+        completion.set([])
+        return completion
+
+    def task_done(_):
+        with mutex:
+            remaining[0] -= 1
+            if remaining[0]:
+                return
+        if not return_exceptions:
+            for task in tasks:
+                if task.cancelled():
+                    completion.set(task.value, failed=True)
+                    return
+        completion.set([task.value for task in tasks])
+
+    for task in tasks:
+        task.add_done_callback(task_done)
+    return completion
+
+
+def _first_done(tasks):
+    tasks = list(tasks)
+    if not tasks:
+        # 没有 Task 时永远不会有第一个完成的 Task
+        raise ValueError("tasks 不能为空")
+    completion = Completion(_work_area(tasks))
+    for task in tasks:
+        # 只有第一个完成的Task生效
+        task.add_done_callback(completion.set)
+    return completion
+
+
+def gather(tasks, *, timeout=None):
+    """gather阻塞等待所有 ``Task`` 完成，按顺序返回他们的值，并在期间参与工作
+
+    与对每个 ``Task`` 依次 ``wait`` 不同， ``gather`` 在每个 ``Task`` 上只添加一次完成信号的回调，只有一个 ``Supervisor`` 等待，
+
+    全部完成时才会唤醒，成千上万的 ``Task`` 也只需要一次等待
+
+    .. code-block:: python
+
+        values = gather([my_coroutine(i) for i in range(10000)])
+
+    在协程中请使用 ``agather`` ，挂起而不是阻塞
+
+    :param tasks: ``Task`` 的可迭代对象，阻塞期间参与第一个 ``Task`` 所在的 ``WorkArea`` 的工作
+
+    :param timeout: 最多等待的时长（秒），默认为None表示一直等待
+
+    :return: 与 ``tasks`` 顺序相同的值的列表， ``tasks`` 为空时立即返回空列表
+
+    :raise TimeoutError: 超过 ``timeout`` 时依旧有 ``Task`` 没有完成时抛出
+
+    :raise CancelledError: 存在被取消的 ``Task`` 时抛出第一个被取消的 ``Task`` 的异常
+    """
+    return Supervisor(_gather(tasks, False)).run_until_complete(timeout=timeout)
+
+
+def agather(tasks, return_exceptions: bool=False):
+    """协程的gather，挂起协程直到所有 ``Task`` 完成，协程以与 ``tasks`` 顺序相同的值的列表作为yield的返回值
+
+    .. code-block:: python
+
+        @coroutine
+        def my_coroutine():
+            values = yield agather([child(i) for i in range(100)])
+
+    :param tasks: ``Task`` 的可迭代对象，为空时协程以空列表被立即唤醒
+
+    :param bool return_exceptions:
+
+        为False时存在被取消的 ``Task`` 会在yield处抛出第一个被取消的 ``Task`` 的异常
+
+        为True时被取消的 ``Task`` 的异常作为值返回
+
+    :return: ``AwaitDone`` ，需要被协程yield
+    """
+    return AwaitDone(_gather(tasks, return_exceptions))
+
+
+def wait_any(tasks, *, timeout=None):
+    """wait_any阻塞等待任意一个 ``Task`` 完成并返回他，并在期间参与工作
+
+    在协程中请使用 ``await_any``
+
+    :param tasks: ``Task`` 的可迭代对象，阻塞期间参与第一个 ``Task`` 所在的 ``WorkArea`` 的工作
+
+    :param timeout: 最多等待的时长（秒），默认为None表示一直等待
+
+    :return: 第一个完成的 ``Task`` ，已经存在完成的 ``Task`` 时立即返回
+
+    :raise TimeoutError: 超过 ``timeout`` 时依旧没有 ``Task`` 完成时抛出
+
+    :raise ValueError: ``tasks`` 为空时抛出
+    """
+    return Supervisor(_first_done(tasks)).run_until_complete(timeout=timeout)
+
+
+def await_any(tasks):
+    """协程的wait_any，挂起协程直到任意一个 ``Task`` 完成，协程以第一个完成的 ``Task`` 作为yield的返回值
+
+    .. code-block:: python
+
+        @coroutine
+        def my_coroutine():
+            first = yield await_any([child(i) for i in range(100)])
+
+    :param tasks: ``Task`` 的可迭代对象
+
+    :return: ``AwaitDone`` ，需要被协程yield
+
+    :raise ValueError: ``tasks`` 为空时抛出
+    """
+    return AwaitDone(_first_done(tasks))
+
+
+class AsCompleted(object):
+    """
+    按完成的先后顺序获取 ``Task`` ，通过 ``as_completed`` 创建
+
+    每个 ``Task`` 只添加一次完成信号的回调，完成的 ``Task`` 交给最早的等待者，没有等待者时存放在 ``done`` 中
+
+    在线程中直接迭代，阻塞等待并在期间参与工作：
+
+    .. code-block:: python
+
+        for task in as_completed(tasks):
+            print(task.value)
+
+    在协程中通过 ``anext`` 挂起等待：
+
+    .. code-block:: python
+
+        @coroutine
+        def my_coroutine(tasks):
+            completed = as_completed(tasks)
+            while True:
+                task = yield completed.anext()
+                if task is None:
+                    # 所有 Task 都已经被取出
+                    break
+
+    :param tasks: ``Task`` 的可迭代对象
+
+    :param timeout: 迭代时每次最多等待的时长（秒），默认为None表示一直等待
+    """
+
+    def __init__(self, tasks, timeout=None):
+        tasks = list(tasks)
+        self.work_area = _work_area(tasks)
+        self.timeout = timeout
+        #: 还没有被取出的 ``Task`` 数量
+        self.remaining = len(tasks)
+        #: 已经完成但还没有被取出的 ``Task``
+        self.done = deque()
+        # 等待中的Completion
+        self.waiters = deque()
+        self.mutex = Lock()
+        for task in tasks:
+            task.add_done_callback(self.task_done)
+
+    def task_done(self, task):
+        with self.mutex:
+            if not self.waiters:
+                self.done.append(task)
+                return
+            waiter = self.waiters.popleft()
+        waiter.set(task)
+
+    def add(self, task):
+        """
+        添加一个 ``Task`` ，用于边提交边获取，例如 ``imap_unordered``
+
+        :param Task task: 新的 ``Task``
+        :return: None
+        """
+        with self.mutex:
+            self.remaining += 1
+        task.add_done_callback(self.task_done)
+
+    def next_completion(self):
+        """
+        :return: 下一个完成的 ``Task`` 的 ``Completion``
+
+        :raise StopIteration: 所有 ``Task`` 都已经被取出时抛出
+        """
+        completion = Completion(self.work_area)
+        with self.mutex:
+            if self.remaining <= 0:
+                raise StopIteration
+            self.remaining -= 1
+            if not self.done:
+                self.waiters.append(completion)
+                return completion
+            task = self.done.popleft()
+        completion.set(task)
+        return completion
+
+    def anext(self):
+        """
+        协程中获取下一个完成的 ``Task``
+
+        所有 ``Task`` 都已经被取出时不会抛出 ``StopIteration`` （生成器中会变为 ``RuntimeError`` ），而是以None唤醒
+
+        :return:
+
+            ``AwaitDone`` ，需要被协程yield，协程以下一个完成的 ``Task`` 作为yield的返回值
+
+            所有 ``Task`` 都已经被取出时以None作为yield的返回值
+        """
+        try:
+            return AwaitDone(self.next_completion())
+        except StopIteration:
+            completion = Completion(self.work_area)
+            completion.set(None)
+            return AwaitDone(completion)
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        completion = self.next_completion()
+        if completion.done:
+            # 已经存在完成的Task，无需等待
+            return completion.value
+        try:
+            return Supervisor(completion).run_until_complete(timeout=self.timeout)
+        except TimeoutError:
+            with self.mutex:
+                if completion in self.waiters:
+                    # 放弃等待，之后完成的Task留给下一次
+                    self.waiters.remove(completion)
+                    self.remaining += 1
+                    raise
+        # 放弃等待的同时Task完成了
+        return completion.value
+
+    def __len__(self):
+        return self.remaining
+
+
+def as_completed(tasks, *, timeout=None):
+    """as_completed按完成的先后顺序获取 ``Task`` ，详情请查看 ``AsCompleted``
+
+    :param tasks: ``Task`` 的可迭代对象，为空时迭代立即结束
+
+    :param timeout: 在线程中迭代时每次最多等待的时长（秒），默认为None表示一直等待
+
+    :return: ``AsCompleted`` ，在线程中可以直接迭代，在协程中使用 ``anext``
+    """
+    return AsCompleted(tasks, timeout)
@@ -0,0 +1,167 @@
+from collections import deque
+from inspect import isgeneratorfunction
+from itertools import islice
+
+from ..decorator import coroutine
+from ..decorator.consigntask import Task, TASK_DONE
+from ..worker.suspend import AwaitDone
+from ..worker.wait import wait
+from .gather import AsCompleted
+
+
+@coroutine
+def map_chunk(func, chunk):
+    """
+    在一个 ``Task`` 中依次处理 ``chunk`` 中的内容，由 ``map`` 在 ``chunksize`` 大于1或者 ``func`` 不是协程函数时使用
+
+    :param func:
+
+        原函数，生成器函数会被 ``yield from`` 执行，普通函数在每个内容之后交出控制权
+
+        普通函数返回 ``Task`` 时（例如包装了协程函数的lambda或者partial），挂起等待他的返回值
+
+    :param list chunk: 需要处理的内容
+    :return: 与 ``chunk`` 顺序相同的返回值的列表
+    """
+    values = []
+    if isgeneratorfunction(func):
+        for item in chunk:
+            values.append((yield from func(item)))
+    else:
+        for item in chunk:
+            value = func(item)
+            if value.__class__ is Task:
+                value = yield AwaitDone(value)
+            else:
+                yield ...
+            values.append(value)
+    return values
+
+
+def _submissions(func, iterable, chunksize, chunked):
+    # 惰性的创建Task，只在有空位时才从iterable中取出
+    iterator = iter(iterable)
+    if not chunked:
+        for item in iterator:
+            yield func(item)
+        return
+    order = getattr(func, "order", None)
+    target = func if order is None else order.consignor_func
+    while True:
+        chunk = list(islice(iterator, chunksize))
+        if not chunk:
+            return
+        yield map_chunk(target, chunk)
+
+
+def _result(task):
+    if task.cancelled():
+        raise task.value
+    return task.value
+
+
+def _map_ordered(submissions, concurrency, chunked):
+    in_flight = deque(islice(submissions, concurrency))
+    try:
+        while in_flight:
+            task = in_flight[0]
+            if task.state != TASK_DONE:
+                # 等待期间之后的Task通常也会完成，此时无需再创建Supervisor
+                wait(task)
+            in_flight.popleft()
+            # 先补充再交出结果，调用者处理结果时 Worker 依旧有事可做
+            in_flight.extend(islice(submissions, 1))
+            if chunked:
+                yield from _result(task)
+            else:
+                yield _result(task)
+    finally:
+        # 调用者提前结束或者出错时，取消剩余的Task
+        for task in in_flight:
+            task.cancel()
+
+
+def _map_unordered(submissions, concurrency, chunked):
+    in_flight = set(islice(submissions, concurrency))
+    if not in_flight:
+        return
+    completed = AsCompleted(in_flight)
+    try:
+        for task in completed:
+            in_flight.discard(task)
+            for new_task in islice(submissions, 1):
+                in_flight.add(new_task)
+                completed.add(new_task)
+            if chunked:
+                yield from _result(task)
+            else:
+                yield _result(task)
+    finally:
+        for task in in_flight:
+            task.cancel()
+
+
+def map(func, iterable, *, concurrency: int=64, ordered: bool=True, chunksize: int=1):
+    """map以有限的并发对可迭代对象中的每一个内容调用 ``func`` ，以生成器的方式返回结果
+
+    与先调用成千上万次再 ``gather`` 不同， ``map`` 只在有空位时才从 ``iterable`` 中取出下一个内容，
+
+    同时存在的 ``Task`` 最多 ``concurrency`` 个，无论 ``iterable`` 有多大，内存都只与 ``concurrency`` 有关
+
+    .. code-block:: python
+
+        @coroutine
+        def parse(record):
+            ...
+
+        for value in consign.map(parse, read_records(), concurrency=100, chunksize=50):
+            ...
+
+    等待期间与 ``wait`` 一样参与当前 ``WorkArea`` 的工作，所以没有 ``Worker`` 时也可以使用
+
+    与内置函数同名，所以不会被 ``from consign import *`` 导入，请通过 ``consign.map`` 使用
+
+    .. note::
+
+        ``chunksize`` 大于1时，多个内容在同一个 ``Task`` 中依次处理，减少创建 ``Task`` 的开销，
+
+        此时直接执行 ``func`` 的原函数，被修饰时的 ``timeout`` 、 ``max_concurrency`` 等参数不会生效
+
+    .. warning::
+
+        生成器被提前关闭（例如 ``break`` ）或者有 ``Task`` 被取消时，剩余的 ``Task`` 会被取消
+
+    :param func: 被 ``coroutine`` 修饰的函数，也可以是普通函数或者生成器函数，此时以 ``chunksize`` 分组执行
+
+    :param iterable: 可迭代对象，每个内容作为 ``func`` 唯一的参数
+
+    :param int concurrency: 同时存在的 ``Task`` 的最大数量
+
+    :param bool ordered: 为True时按 ``iterable`` 的顺序返回，为False时按完成的先后顺序返回，详情请查看 ``imap_unordered``
+
+    :param int chunksize: 每个 ``Task`` 处理的内容数量
+
+    :return: 结果的生成器
+
+    :raise AssertionError: 当 ``concurrency`` 或者 ``chunksize`` 小于1时抛出
+    """
+    assert concurrency >= 1, "concurrency 必须大于等于1"
+    assert chunksize >= 1, "chunksize 必须大于等于1"
+    chunked = chunksize > 1 or getattr(func, "order", None) is None
+    submissions = _submissions(func, iterable, chunksize, chunked)
+    if ordered:
+        return _map_ordered(submissions, concurrency, chunked)
+    return _map_unordered(submissions, concurrency, chunked)
+
+
+def imap_unordered(func, iterable, *, concurrency: int=64, chunksize: int=1):
+    """
+    与 ``map(..., ordered=False)`` 相同，按完成的先后顺序返回结果，慢的内容不会阻碍之后的结果
+
+    :param func: 与 ``map`` 相同
+    :param iterable: 与 ``map`` 相同
+    :param int concurrency: 与 ``map`` 相同
+    :param int chunksize: 与 ``map`` 相同
+    :return: 结果的生成器
+    """
+    return map(func, iterable, concurrency=concurrency, ordered=False, chunksize=chunksize)
@@ -0,0 +1,131 @@
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from multiprocessing.dummy import Lock
+from os import cpu_count
+
+from ..worker.suspend import Suspend
+
+
+# 默认的执行器在第一次使用时才被创建，可以通过 set_offload_executor 替换
+_executor_dict = {}
+_executor_lock = Lock()
+_executor_factory_dict = {
+    "thread": lambda: ThreadPoolExecutor(max_workers=min(32, (cpu_count() or 1) + 4)),
+    "process": lambda: ProcessPoolExecutor(max_workers=cpu_count() or 1),
+}
+
+
+def get_offload_executor(kind: str = "thread"):
+    """
+    获取默认的执行器，不存在时创建
+
+    :param str kind: "thread" 或者 "process"
+
+    :return: 对应的 ``concurrent.futures`` 执行器
+
+    :raise KeyError: 当 ``kind`` 不是 "thread" 或者 "process" 时抛出
+    """
+    executor = _executor_dict.get(kind, None)
+    if executor is None:
+        with _executor_lock:
+            executor = _executor_dict.get(kind, None)
+            if executor is None:
+                executor = _executor_dict[kind] = _executor_factory_dict[kind]()
+    return executor
+
+
+def set_offload_executor(kind: str, executor):
+    """
+    替换默认的执行器，例如希望修改线程/进程的数量
+
+    被替换的执行器不会被关闭，是否关闭由调用者决定
+
+    :param str kind: "thread" 或者 "process"
+
+    :param executor: 任意 ``concurrent.futures.Executor``
+
+    :return: 被替换的执行器，不存在时返回None
+    """
+    assert kind in _executor_factory_dict, "{kind} 不是 thread 或者 process".format(kind=kind)
+    with _executor_lock:
+        old_executor, _executor_dict[kind] = _executor_dict.get(kind, None), executor
+    return old_executor
+
+
+class Offload(Suspend):
+    """Offload将可调用对象交给执行器执行，并挂起协程直到执行完毕
+
+    ``Worker`` 在遇到yield出的可调用对象时会直接调用，阻塞的可调用对象会阻塞整个 ``Worker``
+
+    而yield一个 ``Offload`` ，可调用对象会交给 ``concurrent.futures`` 的执行器执行， ``Worker`` 可以继续执行其他协程
+
+    执行完毕后，协程以可调用对象的返回值被唤醒，如果可调用对象抛出了异常，那么异常会在协程的yield处抛出
+
+    通常使用 ``in_thread`` 和 ``in_process`` ，他们会使用默认的执行器
+
+    :param executor: 任意 ``concurrent.futures.Executor``
+
+    :param func: 可调用对象
+
+    :param args: 可调用对象的参数
+
+    :param kwargs: 可调用对象的参数
+    """
+
+    def __init__(self, executor, func, *args, **kwargs):
+        self.executor, self.func, self.args, self.kwargs = executor, func, args, kwargs
+
+    def suspend(self):
+        try:
+            future = self.executor.submit(self.func, *self.args, **self.kwargs)
+        except BaseException as e:
+            # 执行器已经关闭或者参数无法被序列化，协程已经被挂起，需要在yield处抛出而不是一直挂起
+            self.resume(exception=e)
+            return
+        future.add_done_callback(self.future_done)
+
+    def future_done(self, future):
+        try:
+            value = future.result()
+        except BaseException as e:
+            self.resume(exception=e)
+        else:
+            self.resume(value)
+
+
+def in_thread(func, *args, **kwargs):
+    """在线程池中执行阻塞的可调用对象，协程被挂起直到执行完毕
+
+    .. code-block:: python
+
+        @coroutine
+        def my_io_read(path: str):
+            # time.sleep 在线程池中执行，Worker不会被阻塞
+            yield in_thread(time.sleep, 3)
+            data = yield in_thread(read_file, path)
+            return data
+
+    默认的线程池大小为 min(32, cpu数量 + 4)，可以通过 ``set_offload_executor("thread", executor)`` 替换
+
+    :param func: 阻塞的可调用对象，例如 io
+
+    :return: ``Offload`` ，需要被协程yield
+    """
+    return Offload(get_offload_executor("thread"), func, *args, **kwargs)
+
+
+def in_process(func, *args, **kwargs):
+    """在进程池中执行可调用对象，协程被挂起直到执行完毕
+
+    适用于cpu密集的可调用对象，不会受到GIL的限制
+
+    .. warning::
+
+        ``func`` 以及参数、返回值都需要能被 ``pickle`` 序列化，例如模块顶层定义的函数
+
+    默认的进程池大小为cpu数量，可以通过 ``set_offload_executor("process", executor)`` 替换
+
+    :param func: cpu密集的可调用对象
+
+    :return: ``Offload`` ，需要被协程yield
+    """
+    return Offload(get_offload_executor("process"), func, *args, **kwargs)
@@ -0,0 +1,77 @@
+from selectors import EVENT_READ, EVENT_WRITE
+from time import monotonic
+
+from ..worker.suspend import Suspend
+
+
+class Readiness(Suspend):
+    """
+    挂起协程直到文件描述符就绪，由 ``WorkArea`` 的 ``IOPoller`` 负责等待
+
+    通常使用 ``readable`` 和 ``writable``
+
+    :param fileobj: 文件描述符，或者拥有 ``fileno`` 方法的对象，例如 ``socket``
+
+    :param int events: ``selectors.EVENT_READ`` 或者 ``selectors.EVENT_WRITE``
+
+    :param timeout: 最长等待时长，超时后协程的yield处会抛出 ``TimeoutError`` ，None表示一直等待
+    """
+
+    def __init__(self, fileobj, events, timeout=None):
+        self.fd = fileobj if isinstance(fileobj, int) else fileobj.fileno()
+        self.events, self.timeout = events, timeout
+
+    def suspend(self):
+        self.work_area.get_io_poller().register(self)
+        if self.timeout is not None:
+            self.expire_at(monotonic() + self.timeout)
+
+    def expire(self):
+        if self.resume(exception=TimeoutError("等待文件描述符 {fd} 就绪超时".format(fd=self.fd))):
+            self.work_area.io_poller.discard(self)
+
+    def abandon(self, resume):
+        # 被取消时由 Task.cancel 唤醒，IOPoller 中依旧登记着，需要一并移除
+        self.work_area.io_poller.discard(self)
+
+
+def readable(fileobj, timeout=None):
+    """协程的io等待函数，挂起协程直到文件描述符可读
+
+    与yield一个阻塞的读取不同，等待期间 ``Worker`` 可以继续执行其他协程，一个线程就可以同时等待成千上万的文件描述符
+
+    .. code-block:: python
+
+        @coroutine
+        def my_recv(sock):
+            sock.setblocking(False)
+            yield readable(sock, timeout=3)
+            return sock.recv(4096)
+
+    .. warning::
+
+        等待期间需要有 ``Worker`` 在 ``WorkArea`` 中空闲， ``Worker`` 在队列为空时才会 ``select``
+
+        ``AsyncioWorker`` 不会 ``select`` ，在事件循环中请直接yield asyncio的协程
+
+    :param fileobj: 文件描述符，或者拥有 ``fileno`` 方法的对象，例如 ``socket``
+
+    :param timeout: 最长等待时长，超时后协程的yield处会抛出 ``TimeoutError`` ，None表示一直等待
+
+    :return: ``Readiness`` ，需要被协程yield
+    """
+    return Readiness(fileobj, EVENT_READ, timeout)
+
+
+def writable(fileobj, timeout=None):
+    """协程的io等待函数，挂起协程直到文件描述符可写
+
+    与 ``readable`` 相同，更多详情请查看 ``readable``
+
+    :param fileobj: 文件描述符，或者拥有 ``fileno`` 方法的对象，例如 ``socket``
+
+    :param timeout: 最长等待时长，超时后协程的yield处会抛出 ``TimeoutError`` ，None表示一直等待
+
+    :return: ``Readiness`` ，需要被协程yield
+    """
+    return Readiness(fileobj, EVENT_WRITE, timeout)
@@ -1,6 +1,7 @@
 from time import monotonic
 
 from ..decorator import coroutine, repeated_call, chain_reaction
+from ..worker.suspend import SleepUntil
 
 
 @repeated_call
@@ -11,7 +12,9 @@ def asleep(secs: float):
 
     ``asleep`` 与 ``sleep`` 不同， ``asleep`` 是非阻塞的、协程的
 
-    ``asleep`` 通过 **不断的切换控制权** 和 **判断时间** 来实现休眠
+    ``asleep`` 通过将协程 **挂起** 到 ``WorkArea`` 的定时器堆中来实现休眠
+
+    休眠中的协程不在队列中，不会被轮询，直到截止时间到达才会被 ``Worker`` 重新放回队列
 
     .. warning::
 
@@ -25,7 +28,7 @@ def asleep(secs: float):
 
         ``asleep`` 休眠的时长是 **不精确的** ，受到当前任务量和阻塞时间的影响
 
-            因为 ``asleep`` 在转移控制权的过程中，队列里依旧存在其余任务
+            因为 ``asleep`` 到期后会回到队列，队列里依旧存在其余任务
 
             你无法保证下一个任务是不是阻塞的
 
@@ -55,6 +58,4 @@ def asleep(secs: float):
         休眠的秒数
 
     """
-    star = monotonic()
-    while (monotonic() - star) < secs:
-        yield ...
+    yield SleepUntil(monotonic() + secs)
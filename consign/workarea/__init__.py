@@ -4,6 +4,10 @@ import builtins
 from contextvars import ContextVar
 
 from .workarea import WorkArea, _instance_dict
+from .metrics import WorkAreaMetrics
+from .profiler import WorkAreaProfiler
+from .tracer import WorkAreaTracer
+from .admission import Admission
 DEFAULT_WORK_AREA = \
     builtins.DEFAULT_WORK_AREA = ContextVar("DEFAULT_WORK_AREA", default=WorkArea(name="DEFAULT_WORK_AREA"))
 
@@ -0,0 +1,110 @@
+from collections import deque
+from multiprocessing.dummy import Lock
+
+
+# 可以选择的overflow策略
+OVERFLOW_POLICIES = ("block", "reject", "drop_oldest")
+
+
+class Admission(object):
+    """Admission限制 ``WorkArea`` 中已经提交但还没有开始的新 ``Task`` 的数量，通过 ``WorkArea(capacity=...)`` 创建
+
+    只限制新的调用，已经开始执行的协程的后续步骤（重新提交、被唤醒、链式反应）不受限制，所以不会因此卡死
+
+    ``Task`` 第一次执行时归还名额，名额已满时按照 ``overflow`` 处理新的调用：
+
+        1. block：阻塞直到有空位，期间参与此区域的工作
+
+        2. reject：抛出 ``queue.Full``
+
+        3. drop_oldest：丢弃队列中最早的还没有开始的 ``Task`` ，被丢弃的 ``Task`` 以 ``queue.Full`` 被取消
+
+    协程中请使用 ``yield admit(func, *args, **kwargs)`` ，挂起而不是阻塞
+
+    :param WorkArea work_area: 所属的 ``WorkArea``
+
+    :param int capacity: 已经提交但还没有开始的 ``Task`` 的最大数量
+
+    :param str overflow: 名额已满时的策略，见 ``OVERFLOW_POLICIES``
+
+    :raise AssertionError: 当 ``capacity`` 小于1或者 ``overflow`` 不正确时抛出
+    """
+
+    def __init__(self, work_area, capacity, overflow="block"):
+        assert capacity >= 1, "capacity 必须大于等于1"
+        assert overflow in OVERFLOW_POLICIES, "overflow 必须是 {policies} 之一".format(policies=OVERFLOW_POLICIES)
+        self.work_area = work_area
+        self.capacity = capacity
+        self.overflow = overflow
+        #: 已经提交但还没有开始的 ``Task`` 的数量
+        self.pending = 0
+        #: 被拒绝与被丢弃的数量
+        self.rejected = self.dropped = 0
+        # 挂起中的协程（Admit），空出的名额直接交给他们，先进先出
+        self.waiters = deque()
+        # 阻塞中的线程标识
+        self.blocked = set()
+        self.mutex = Lock()
+
+    def try_admit(self, ident=None):
+        """
+        尝试占用一个名额
+
+        :param ident: 阻塞中的线程标识，占用失败时登记，名额空出时会被唤醒
+        :return: 返回bool类型，True 表示占用成功
+        """
+        with self.mutex:
+            if self.pending < self.capacity and not self.waiters:
+                self.pending += 1
+                self.blocked.discard(ident)
+                return True
+            if ident is not None:
+                self.blocked.add(ident)
+            return False
+
+    def admit_or_wait(self, waiter):
+        """
+        占用一个名额，名额已满时登记 ``waiter`` ，空出的名额会直接交给他
+
+        :param waiter: 拥有 ``grant`` 方法的对象，通常是 ``Admit``
+        :return: 返回bool类型，True 表示占用成功，False 表示已经登记
+        """
+        with self.mutex:
+            if self.pending < self.capacity and not self.waiters:
+                self.pending += 1
+                return True
+            self.waiters.append(waiter)
+            return False
+
+    def release(self):
+        """
+        ``Task`` 开始执行或者在开始前被取消时归还名额，存在挂起中的协程时直接交给最早的一个
+
+        :return: None
+        """
+        while True:
+            with self.mutex:
+                if not self.waiters:
+                    self.pending -= 1
+                    blocked = tuple(self.blocked)
+                    break
+                waiter = self.waiters.popleft()
+            # 等待者可能已经被取消了，此时交给下一个等待者
+            if waiter.grant():
+                return
+
+        if blocked:
+            self.work_area.queue.wakeup_all(blocked)
+
+    def unblock(self, ident):
+        """
+        阻塞的线程不再等待时调用，取消登记
+
+        :param ident: 线程标识
+        :return: None
+        """
+        with self.mutex:
+            self.blocked.discard(ident)
+
+    def __len__(self):
+        return self.pending
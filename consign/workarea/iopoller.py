@@ -0,0 +1,168 @@
+from selectors import DefaultSelector, EVENT_READ
+from socket import socketpair
+from multiprocessing.dummy import Lock
+
+
+class IOPoller(object):
+    """IOPoller是 ``WorkArea`` 的io就绪等待器，基于 ``selectors`` ，在第一次等待io时才会被 ``WorkArea`` 创建
+
+    ``IOPoller`` 中存放的是等待io就绪的挂起对象（ ``readable`` / ``writable`` ），他们需要拥有以下属性：
+
+        1. ``fd`` ：文件描述符
+
+        2. ``events`` ：等待的事件， ``selectors.EVENT_READ`` 或者 ``selectors.EVENT_WRITE``
+
+        3. ``resume`` ：就绪时被调用
+
+    ``Worker`` 在队列为空时会代替挂起在队列上，以定时器的截止时间作为超时时长 ``select``
+
+    同一时刻只有一个线程 ``select`` ，其余空闲的线程依旧挂起在队列上
+
+    .. note::
+
+        注册的修改只会由 ``select`` 的线程在 ``select`` 前执行，避免在 ``select`` 的同时修改 ``selector``
+
+        其他线程修改后会通过 ``socketpair`` 唤醒正在 ``select`` 的线程
+
+    """
+
+    def __init__(self):
+        self.selector = DefaultSelector()
+        self.mutex = Lock()
+        #: 同一时刻只有一个线程可以 ``select``
+        self.poll_lock = Lock()
+        # 文件描述符 -> 等待他的挂起对象列表
+        self.waiting = {}
+        # 等待的挂起对象发生变化，需要在下一次select前同步到selector的文件描述符
+        self.dirty = set()
+        self.selecting = False
+        #: 繁忙时，每隔多少次Work不等待的 ``select`` 一次，避免io就绪在队列繁忙时得不到响应
+        self.busy_interval = 64
+        self.tick = 0
+
+        self.wake_reader, self.wake_writer = socketpair()
+        self.wake_reader.setblocking(False)
+        self.wake_writer.setblocking(False)
+        self.selector.register(self.wake_reader, EVENT_READ)
+
+    def register(self, suspend):
+        """
+        开始等待 ``suspend.fd`` 就绪
+
+        :param suspend: 挂起对象
+        :return: None
+        """
+        with self.mutex:
+            self.waiting.setdefault(suspend.fd, []).append(suspend)
+            self.dirty.add(suspend.fd)
+            selecting = self.selecting
+
+        if selecting:
+            self.release()
+
+    def discard(self, suspend):
+        """
+        不再等待，例如超时，如果已经不在等待中，那么什么都不做
+
+        :param suspend: 挂起对象
+        :return: None
+        """
+        with self.mutex:
+            suspends = self.waiting.get(suspend.fd, None)
+            if suspends is None or suspend not in suspends:
+                return
+
+            suspends.remove(suspend)
+            if not suspends:
+                del self.waiting[suspend.fd]
+            self.dirty.add(suspend.fd)
+
+    def release(self):
+        """
+        唤醒正在 ``select`` 的线程，与 ``RunQueue`` 中的唤醒锁接口一致，所以可以被 ``RunQueue.park``
+
+        :return: None
+        """
+        try:
+            self.wake_writer.send(b"\0")
+        except (BlockingIOError, InterruptedError):
+            # 缓冲区已满，说明已经有足够的唤醒了
+            pass
+
+    def sync(self):
+        # 在持有mutex时调用，将等待的挂起对象同步到selector
+        selector, error_suspends = self.selector, []
+        for fd in self.dirty:
+            events = 0
+            for suspend in self.waiting.get(fd, ()):
+                events |= suspend.events
+
+            key = selector.get_map().get(fd, None)
+            try:
+                if not events:
+                    if key is not None:
+                        selector.unregister(fd)
+                elif key is None:
+                    selector.register(fd, events)
+                elif key.events != events:
+                    selector.modify(fd, events)
+            except (OSError, ValueError) as e:
+                # 文件描述符已经关闭或者不合法，等待他的协程会在yield处收到异常
+                error_suspends.extend((suspend, e) for suspend in self.waiting.pop(fd, ()))
+                if key is not None:
+                    selector.unregister(fd)
+        self.dirty.clear()
+        return error_suspends
+
+    def poll(self, time_out=None):
+        """
+        ``select`` 并唤醒就绪的挂起对象，需要在持有 ``poll_lock`` 时调用
+
+        :param time_out: ``select`` 的超时时长，None表示一直等待直到就绪或者被唤醒
+
+        :return: None
+        """
+        with self.mutex:
+            error_suspends = self.sync()
+            self.selecting = True
+
+        try:
+            ready = self.selector.select(time_out) if not error_suspends else self.selector.select(0)
+        finally:
+            with self.mutex:
+                self.selecting = False
+
+        for suspend, e in error_suspends:
+            suspend.resume(exception=e)
+
+        ready_suspends = []
+        with self.mutex:
+            for key, mask in ready:
+                if key.fileobj is self.wake_reader:
+                    self.drain()
+                    continue
+
+                suspends = self.waiting.get(key.fd, ())
+                remain = [suspend for suspend in suspends if not suspend.events & mask]
+                ready_suspends.extend(suspend for suspend in suspends if suspend.events & mask)
+                if remain:
+                    self.waiting[key.fd] = remain
+                else:
+                    self.waiting.pop(key.fd, None)
+                self.dirty.add(key.fd)
+
+        for suspend in ready_suspends:
+            suspend.resume()
+
+    def drain(self):
+        try:
+            while self.wake_reader.recv(4096):
+                pass
+        except (BlockingIOError, InterruptedError):
+            pass
+
+    def __bool__(self):
+        return bool(self.waiting)
+
+    def __len__(self):
+        return len(self.waiting)
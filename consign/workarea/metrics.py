@@ -0,0 +1,153 @@
+from bisect import bisect_left
+from time import perf_counter
+from multiprocessing.dummy import Lock
+
+
+# 直方图的桶上界（秒），从1微秒开始每个桶翻倍，最后一个桶约为35分钟
+_BUCKET_BOUNDS = tuple(1e-6 * 2 ** i for i in range(32))
+
+
+class Histogram(object):
+    """Histogram是固定分桶的耗时直方图，桶的上界从1微秒开始逐个翻倍
+
+    ``observe`` 只做一次二分查找和几次加法，不保存每一个观测值，所以可以一直开启
+
+    .. note::
+
+        ``Histogram`` 本身不加锁，由 ``WorkAreaMetrics`` 在持有锁时调用
+    """
+    __slots__ = ("buckets", "count", "total", "max")
+
+    def __init__(self):
+        self.buckets = [0] * (len(_BUCKET_BOUNDS) + 1)
+        self.count, self.total, self.max = 0, 0.0, 0.0
+
+    def observe(self, value):
+        self.buckets[bisect_left(_BUCKET_BOUNDS, value)] += 1
+        self.count += 1
+        self.total += value
+        if value > self.max:
+            self.max = value
+
+    def quantile(self, q):
+        """
+        :param float q: 0 到 1 之间的分位
+
+        :return: 分位所在桶的上界，没有观测值时返回0
+        """
+        if not self.count:
+            return 0.0
+        rank, seen = q * self.count, 0
+        for index, num in enumerate(self.buckets):
+            seen += num
+            if seen >= rank and num:
+                return _BUCKET_BOUNDS[index] if index < len(_BUCKET_BOUNDS) else self.max
+        return self.max
+
+    def snapshot(self):
+        """
+        :return: 包含 count、sum、mean、max、p50、p90、p99 的dict，单位为秒
+        """
+        return {
+            "count": self.count,
+            "sum": self.total,
+            "mean": self.total / self.count if self.count else 0.0,
+            "max": self.max,
+            "p50": self.quantile(0.5),
+            "p90": self.quantile(0.9),
+            "p99": self.quantile(0.99),
+        }
+
+
+class WorkAreaMetrics(object):
+    """WorkAreaMetrics是 ``WorkArea`` 的运行指标，通过 ``WorkArea.enable_metrics`` 开启
+
+    计数：
+
+        1. tasks_created：创建的 ``Task`` 数量
+
+        2. tasks_completed：完成的 ``Task`` 数量
+
+        3. steps：执行的步数
+
+    当前值（在 ``snapshot`` 时读取）：
+
+        1. queue_depth：队列中的数量
+
+        2. parked：被挂起的协程数量
+
+        3. workers：正在此区域 ``loop_work`` 的线程数量
+
+    直方图（秒）：
+
+        1. step_duration：每一步的执行耗时
+
+        2. queue_wait：每一步在队列中等待的时长，从放入队列到被取出
+
+        3. task_duration：``Task`` 从创建到完成的时长
+
+    未开启时 ``WorkArea.metrics`` 为None， ``Worker`` 与 ``Task`` 只多一次None的判断
+
+    :param WorkArea work_area: 所属的 ``WorkArea``
+    """
+
+    def __init__(self, work_area):
+        self.work_area = work_area
+        self.mutex = Lock()
+        self.started = perf_counter()
+        self.tasks_created = 0
+        self.tasks_completed = 0
+        self.steps = 0
+        self.step_duration = Histogram()
+        self.queue_wait = Histogram()
+        self.task_duration = Histogram()
+
+    def task_created(self):
+        with self.mutex:
+            self.tasks_created += 1
+
+    def task_completed(self, duration):
+        """
+        :param duration: ``Task`` 从创建到完成的时长，创建时未开启指标则为None
+        """
+        with self.mutex:
+            self.tasks_completed += 1
+            if duration is not None:
+                self.task_duration.observe(duration)
+
+    def step_done(self, queue_wait, duration):
+        """
+        :param queue_wait: 此步在队列中等待的时长，未知时为None
+        :param duration: 此步的执行耗时
+        """
+        with self.mutex:
+            self.steps += 1
+            self.step_duration.observe(duration)
+            if queue_wait is not None:
+                self.queue_wait.observe(queue_wait)
+
+    def snapshot(self):
+        """
+        获取当前指标的快照，可以直接序列化为JSON
+
+        :return: dict
+        """
+        work_area = self.work_area
+        with self.mutex:
+            uptime = perf_counter() - self.started
+            snapshot = {
+                "work_area": str(work_area.name),
+                "uptime": uptime,
+                "tasks_created": self.tasks_created,
+                "tasks_completed": self.tasks_completed,
+                "steps": self.steps,
+                "steps_per_sec": self.steps / uptime if uptime > 0 else 0.0,
+                "tasks_completed_per_sec": self.tasks_completed / uptime if uptime > 0 else 0.0,
+                "step_duration": self.step_duration.snapshot(),
+                "queue_wait": self.queue_wait.snapshot(),
+                "task_duration": self.task_duration.snapshot(),
+            }
+        snapshot["queue_depth"] = work_area.queue.qsize()
+        snapshot["parked"] = len(work_area.parking)
+        snapshot["workers"] = len(work_area.worker_idents)
+        return snapshot
@@ -0,0 +1,211 @@
+import marshal
+from functools import partial
+from threading import local
+from time import perf_counter, thread_time
+from multiprocessing.dummy import Lock
+
+
+def _label(func):
+    """
+    :param func: 协程的原函数或者被yield的callable
+
+    :return: (key, label) ，key用于归类，label是与 ``pstats`` 相同的 (文件名, 行号, 函数名)
+    """
+    # 绑定方法与partial归类到原函数，lambda等每次新建的函数归类到同一个code
+    target = func.func if isinstance(func, partial) else func
+    target = getattr(target, "__func__", None) or target
+    code = getattr(target, "__code__", None)
+    name = getattr(target, "__qualname__", None) or target.__class__.__qualname__
+    if code is None:
+        # 内置函数或者可调用的对象
+        return name, ("~", 0, "<{name}>".format(name=name))
+    return code, (code.co_filename, code.co_firstlineno, name)
+
+
+class ProfileEntry(object):
+    """ProfileEntry是 ``WorkAreaProfiler`` 中一个协程函数或者一个被yield的callable的累计
+
+    ``wall`` 与 ``cpu`` 包含了其中被yield的callable的耗时， ``inner`` 是callable耗时的部分
+    """
+    __slots__ = ("label", "steps", "wall", "cpu", "inner", "max_wall", "callers")
+
+    def __init__(self, label):
+        self.label = label
+        self.steps, self.wall, self.cpu, self.inner, self.max_wall = 0, 0.0, 0.0, 0.0, 0.0
+        #: 只有callable使用，yield他的协程函数的label: [次数, 耗时]
+        self.callers = {}
+
+    def add(self, wall, cpu, inner=0.0):
+        self.steps += 1
+        self.wall += wall
+        self.cpu += cpu
+        self.inner += inner
+        if wall > self.max_wall:
+            self.max_wall = wall
+
+    def as_dict(self):
+        file_name, line, name = self.label
+        return {
+            "name": name,
+            "file": file_name,
+            "line": line,
+            "steps": self.steps,
+            "wall": self.wall,
+            "cpu": self.cpu,
+            "own_wall": max(self.wall - self.inner, 0.0),
+            "max_step": self.max_wall,
+            "mean_step": self.wall / self.steps if self.steps else 0.0,
+        }
+
+
+class WorkAreaProfiler(object):
+    """WorkAreaProfiler是 ``WorkArea`` 的协程性能分析器，通过 ``WorkArea.enable_profiler`` 开启
+
+    以 ``ConsignOrder`` （即每一个被 ``coroutine`` 修饰的函数）为单位，记录他在Worker中执行的：
+
+        1. steps：执行的步数
+
+        2. wall：每一步的耗时之和，包含其中被yield的callable的耗时
+
+        3. cpu：每一步的线程CPU时间之和， ``wall`` 远大于 ``cpu`` 时说明他在Worker中阻塞了
+
+        4. own_wall：除去被yield的callable后协程本身的耗时
+
+        5. max_step：耗时最长的一步
+
+    被yield且在Worker中直接调用的callable单独记录，并记录是哪个协程函数yield了他
+
+    .. code-block:: python
+
+        profiler = work_area.enable_profiler()
+        ...
+        print(profiler.report())
+        profiler.dump_stats("consign.prof")  # python -m pstats consign.prof
+
+    .. note::
+
+        ``Worker`` 与 ``WorkArea`` 运行中也可以随时开启与关闭，开启后下一步开始生效
+
+    :param WorkArea work_area: 所属的 ``WorkArea``
+    """
+
+    def __init__(self, work_area):
+        self.work_area = work_area
+        self.mutex = Lock()
+        self.started = perf_counter()
+        #: 协程函数的key: ``ProfileEntry``
+        self.orders = {}
+        #: 被yield的callable的key: ``ProfileEntry``
+        self.callables = {}
+        # 每个线程当前这一步中callable的耗时
+        self._local = local()
+
+    def call(self, func, task):
+        """
+        调用被yield的callable并记录耗时，由 ``CoroutineWorker.dispatch`` 调用
+
+        :param func: 被yield的callable
+        :param Task task: yield他的协程的 ``Task``
+        :return: callable的返回值
+        """
+        start, cpu_start = perf_counter(), thread_time()
+        try:
+            return func()
+        finally:
+            wall, cpu = perf_counter() - start, thread_time() - cpu_start
+            self._local.inner = getattr(self._local, "inner", 0.0) + wall
+            key, label = _label(func)
+            caller_label = _label(task.order.consignor_func)[1]
+            with self.mutex:
+                entry = self.callables.get(key, None)
+                if entry is None:
+                    entry = self.callables[key] = ProfileEntry(label)
+                entry.add(wall, cpu)
+                caller = entry.callers.setdefault(caller_label, [0, 0.0])
+                caller[0] += 1
+                caller[1] += wall
+
+    def step_done(self, task, wall, cpu):
+        """
+        记录一步的耗时，由 ``CoroutineWorker.measured_step`` 调用
+
+        :param Task task: 此步执行的 ``Task``
+        :param wall: 此步的耗时
+        :param cpu: 此步的线程CPU时间
+        """
+        inner, self._local.inner = getattr(self._local, "inner", 0.0), 0.0
+        order = task.order
+        with self.mutex:
+            entry = self.orders.get(order, None)
+            if entry is None:
+                entry = self.orders[order] = ProfileEntry(_label(order.consignor_func)[1])
+            entry.add(wall, cpu, inner)
+
+    def reset(self):
+        """
+        清空已经记录的内容
+
+        :return: None
+        """
+        with self.mutex:
+            self.started = perf_counter()
+            self.orders, self.callables = {}, {}
+
+    def snapshot(self, sort_by="wall"):
+        """
+        :param str sort_by: 排序的字段，见 ``ProfileEntry.as_dict`` ，从大到小排序
+
+        :return: {"orders": [...], "callables": [...]} ，可以直接序列化为JSON
+        """
+        with self.mutex:
+            orders = [entry.as_dict() for entry in self.orders.values()]
+            callables = [entry.as_dict() for entry in self.callables.values()]
+        orders.sort(key=lambda item: item[sort_by], reverse=True)
+        callables.sort(key=lambda item: item[sort_by], reverse=True)
+        return {"work_area": str(self.work_area.name), "uptime": perf_counter() - self.started,
+                "orders": orders, "callables": callables}
+
+    def report(self, sort_by="wall", limit=None):
+        """
+        获取排序后的报告
+
+        :param str sort_by: 排序的字段，见 ``ProfileEntry.as_dict`` ，从大到小排序
+        :param int limit: 每个部分最多显示的行数，None表示全部显示
+        :return: str
+        """
+        snapshot = self.snapshot(sort_by)
+        lines = ["WorkArea {work_area} profile, {uptime:.3f}s".format(**snapshot)]
+        for title, items in (("coroutines", snapshot["orders"]), ("yielded callables", snapshot["callables"])):
+            lines.append("")
+            lines.append(title)
+            lines.append("{:>10} {:>12} {:>12} {:>12} {:>12}  {}".format(
+                "steps", "wall", "cpu", "own_wall", "max_step", "function"))
+            for item in items[:limit]:
+                lines.append("{steps:>10} {wall:>12.6f} {cpu:>12.6f} {own_wall:>12.6f} {max_step:>12.6f}  "
+                             "{file}:{line}({name})".format(**item))
+        return "\n".join(lines)
+
+    def stats(self):
+        """
+        获取与 ``pstats`` 相同格式的内容，tottime为 ``own_wall`` ，cumtime为 ``wall``
+
+        :return: {(文件名, 行号, 函数名): (步数, 步数, tottime, cumtime, callers)}
+        """
+        stats = {}
+        with self.mutex:
+            for entry in self.orders.values():
+                stats[entry.label] = (entry.steps, entry.steps, max(entry.wall - entry.inner, 0.0), entry.wall, {})
+            for entry in self.callables.values():
+                callers = {label: (num, num, wall, wall) for label, (num, wall) in entry.callers.items()}
+                stats[entry.label] = (entry.steps, entry.steps, entry.wall, entry.wall, callers)
+        return stats
+
+    def dump_stats(self, file_name):
+        """
+        将 ``stats`` 写入文件，可以使用 ``pstats.Stats(file_name)`` 或者 ``python -m pstats file_name`` 读取
+
+        :param str file_name: 文件名
+        :return: None
+        """
+        with open(file_name, "wb") as file:
+            marshal.dump(self.stats(), file)
@@ -0,0 +1,478 @@
+from collections import deque, OrderedDict
+from heapq import heappush, heappop, heapify
+from itertools import count
+from queue import Empty
+from threading import get_ident
+from time import monotonic
+from multiprocessing.dummy import Lock
+
+
+class RunQueue(object):
+    """RunQueue是 ``WorkArea`` 的运行队列，接口与 ``queue.Queue`` 保持一致（不限长度）
+
+    与 ``queue.Queue`` 不同的是， ``RunQueue`` 清楚的知道是哪一个线程在等待：
+
+        1. 空闲的线程挂起在各自的唤醒锁上，没有新的工作时 **不会被周期性的唤醒**
+
+        2. ``put`` 会立即唤醒一个挂起中的线程，新的工作不需要等待一个超时周期才被发现
+
+        3. ``wakeup`` 可以唤醒指定的线程，被唤醒的线程的 ``get`` 会抛出 ``Empty``
+
+           这被用于 ``wait`` 完成时、定时器的截止时间提前时、以及 ``stop`` 时
+
+    .. note::
+
+        如果 ``wakeup`` 时指定的线程并没有在等待，那么唤醒会被保留，直到这个线程下一次在空队列上 ``get``
+
+        这保证了检查条件与挂起之间的唤醒不会丢失，代价是偶尔一次无害的 ``Empty``
+
+    """
+
+    def __init__(self):
+        self.queue = deque()
+        self.mutex = Lock()
+        # 线程标识 -> 唤醒锁，按挂起的先后顺序排列
+        self.waiters = OrderedDict()
+        # 被唤醒但还没有响应的线程标识
+        self.interrupts = set()
+        # 不指定线程的唤醒发生时没有线程挂起，由下一个挂起的线程响应
+        self.pending_wakeup = False
+
+    def qsize(self):
+        return len(self.queue)
+
+    def empty(self):
+        return not self.queue
+
+    def put(self, item, block=True, timeout=None):
+        """
+        放入一个内容，并唤醒一个挂起中的线程
+
+        ``block`` 与 ``timeout`` 只是为了与 ``queue.Queue`` 接口保持一致，``RunQueue`` 不限长度，所以不会阻塞
+        """
+        with self.mutex:
+            self.queue.append(item)
+            if self.waiters:
+                self.waiters.popitem(last=False)[1].release()
+
+    def put_nowait(self, item):
+        return self.put(item, block=False)
+
+    def put_many(self, items):
+        """
+        一次放入多个内容，只获取一次锁，并唤醒至多相同数量的挂起中的线程
+
+        :param items: 按顺序放入的内容
+        :return: None
+        """
+        if not items:
+            return
+
+        with self.mutex:
+            self.queue.extend(items)
+            waiters = self.waiters
+            for _ in range(min(len(items), len(waiters))):
+                waiters.popitem(last=False)[1].release()
+
+    def get(self, block=True, timeout=None):
+        """
+        取出一个内容，队列为空时挂起直到有新的内容、超时或者被 ``wakeup`` 唤醒
+
+        :param bool block: 为False时不挂起，队列为空时立即抛出 ``Empty``
+
+        :param timeout: 挂起的最长时长，None表示一直挂起，<=0 时与 ``block`` 为False相同
+
+        :return: 队列中最早放入的内容
+
+        :raise Empty: 超时或者被 ``wakeup`` 唤醒时抛出
+        """
+        with self.mutex:
+            queue = self.queue
+            if not queue:
+                self.wait_not_empty(block, timeout)
+            return queue.popleft()
+
+    def get_many(self, max_num, block=True, timeout=None):
+        """
+        一次取出多个内容，只获取一次锁
+
+        队列为空时与 ``get`` 相同的挂起，不为空时立即返回，不会等待凑满 ``max_num`` 个
+
+        :param int max_num: 最多取出的数量
+
+        :param bool block: 与 ``get`` 相同
+
+        :param timeout: 与 ``get`` 相同
+
+        :return: 按放入顺序排列的列表，至少有一个内容
+
+        :raise Empty: 与 ``get`` 相同
+        """
+        with self.mutex:
+            queue = self.queue
+            if not queue:
+                self.wait_not_empty(block, timeout)
+
+            if len(queue) <= max_num:
+                items = list(queue)
+                queue.clear()
+                return items
+
+            popleft = queue.popleft
+            return [popleft() for _ in range(max_num)]
+
+    def remove_first(self, predicate):
+        """
+        取出最早放入的满足 ``predicate`` 的内容，用于 ``WorkArea`` 的 drop_oldest 策略
+
+        :param predicate: 接收一个内容，返回bool
+        :return: 被取出的内容，不存在时返回None
+        """
+        with self.mutex:
+            return _remove_first(self.queue, predicate)
+
+    def wait_not_empty(self, block, timeout):
+        # 在持有mutex时调用，挂起直到队列不为空，超时或者被唤醒时抛出Empty
+        if not block or (timeout is not None and timeout <= 0):
+            raise Empty
+
+        queue, ident = self.queue, get_ident()
+        endtime = None if timeout is None else monotonic() + timeout
+        while not queue:
+            if ident in self.interrupts:
+                self.interrupts.discard(ident)
+                raise Empty
+            if self.pending_wakeup:
+                self.pending_wakeup = False
+                raise Empty
+
+            remaining = -1
+            if endtime is not None:
+                remaining = endtime - monotonic()
+                if remaining <= 0:
+                    raise Empty
+
+            waiter = Lock()
+            waiter.acquire()
+            self.waiters[ident] = waiter
+            self.mutex.release()
+            try:
+                waiter.acquire(True, remaining)
+            finally:
+                self.mutex.acquire()
+                if self.waiters.get(ident) is waiter:
+                    del self.waiters[ident]
+
+    def get_nowait(self):
+        return self.get(block=False)
+
+    def park(self, waiter, ident=None):
+        """
+        在空队列上挂起一个外部的唤醒对象，用于无法阻塞线程的 ``Worker`` ，例如事件循环中的 ``AsyncioWorker``
+
+        唤醒对象与 ``get`` 中挂起的线程一样被 ``put`` 和 ``wakeup`` 唤醒，唤醒时调用他的 ``release`` 方法
+
+        :param waiter: 拥有 ``release`` 方法的唤醒对象， ``release`` 最多只会被调用一次
+
+        :param ident: 唤醒对象的标识，为None时使用当前线程的标识
+
+        :return:
+
+            返回bool类型，False 表示队列不为空或者已经被唤醒，唤醒对象没有被挂起
+        """
+        ident = get_ident() if ident is None else ident
+        with self.mutex:
+            if self.queue:
+                return False
+            if ident in self.interrupts:
+                self.interrupts.discard(ident)
+                return False
+            if self.pending_wakeup:
+                self.pending_wakeup = False
+                return False
+
+            self.waiters[ident] = waiter
+            return True
+
+    def unpark(self, waiter, ident=None):
+        """
+        取消 ``park`` 挂起的唤醒对象，如果他已经被唤醒了，那么什么都不做
+
+        :param waiter: ``park`` 时的唤醒对象
+
+        :param ident: ``park`` 时的标识，为None时使用当前线程的标识
+
+        :return: None
+        """
+        ident = get_ident() if ident is None else ident
+        with self.mutex:
+            if self.waiters.get(ident) is waiter:
+                del self.waiters[ident]
+
+    def wakeup(self, ident=None, keep=False):
+        """
+        唤醒挂起中的线程，被唤醒的线程的 ``get`` 会抛出 ``Empty``
+
+        :param ident:
+
+            需要唤醒的线程标识（ ``threading.get_ident`` ）
+
+            为None时唤醒最早挂起的一个线程，如果没有线程挂起，那么什么都不做
+
+        :param bool keep:
+
+            ``ident`` 为None且没有线程挂起时，是否把唤醒保留给下一个挂起的线程
+
+            用于定时器没有 ``watcher`` 时放入新的截止时间，刚检查过定时器、正要挂起的线程不会错过他
+
+        :return: None
+        """
+        with self.mutex:
+            if ident is None:
+                if not self.waiters:
+                    self.pending_wakeup = self.pending_wakeup or keep
+                    return
+                ident, waiter = self.waiters.popitem(last=False)
+            else:
+                waiter = self.waiters.pop(ident, None)
+
+            self.interrupts.add(ident)
+            if waiter is not None:
+                waiter.release()
+
+    def wakeup_all(self, idents=None):
+        """
+        一次唤醒多个线程
+
+        :param idents:
+
+            需要唤醒的线程标识的容器，与 ``wakeup`` 相同，没有在等待的线程会在下一次 ``get`` 时响应
+
+            为None时唤醒所有挂起中的线程
+
+        :return: None
+        """
+        with self.mutex:
+            waiters = self.waiters
+            for ident in tuple(waiters) if idents is None else idents:
+                self.interrupts.add(ident)
+                waiter = waiters.pop(ident, None)
+                if waiter is not None:
+                    waiter.release()
+
+
+def _remove_first(items, predicate):
+    for index, item in enumerate(items):
+        if predicate(item):
+            del items[index]
+            return item
+    return None
+
+
+class LocalRunQueue(RunQueue):
+    """LocalRunQueue是单线程 ``WorkArea`` 的运行队列，基于 ``RunQueue`` ，接口一致
+
+    当 ``WorkArea`` 只由一个线程消费时（例如只有一个 ``CoroutineWorker().loop_work()`` ），每次存取都加锁是不必要的
+
+    ``LocalRunQueue`` 将内容分成两部分：
+
+        1. ``local`` ：消费线程自己放入的内容，这是绝大多数的内容，存取都 **不加锁**
+
+        2. ``queue`` ：其他线程放入的内容，与 ``RunQueue`` 相同的加锁放入，消费线程取出时一次转移到 ``local``
+
+    消费线程会在第一次取出内容时被绑定，之后其他线程只能放入内容，不能取出
+
+    .. warning::
+
+        其他线程的 ``get`` / ``get_many`` / ``park`` 会抛出 ``RuntimeError`` ，包括在其他线程中 ``wait`` 此区域的 ``Task``
+
+        需要多个线程消费时，请使用默认的 ``RunQueue``
+
+    """
+
+    def __init__(self):
+        super(LocalRunQueue, self).__init__()
+        #: 消费线程的本地队列，只有消费线程会访问
+        self.local = deque()
+        #: 消费线程的标识，第一次取出内容时绑定
+        self.owner = None
+
+    def bind(self):
+        """
+        将当前线程绑定为消费线程，已经绑定时检查当前线程是否为消费线程
+
+        :return: None
+
+        :raise RuntimeError: 当前线程不是消费线程时抛出
+        """
+        ident = get_ident()
+        if self.owner is None:
+            with self.mutex:
+                if self.owner is None:
+                    self.owner = ident
+        if self.owner != ident:
+            raise RuntimeError("单线程的队列只能由线程 {owner} 取出内容，当前线程为 {ident}".format(
+                owner=self.owner, ident=ident))
+
+    def transfer(self):
+        """
+        将其他线程放入的内容转移到本地队列，只能由消费线程调用
+
+        :return: None
+        """
+        if self.queue:
+            with self.mutex:
+                self.local.extend(self.queue)
+                self.queue.clear()
+
+    def qsize(self):
+        return len(self.local) + len(self.queue)
+
+    def empty(self):
+        return not self.local and not self.queue
+
+    def put(self, item, block=True, timeout=None):
+        # 只有消费线程自己会挂起，所以消费线程放入时如果没有挂起的唤醒对象，那么无需加锁和唤醒
+        if self.owner == get_ident() and not self.waiters:
+            self.local.append(item)
+        else:
+            super(LocalRunQueue, self).put(item)
+
+    def put_many(self, items):
+        if self.owner == get_ident() and not self.waiters:
+            self.local.extend(items)
+        else:
+            super(LocalRunQueue, self).put_many(items)
+
+    def get(self, block=True, timeout=None):
+        if self.owner != get_ident():
+            self.bind()
+        local = self.local
+        if self.queue:
+            self.transfer()
+        if local:
+            return local.popleft()
+
+        with self.mutex:
+            queue = self.queue
+            if not queue:
+                self.wait_not_empty(block, timeout)
+            return queue.popleft()
+
+    def get_many(self, max_num, block=True, timeout=None):
+        if self.owner != get_ident():
+            self.bind()
+        local = self.local
+        self.transfer()
+        if not local:
+            with self.mutex:
+                if not self.queue:
+                    self.wait_not_empty(block, timeout)
+            self.transfer()
+
+        if len(local) <= max_num:
+            items = list(local)
+            local.clear()
+            return items
+
+        popleft = local.popleft
+        return [popleft() for _ in range(max_num)]
+
+    def park(self, waiter, ident=None):
+        if self.owner != get_ident():
+            self.bind()
+        if self.local:
+            return False
+        return super(LocalRunQueue, self).park(waiter, ident)
+
+    def remove_first(self, predicate):
+        # 本地队列只有消费线程可以访问，其他线程只能取出他们放入的内容
+        if self.owner == get_ident():
+            item = _remove_first(self.local, predicate)
+            if item is not None:
+                return item
+        return super(LocalRunQueue, self).remove_first(predicate)
+
+
+class PriorityDeque(object):
+    """PriorityDeque是按优先级排列的队列，拥有 ``RunQueue`` 用到的 ``deque`` 的方法，用于 ``PriorityRunQueue``
+
+    队列中的内容是 ``Task`` ，优先级来自 ``task.priority`` ，数值越大越先取出
+
+    同一优先级内先进先出，约定的停止信号没有 ``Task`` ，视为优先级0
+
+    :param aging:
+
+        老化间隔，默认为None，表示不老化，高优先级的内容总是先取出
+
+        为int时，内容每被之后放入的 ``aging`` 个内容越过，优先级就相当于提升一级
+
+        所以低优先级的内容最多等待 (优先级之差 * ``aging`` ) 个之后放入的内容，不会被饿死
+    """
+
+    def __init__(self, aging=None):
+        assert aging is None or aging > 0, "aging 需要是正整数或者None"
+        self.heap, self.aging, self.counter = [], aging, count()
+
+    def append(self, item):
+        priority = 0 if item is None else item.priority
+        seq = next(self.counter)
+        # 不老化时按(-优先级, 放入顺序)排列
+        # 老化时的有效优先级为 priority + (当前计数 - seq) / aging ，当前计数对所有内容相同，所以可以按 seq - priority * aging 排列
+        key = -priority if self.aging is None else seq - priority * self.aging
+        heappush(self.heap, (key, seq, item))
+
+    def extend(self, items):
+        for item in items:
+            self.append(item)
+
+    def popleft(self):
+        return heappop(self.heap)[2]
+
+    def remove_first(self, predicate):
+        """
+        取出最早放入的满足 ``predicate`` 的内容，与优先级无关
+
+        :param predicate: 接收一个内容，返回bool
+        :return: 被取出的内容，不存在时返回None
+        """
+        heap = self.heap
+        matched = [(seq, index) for index, (_, seq, item) in enumerate(heap) if predicate(item)]
+        if not matched:
+            return None
+        index = min(matched)[1]
+        item = heap[index][2]
+        heap[index] = heap[-1]
+        heap.pop()
+        heapify(heap)
+        return item
+
+    def clear(self):
+        self.heap.clear()
+
+    def __iter__(self):
+        # 按取出的顺序
+        return (item for _, _, item in sorted(self.heap))
+
+    def __len__(self):
+        return len(self.heap)
+
+    def __bool__(self):
+        return bool(self.heap)
+
+
+class PriorityRunQueue(RunQueue):
+    """PriorityRunQueue是优先级队列的 ``WorkArea`` 的运行队列，基于 ``RunQueue`` ，接口一致
+
+    内容按 ``Task`` 的优先级取出，同一优先级内先进先出，更多详情请查看 ``PriorityDeque``
+
+    :param aging: 老化间隔，与 ``PriorityDeque`` 相同
+    """
+
+    def __init__(self, aging=None):
+        super(PriorityRunQueue, self).__init__()
+        self.queue = PriorityDeque(aging)
+
+    def remove_first(self, predicate):
+        with self.mutex:
+            return self.queue.remove_first(predicate)
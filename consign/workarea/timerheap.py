@@ -0,0 +1,122 @@
+from heapq import heappush, heappop
+from itertools import count
+from threading import get_ident
+from time import monotonic
+from multiprocessing.dummy import Lock
+
+
+class TimerHeap(object):
+    """TimerHeap是按截止时间排序的定时器堆，每个 ``WorkArea`` 拥有一个
+
+    ``TimerHeap`` 中存放的是被挂起的对象（通常是 ``Suspend`` ），他们会在截止时间到达后被 ``Worker`` 取出并唤醒
+
+    与不断切换控制权的轮询不同，被存放在 ``TimerHeap`` 中的对象不会出现在 ``WorkArea`` 的队列中
+
+    所以休眠中的协程 **不会占用任何一次Work**
+
+    .. note::
+
+        同一截止时间的对象按照放入的先后顺序取出
+
+    同一时刻只有一个线程（ ``watcher`` ）会按照最早的截止时间挂起等待，其余空闲的线程不会因定时器被反复唤醒
+
+    """
+
+    def __init__(self):
+        self.heap = []
+        self.mutex = Lock()
+        # 使用计数器作为第二排序键，保证同一截止时间下先进先出，同时避免比较被存放的对象
+        self.counter = count()
+        # 负责按照最早的截止时间挂起等待的线程标识
+        self.watcher = None
+
+    def push(self, deadline, something):
+        """
+        放入一个对象，并在 ``deadline`` 到达后可以被 ``pop_expired`` 取出
+
+        :param float deadline: 截止时间，以 ``time.monotonic`` 为准
+
+        :param something: 被存放的对象
+
+        :return:
+
+            返回bool类型，True 表示放入的对象成为了最早到期的对象
+        """
+        with self.mutex:
+            heappush(self.heap, (deadline, next(self.counter), something))
+            return self.heap[0][2] is something
+
+    def pop_expired(self, now=None):
+        """
+        取出所有已经到期的对象
+
+        :param float now: 当前时间，为None时使用 ``time.monotonic``
+
+        :return: 已经到期的对象列表，按到期的先后排序
+        """
+        now = monotonic() if now is None else now
+        expired = []
+        with self.mutex:
+            heap = self.heap
+            while heap and heap[0][0] <= now:
+                expired.append(heappop(heap)[2])
+        return expired
+
+    def next_deadline(self):
+        """
+        :return: 最早的截止时间，当没有存放对象时返回None
+        """
+        with self.mutex:
+            return self.heap[0][0] if self.heap else None
+
+    def time_out(self, time_out=None):
+        """
+        根据最早的截止时间修正等待的超时时长
+
+        :param time_out: 原本的超时时长，None表示无限等待
+
+        :return: 不会超过最早截止时间的超时时长，当没有存放对象时原样返回
+        """
+        deadline = self.next_deadline()
+        if deadline is None:
+            return time_out
+
+        remaining = max(deadline - monotonic(), 0)
+        return remaining if time_out is None else min(time_out, remaining)
+
+    def watch(self):
+        """
+        尝试让当前线程负责按照最早的截止时间等待
+
+        :return: 返回bool类型，True 表示当前线程是 ``watcher``
+        """
+        ident = get_ident()
+        with self.mutex:
+            if self.watcher is None or self.watcher == ident:
+                self.watcher = ident
+                return True
+            return False
+
+    def unwatch(self):
+        """
+        如果当前线程是 ``watcher`` ，那么放弃负责等待
+
+        :return:
+
+            返回bool类型，True 表示依旧存在定时器，需要唤醒另一个挂起中的线程接替等待
+        """
+        if self.watcher is None:
+            return False
+
+        ident = get_ident()
+        with self.mutex:
+            if self.watcher != ident:
+                return False
+            self.watcher = None
+            return bool(self.heap)
+
+    def __len__(self):
+        return len(self.heap)
+
+    def __bool__(self):
+        return bool(self.heap)
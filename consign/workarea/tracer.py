@@ -0,0 +1,187 @@
+import os
+import json
+from collections import deque
+from itertools import count
+from threading import get_ident, current_thread
+from time import perf_counter
+
+
+def _task_name(task):
+    func = task.order.consignor_func
+    return getattr(func, "__qualname__", None) or str(func)
+
+
+class WorkAreaTracer(object):
+    """WorkAreaTracer是 ``WorkArea`` 的时间线记录器，通过 ``WorkArea.enable_tracer`` 开启
+
+    记录每一个 ``Task`` 的：
+
+        1. 创建
+
+        2. 每一步的开始与结束，以及执行他的线程
+
+        3. 挂起（ ``asleep`` 、 ``Suspend`` 、 ``chain_reaction`` 等）与唤醒
+
+        4. 完成
+
+    以及 ``wait`` 的等待时长，创建、唤醒到下一步之间以箭头（flow）相连，可以看到父协程创建的子协程在哪个线程上开始执行
+
+    ``dump`` 输出Chrome trace-event格式的JSON，可以在 chrome://tracing 或者 https://ui.perfetto.dev 中打开
+
+    .. code-block:: python
+
+        tracer = work_area.enable_tracer()
+        ...
+        tracer.dump("consign.trace.json")
+
+    .. note::
+
+        记录存放在固定长度的环形缓冲中，超出 ``capacity`` 时最早的记录被丢弃，长时间运行也不会无限增长
+
+    :param WorkArea work_area: 所属的 ``WorkArea``
+
+    :param int capacity: 最多保留的记录数量
+    """
+
+    def __init__(self, work_area, capacity=100000):
+        assert capacity > 0, "capacity 必须大于0"
+        self.work_area = work_area
+        self.capacity = capacity
+        self.started = perf_counter()
+        # (ph, name, cat, ts, dur, tid, task_id, args)，导出时才转换为dict
+        self.records = deque(maxlen=capacity)
+        #: 线程标识: 线程名
+        self.thread_names = {}
+        # Task的id: 等待下一步连接的flow的id
+        self.pending_flows = {}
+        self.flow_ids = count(1)
+
+    def record(self, ph, name, cat, ts, dur=None, task=None, args=None):
+        tid = get_ident()
+        if tid not in self.thread_names:
+            self.thread_names[tid] = current_thread().name
+        # deque.append 是原子的，无需加锁
+        self.records.append((ph, name, cat, ts, dur, tid, None if task is None else id(task), args))
+
+    def flow_from(self, task, cat):
+        """
+        从当前位置发出一个flow，在 ``task`` 的下一步开始时结束
+        """
+        flow_id = next(self.flow_ids)
+        self.pending_flows[id(task)] = flow_id
+        self.record("s", cat, cat, perf_counter(), args=flow_id)
+
+    def task_created(self, task):
+        """
+        由 ``Task`` 创建时调用
+
+        :param Task task: 新的 ``Task``
+        """
+        self.record("i", "create", "task", perf_counter(), task=task, args=_task_name(task))
+        self.flow_from(task, "create")
+
+    def task_done(self, task):
+        """
+        由 ``Task.finish`` 调用
+
+        :param Task task: 完成的 ``Task``
+        """
+        self.record("i", "done", "task", perf_counter(), task=task, args=_task_name(task))
+        # 在其他协程的步中完成时（例如 chain_reaction 的父协程）没有下一步，丢弃未连接的flow
+        self.pending_flows.pop(id(task), None)
+
+    def step_begin(self, task, start):
+        """
+        由 ``CoroutineWorker.measured_step`` 在每一步开始前调用，连接指向此步的flow
+
+        :param Task task: 此步执行的 ``Task``
+        :param start: 开始的时间，以 ``time.perf_counter`` 为准
+        """
+        flow_id = self.pending_flows.pop(id(task), None)
+        if flow_id is not None:
+            self.record("f", "flow", "flow", start, task=task, args=flow_id)
+
+    def step_done(self, task, start, end):
+        """
+        由 ``CoroutineWorker.measured_step`` 调用，记录一步的开始与结束
+
+        :param Task task: 此步执行的 ``Task``
+        :param start: 开始的时间，以 ``time.perf_counter`` 为准
+        :param end: 结束的时间
+        """
+        self.record("X", _task_name(task), "step", start, end - start, task=task)
+
+    def park(self, task, reason):
+        """
+        协程被挂起时调用
+
+        :param Task task: 被挂起的 ``Task``
+        :param str reason: 挂起的原因，例如 ``SleepUntil`` 或者 ``chain_reaction``
+        """
+        self.record("i", "park", reason, perf_counter(), task=task, args=reason)
+
+    def wake(self, task, reason):
+        """
+        协程被唤醒并重新放入队列时调用
+
+        :param Task task: 被唤醒的 ``Task``
+        :param str reason: 与 ``park`` 相同
+        """
+        self.record("i", "wake", reason, perf_counter(), task=task, args=reason)
+        self.flow_from(task, reason)
+
+    def span(self, name, start, end, task=None):
+        """
+        记录当前线程上的一段时间，例如 ``wait``
+
+        :param str name: 名字
+        :param start: 开始的时间，以 ``time.perf_counter`` 为准
+        :param end: 结束的时间
+        :param Task task: 相关的 ``Task``
+        """
+        self.record("X", name, "wait", start, end - start, task=task)
+
+    def clear(self):
+        """
+        清空已经记录的内容
+
+        :return: None
+        """
+        self.records.clear()
+        self.pending_flows.clear()
+
+    def events(self):
+        """
+        :return: Chrome trace-event 格式的事件列表，时间单位为微秒
+        """
+        pid, started = os.getpid(), self.started
+        events = [{"ph": "M", "name": "process_name", "pid": pid, "tid": 0,
+                   "args": {"name": "WorkArea {name}".format(name=self.work_area.name)}}]
+        events.extend({"ph": "M", "name": "thread_name", "pid": pid, "tid": tid, "args": {"name": name}}
+                      for tid, name in list(self.thread_names.items()))
+
+        for ph, name, cat, ts, dur, tid, task_id, args in list(self.records):
+            event = {"ph": ph, "name": name, "cat": cat, "ts": (ts - started) * 1e6, "pid": pid, "tid": tid}
+            if ph == "X":
+                event["dur"] = dur * 1e6
+                event["args"] = {"task": hex(task_id)} if task_id is not None else {}
+            elif ph == "i":
+                event["s"] = "t"
+                event["args"] = {"task": hex(task_id), "detail": args}
+            else:
+                # flow的开始与结束，结束时绑定到包含他的下一步
+                event["id"] = args
+                if ph == "f":
+                    event["bp"] = "e"
+            events.append(event)
+        return events
+
+    def dump(self, file_name):
+        """
+        将 ``events`` 以 Chrome trace-event 格式写入文件
+
+        :param str file_name: 文件名
+        :return: None
+        """
+        with open(file_name, "w", encoding="utf-8") as file:
+            json.dump({"traceEvents": self.events(), "displayTimeUnit": "ms"}, file)
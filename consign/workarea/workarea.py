@@ -1,6 +1,6 @@
 import builtins
 
-from queue import Queue, LifoQueue
+from queue import LifoQueue
 # from multiprocessing import Queue
 from functools import wraps
 from contextvars import ContextVar
@@ -8,6 +8,14 @@ from threading import currentThread  # , Lock
 from multiprocessing.dummy import Lock
 # from multiprocessing.dummy import current_process
 
+from .timerheap import TimerHeap
+from .runqueue import RunQueue, LocalRunQueue, PriorityRunQueue
+from .iopoller import IOPoller
+from .metrics import WorkAreaMetrics
+from .profiler import WorkAreaProfiler
+from .tracer import WorkAreaTracer
+from .admission import Admission
+
 
 # _instance_dict 在init中被取别名为 WORK_AREA_DICT 并置入 builtins
 _instance_dict = {}
@@ -120,13 +128,114 @@ class WorkArea(metaclass=SameNameSingleton):
 
             为了减少意料之外的事情发生，建议输入是str
 
+    :param bool single_thread:
+
+        single_thread是显式参数，需要显式调用
+
+        为True时使用单线程的 ``LocalRunQueue`` ，此区域只能由一个线程消费（例如只有一个 ``CoroutineWorker().loop_work()`` ）
+
+        消费线程的存取不加锁，``loop_work`` 也会使用无锁的 ``work_local`` ，其他线程依旧可以提交协程
+
+        .. tip::
+
+            与 ``name`` 一样只在第一次创建时生效，同名的 ``WorkArea`` 已经存在时不会改变他的队列
+
+    :param bool prioritized:
+
+        prioritized是显式参数，需要显式调用
+
+        为True时使用优先级队列 ``PriorityRunQueue`` ，按 ``Task`` 的优先级（ ``coroutine(priority=...)`` ）执行，同一优先级内先进先出
+
+        不能与 ``single_thread`` 同时使用
+
+    :param int aging:
+
+        aging是显式参数，需要显式调用，只在 ``prioritized`` 为True时生效
+
+        老化间隔，默认为None表示不老化，为int时低优先级的内容每被之后放入的 ``aging`` 个内容越过，优先级就提升一级，不会被饿死
+
+    :param bool metrics:
+
+        metrics是显式参数，需要显式调用
+
+        为True时开启运行指标，也可以之后通过 ``enable_metrics`` 开启，详情请查看 ``enable_metrics``
+
+    :param bool profiler:
+
+        profiler是显式参数，需要显式调用
+
+        为True时开启性能分析，也可以之后通过 ``enable_profiler`` 开启，详情请查看 ``enable_profiler``
+
+    :param bool tracer:
+
+        tracer是显式参数，需要显式调用
+
+        为True时开启时间线记录，也可以之后通过 ``enable_tracer`` 开启，详情请查看 ``enable_tracer``
+
+    :param int capacity:
+
+        capacity是显式参数，需要显式调用
+
+        已经提交但还没有开始执行的新 ``Task`` 的最大数量，默认为None表示不限制，详情请查看 ``Admission``
+
+        已经开始执行的协程的后续步骤不受限制，所以生产者与消费者都是协程时也不会卡死
+
+    :param str overflow:
+
+        overflow是显式参数，需要显式调用，只在 ``capacity`` 不为None时生效
+
+        名额已满时新的调用如何处理：
+
+            1. "block"：默认，阻塞直到有空位，期间参与此区域的工作；协程中请使用 ``yield admit(func, *args)``
+
+            2. "reject"：抛出 ``queue.Full``
+
+            3. "drop_oldest"：丢弃队列中最早的还没有开始的 ``Task`` ，被丢弃的 ``Task`` 以 ``queue.Full`` 被取消
+
+    :raise AssertionError:
+        当 ``single_thread`` 与 ``prioritized`` 同时为True时抛出
+
+        当 ``capacity`` 小于1或者 ``overflow`` 不正确时抛出
+
     """
 
-    def __init__(self, name: str="DEFAULT_WORK_AREA"):
+    def __init__(self, name: str="DEFAULT_WORK_AREA", *, single_thread: bool=False, prioritized: bool=False,
+                 aging: int=None, metrics: bool=False, profiler: bool=False,
+                 tracer: bool=False, capacity: int=None, overflow: str="block"):
+        assert not (single_thread and prioritized), "single_thread 与 prioritized 不能同时使用"
         self.name = name
+        #: 是否是单线程的区域
+        self.single_thread = single_thread
         self.show_str = "<'{name}' Work at {work_area_id}".format(name=name, work_area_id=hex(id(self)))
         # win 环境下 multiprocessing 的 Queue 无法序列化 generator，所以暂时没有办法做适配，期待下版本更新
-        self.queue = Queue()
+        # RunQueue与Queue接口一致，但空闲的线程不会被周期性的唤醒，且可以被指定唤醒
+        # 单线程的区域使用LocalRunQueue，消费线程的存取不加锁；优先级的区域使用PriorityRunQueue
+        if single_thread:
+            self.queue = LocalRunQueue()
+        elif prioritized:
+            self.queue = PriorityRunQueue(aging)
+        else:
+            self.queue = RunQueue()
+        # 定时器堆，存放休眠中的协程，他们在截止时间到达前不会进入队列
+        self.timer = TimerHeap()
+        # 被挂起的协程（Suspend），挂起期间既不在队列中也不会被轮询
+        self.parking = set()
+        # 正在驱动此区域的事件循环，由 AsyncioWorker 设置，yield asyncio的协程时会在此事件循环中执行
+        self.event_loop = None
+        # io就绪等待器，在第一次等待io时才会被创建
+        self.io_poller = None
+        # 延迟创建io_poller、metrics、profiler与tracer时使用
+        self._lazy_lock = Lock()
+        # 正在此区域loop_work的线程标识
+        self.worker_idents = set()
+        # 运行指标，未开启时为None
+        self.metrics = WorkAreaMetrics(self) if metrics else None
+        # 性能分析器，未开启时为None
+        self.profiler = WorkAreaProfiler(self) if profiler else None
+        # 时间线记录器，未开启时为None
+        self.tracer = WorkAreaTracer(self) if tracer else None
+        # 新Task的准入限制，未设置capacity时为None
+        self.admission = Admission(self, capacity, overflow) if capacity is not None else None
         # 使用LifoQueue先进后出队列是为了兼容 同名区域单例模式下 被嵌套的情况
         # 使用ContextVar上下文变量是为了兼容 同名区域单例模式下 多线程中队列顺序冲突的情况
         self.old_work_area_queue = ContextVar("{name}_LifoQueue".format(name=name), default=None)
@@ -157,6 +266,116 @@ class WorkArea(metaclass=SameNameSingleton):
         # builtins.DEFAULT_WORK_AREA.reset(self.old_work_area)
         builtins.DEFAULT_WORK_AREA.reset(self.old_work_area_queue.get().get_nowait())
 
+    def get_io_poller(self):
+        """
+        获取此 ``WorkArea`` 的io就绪等待器，不存在时创建
+
+        :return: ``IOPoller``
+        """
+        if self.io_poller is None:
+            with self._lazy_lock:
+                if self.io_poller is None:
+                    self.io_poller = IOPoller()
+        return self.io_poller
+
+    def enable_metrics(self):
+        """
+        开启运行指标，已经开启时保留原有的指标
+
+        开启后可以通过 ``metrics.snapshot()`` 获取快照，包括创建、完成的 ``Task`` 数量与执行的步数，
+
+        队列中的数量、被挂起的协程数量、工作中的线程数量，以及每一步的耗时、在队列中的等待时长、 ``Task`` 从创建到完成的时长
+
+        .. code-block:: python
+
+            work_area = WorkArea("my_area")
+            metrics = work_area.enable_metrics()
+            ...
+            print(metrics.snapshot())
+
+        .. note::
+
+            开启前创建的 ``Task`` 不会记录从创建到完成的时长
+
+        :return: ``WorkAreaMetrics``
+        """
+        with self._lazy_lock:
+            if self.metrics is None:
+                self.metrics = WorkAreaMetrics(self)
+        return self.metrics
+
+    def disable_metrics(self):
+        """
+        关闭运行指标，关闭后 ``Worker`` 与 ``Task`` 不再有额外的开销
+
+        :return: 关闭前的 ``WorkAreaMetrics`` ，未开启时返回None
+        """
+        metrics, self.metrics = self.metrics, None
+        return metrics
+
+    def enable_profiler(self):
+        """
+        开启性能分析，已经开启时保留原有的记录
+
+        开启后以每个被 ``coroutine`` 修饰的函数为单位记录执行的步数、耗时、CPU时间与耗时最长的一步，
+
+        被yield且在Worker中直接调用的callable单独记录，可以在运行中随时开启与关闭
+
+        .. code-block:: python
+
+            profiler = work_area.enable_profiler()
+            ...
+            print(profiler.report())
+            profiler.dump_stats("consign.prof")
+
+        :return: ``WorkAreaProfiler``
+        """
+        with self._lazy_lock:
+            if self.profiler is None:
+                self.profiler = WorkAreaProfiler(self)
+        return self.profiler
+
+    def disable_profiler(self):
+        """
+        关闭性能分析，关闭后 ``Worker`` 不再有额外的开销
+
+        :return: 关闭前的 ``WorkAreaProfiler`` ，未开启时返回None
+        """
+        profiler, self.profiler = self.profiler, None
+        return profiler
+
+    def enable_tracer(self, capacity: int=100000):
+        """
+        开启时间线记录，已经开启时保留原有的记录
+
+        开启后记录每个 ``Task`` 的创建、每一步的开始与结束以及所在的线程、挂起与唤醒、完成，
+
+        可以输出为Chrome trace-event格式，在 chrome://tracing 或者 https://ui.perfetto.dev 中查看协程在各线程上的交错
+
+        .. code-block:: python
+
+            tracer = work_area.enable_tracer()
+            ...
+            tracer.dump("consign.trace.json")
+
+        :param int capacity: 环形缓冲最多保留的记录数量，超出时最早的记录被丢弃，只在此次开启时生效
+
+        :return: ``WorkAreaTracer``
+        """
+        with self._lazy_lock:
+            if self.tracer is None:
+                self.tracer = WorkAreaTracer(self, capacity)
+        return self.tracer
+
+    def disable_tracer(self):
+        """
+        关闭时间线记录，关闭后 ``Worker`` 与 ``Task`` 不再有额外的开销
+
+        :return: 关闭前的 ``WorkAreaTracer`` ，未开启时返回None
+        """
+        tracer, self.tracer = self.tracer, None
+        return tracer
+
     @staticmethod
     def as_default():
         """
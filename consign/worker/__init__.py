@@ -1,3 +1,8 @@
 from .coroutineworker import CoroutineWorker
 from .wait import wait, Supervisor
 from .asyncworker import AsyncWorker
+from .autoscaler import AutoScaler, ScaleEvent
+from .suspend import Suspend
+from .processworker import ProcessWorker
+from .asyncioworker import AsyncioWorker
+from .limit import Semaphore, TokenBucket, admit
@@ -0,0 +1,138 @@
+from asyncio import get_event_loop, Event, sleep, wait_for, TimeoutError
+from queue import Empty
+from threading import get_ident
+
+from .coroutineworker import CoroutineWorker
+
+
+class LoopWaker(object):
+    """
+    挂起在 ``RunQueue`` 上的唤醒对象，被唤醒时通知事件循环
+
+    :param loop: 事件循环
+    :param Event event: 被唤醒时设置的asyncio ``Event``
+    """
+
+    def __init__(self, loop, event):
+        self.loop, self.event = loop, event
+
+    def release(self):
+        # RunQueue可能在任意线程中唤醒，所以通过call_soon_threadsafe交给事件循环
+        self.loop.call_soon_threadsafe(self.event.set)
+
+
+class AsyncioWorker(CoroutineWorker):
+    """AsyncioWorker事件循环协程Worker，AsyncioWorker能够在asyncio的事件循环中执行 ``WorkArea`` 中的协程，基于CoroutineWorker
+
+    ``AsyncioWorker`` 不创建任何线程，他作为事件循环中的一个asyncio协程工作：
+
+        1. 每执行 ``step_num`` 次Work就让出一次事件循环，事件循环中的其他协程不会被饿死
+
+        2. 队列为空时挂起在 ``WorkArea`` 的队列上， **不会轮询** ，有新的工作或者定时器到期时才会被唤醒
+
+    配合 ``AsyncioWorker`` ，consign与asyncio可以直接交互而无需线程或者 ``wait`` ：
+
+        1. 协程中可以直接yield asyncio 的 ``Future`` 或者 ``async def`` 协程，协程被挂起直到他们完成
+
+        2. asyncio的协程中可以直接await ``Task``
+
+    ----
+
+    例子
+
+    .. code-block:: python
+
+        @coroutine
+        def my_test():
+            yield asyncio.sleep(1)
+            return "my_test"
+
+        async def main():
+            worker = AsyncioWorker()
+            asyncio.ensure_future(worker.loop_work_async())
+            print(await my_test())
+            worker.stop()
+
+    :param str work_area_name:
+
+        ``WorkArea`` 的名字，``AsyncioWorker`` 会通过名字获取对应的 ``WorkArea``
+
+    :param WorkArea work_area:
+
+        work_area是显式参数，需要显式调用
+
+        可以直接指定 ``WorkArea`` ，如果直接指定，会跳过 ``work_area_name`` 的查找过程
+
+    :param int step_num: 每执行多少次Work让出一次事件循环
+
+    :raise AssertionError:
+        当传入参数 ``work_area_name`` 无法被找到时抛出
+
+    """
+
+    def __init__(self, work_area_name: str = "DEFAULT_WORK_AREA", *, work_area=None, step_num: int = 100):
+        super(AsyncioWorker, self).__init__(work_area_name, work_area=work_area)
+        self.show_str = "<AsyncioWorker at {work_id} work in {work_area}>".format(
+            work_id=hex(id(self)), work_area=self.work_area)
+        self.step_num = step_num
+
+    async def loop_work_async(self, *, forever=True):
+        """
+        在当前的事件循环中工作，直到收到停止信号或者 ``stop``
+
+        ``loop_work_async`` 是asyncio的协程，需要被await或者交给事件循环，例如 ``asyncio.ensure_future``
+
+        :param forever:
+
+            是否永久工作
+
+            如果 ``forever`` 为False，当队列为空且没有被挂起的协程时退出
+
+        :return: None
+        """
+        loop = get_event_loop()
+        work_area, ident = self.work_area, get_ident()
+        queue, timer, parking = work_area.queue, work_area.timer, work_area.parking
+        wake_event = Event()
+        waker = LoopWaker(loop, wake_event)
+
+        work_area.event_loop = loop
+        self.loop_idents.add(ident)
+        work_area.worker_idents.add(ident)
+        try:
+            while not self.stop_flag:
+                for _ in range(self.step_num):
+                    try:
+                        if self.work_once(0) is False:
+                            # 约定的停止信号
+                            return
+                    except Empty:
+                        break
+                    except StopIteration:
+                        pass
+                else:
+                    # 执行满一轮，让出事件循环
+                    await sleep(0)
+                    continue
+
+                if not forever and queue.qsize() <= 0 and len(parking) <= 0:
+                    return
+
+                # 队列为空，挂起直到有新的工作、定时器到期或者被唤醒
+                wake_event.clear()
+                time_out = self.wake_timer(None)
+                if queue.park(waker):
+                    try:
+                        await wait_for(wake_event.wait(), time_out)
+                    except TimeoutError:
+                        pass
+                    finally:
+                        queue.unpark(waker)
+
+                if timer.unwatch():
+                    queue.wakeup()
+        finally:
+            self.loop_idents.discard(ident)
+            work_area.worker_idents.discard(ident)
+            if work_area.event_loop is loop:
+                work_area.event_loop = None
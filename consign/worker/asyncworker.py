@@ -1,11 +1,68 @@
 # import threading
 # dummy相当于threading的封装，他能很好的修改成多进程支持，方便在io密集和cpu密集中做出取舍
-# 但值得一提的是，目前不支持多进程，因为修饰器的关系（work_area被修饰)，将在下版本更新
+# 但值得一提的是，AsyncWorker不支持多进程，因为修饰器的关系（work_area被修饰)，cpu密集的协程请使用ProcessWorker
 from multiprocessing.dummy import Process, current_process
+from collections import deque
+from queue import Empty
+from random import randrange
+from threading import get_ident
 from uuid import uuid4
 from itertools import repeat
 
-from .coroutineworker import CoroutineWorker
+from .coroutineworker import CoroutineWorker, _local
+from .autoscaler import AutoScaler
+from .iterationcontext import AutoCallback
+
+# 还没有获取到内容，None是约定的结束信号，不能用于表示没有获取到
+_nothing = object()
+
+
+class LocalDeque(object):
+    """
+    工作窃取模式下每个线程的本地队列
+
+    线程自己从左端取出、向右端放入，其他空闲的线程从右端窃取
+
+    ``deque`` 两端的 ``append`` / ``pop`` 本身是线程安全的，所以无需加锁
+
+    :param queue: ``WorkArea`` 的队列，线程退出或者 ``flush`` 时本地队列中的内容会被放回
+    """
+    __slots__ = ("queue", "items", "tick")
+
+    def __init__(self, queue):
+        self.queue, self.items, self.tick = queue, deque(), 0
+
+    def steal(self):
+        """
+        从右端窃取一半的内容
+
+        :return: 窃取到的内容列表，按放入顺序排列，可能为空
+        """
+        items, stolen = self.items, []
+        for _ in range((len(items) + 1) // 2):
+            try:
+                stolen.append(items.pop())
+            except IndexError:
+                # 与本地线程或者其他窃取者竞争，已经被取空了
+                break
+        stolen.reverse()
+        return stolen
+
+    def flush(self):
+        """
+        将本地队列中的内容放回 ``WorkArea`` 的队列
+
+        逐个取出而不是复制后清空，保证与窃取者竞争时每个内容只会被一方得到
+
+        :return: None
+        """
+        items, flushed = self.items, []
+        while True:
+            try:
+                flushed.append(items.popleft())
+            except IndexError:
+                break
+        self.queue.put_many(flushed)
 
 
 class AsyncWorker(CoroutineWorker):
@@ -65,18 +122,32 @@ class AsyncWorker(CoroutineWorker):
 
         可以直接指定 ``WorkArea`` ，如果直接指定，会跳过 ``work_area_name`` 的查找过程
 
+    :param int batch_size:
+
+        ``loop_work`` 每次从队列中取出的最大数量，默认为1
+
+        大于1时使用 ``work_batch`` ，线程较多时减少队列锁的竞争
+
     :raise AssertionError:
         当传入参数 ``work_area_name`` 无法被找到时抛出
 
     """
 
-    def __init__(self, work_area_name: str = "DEFAULT_WORK_AREA", *, work_area=None):
-        super(AsyncWorker, self).__init__(work_area_name, work_area=work_area)
+    def __init__(self, work_area_name: str = "DEFAULT_WORK_AREA", *, work_area=None, batch_size: int = 1):
+        super(AsyncWorker, self).__init__(work_area_name, work_area=work_area, batch_size=batch_size)
         self.show_str = "<AsyncWorker at {work_id} work in {work_area}>".format(
             work_id=hex(id(self)), work_area=self.work_area)
 
         #: __thread_list不对外暴露，对外建议使用thread_list
         self.__thread_list = []
+        #: 工作窃取模式下各个线程的本地队列，空闲的线程从中窃取
+        self.local_deques = []
+        #: 工作窃取模式下挂起中的线程标识，有多余的内容时唤醒他们来窃取
+        self.idle_idents = deque()
+        #: 工作窃取模式下，每执行多少次本地队列的内容检查一次 ``WorkArea`` 的队列，避免外部提交的协程被饿死
+        self.global_interval = 61
+        #: ``autoscale`` 创建的 ``AutoScaler`` ，未开启时为None
+        self.autoscaler = None
 
     @property
     def thread_list(self)->list:
@@ -106,9 +177,10 @@ class AsyncWorker(CoroutineWorker):
 
         :return: None
         """
-        [self.__thread_list.remove(thread) for thread in self.__thread_list if not thread.is_alive()]
+        # 原地修改而非边遍历边删除，边遍历边删除会跳过相邻的线程
+        self.__thread_list[:] = [thread for thread in self.__thread_list if thread.is_alive()]
 
-    def create_thread(self, name=None, daemon=True):
+    def create_thread(self, name=None, daemon=True, scheduler="shared"):
         """
         创建一个持续运行的线程，用于对协程函数进行执行
 
@@ -118,20 +190,37 @@ class AsyncWorker(CoroutineWorker):
 
         :param bool daemon: 是否守护线程
 
+        :param str scheduler: 调度模式，"shared" 或者 "stealing"，详情请查看 ``init_thread``
+
         :return: 创建的线程对象
+
+        :raise AssertionError:
+            当 ``scheduler`` 不是 "shared" 或者 "stealing" 时抛出
         """
-        consign_thread = Process(target=self.loop_work, name="consign_{name}".format(name=name or uuid4()))
+        assert scheduler in ("shared", "stealing"), "{scheduler} 不是 shared 或者 stealing".format(scheduler=scheduler)
+        target = self.loop_work if scheduler == "shared" else self.loop_work_stealing
+        consign_thread = Process(target=target, name="consign_{name}".format(name=name or uuid4()))
         self.__thread_list.append(consign_thread)
         consign_thread.daemon = daemon
         consign_thread.start()
         return consign_thread
 
-    def init_thread(self, create_num, name_iter=None, daemon=True):
+    def init_thread(self, create_num, name_iter=None, daemon=True, *, scheduler="shared"):
         """
         可以一次初始化多个线程
 
         是对 ``create_thread`` 的上层封装
 
+        线程支持两种调度模式：
+
+            1. "shared"：默认，所有线程共享 ``WorkArea`` 的队列，协程的每一步可能在不同的线程中执行
+
+            2. "stealing"：工作窃取，每个线程拥有自己的本地队列， ``WorkArea`` 的队列只作为外部提交的入口
+
+               协程的下一步放回当前线程的本地队列，不获取队列的锁，也尽可能的在同一个线程中执行
+
+               线程空闲时先检查 ``WorkArea`` 的队列，再从其他线程的本地队列中窃取一半，都没有时才挂起
+
         :param int create_num: 创建对应线程的数量
 
         :param name_iter:
@@ -145,14 +234,202 @@ class AsyncWorker(CoroutineWorker):
 
         :param bool daemon: 创建的是否是守护线程
 
+        :param str scheduler:
+
+            scheduler是显式参数，需要显式调用
+
+            调度模式，"shared" 或者 "stealing"
+
         :return:
         """
-        tuple(map(self.create_thread, name_iter or repeat(None, create_num), repeat(daemon, create_num)))
+        tuple(map(self.create_thread, name_iter or repeat(None, create_num), repeat(daemon, create_num),
+                  repeat(scheduler, create_num)))
+
+    def autoscale(self, min_threads: int=1, max_threads: int=16, *, backlog: int=64, queue_wait: float=None,
+                  interval: float=0.05, cool_down: float=5.0, on_scale=None, daemon: bool=True):
+        """
+        按负载自动伸缩线程数，在 ``min_threads`` 与 ``max_threads`` 之间
+
+        与 ``init_thread`` 固定的线程数不同，负载升高（队列中的数量或者等待时长超过阈值）时增加线程，
+
+        线程空闲超过 ``cool_down`` 秒后退出，详情请查看 ``AutoScaler``
+
+        .. code-block:: python
+
+            async_worker = AsyncWorker(work_area=work_area)
+            async_worker.autoscale(2, 32, queue_wait=0.01, on_scale=print)
+
+        .. note::
+
+            伸缩的线程使用 "shared" 调度模式， ``stop`` 时与其他线程一同停止
+
+        :param int min_threads: 最少的线程数
+
+        :param int max_threads: 最多的线程数
+
+        :param int backlog: 队列中的数量达到此值时增加线程，为None时不检查
+
+        :param float queue_wait: 最近一个周期中每一步在队列中的平均等待时长（秒）超过此值时增加线程，为None时不检查
+
+        :param float interval: 检查负载的间隔（秒）
+
+        :param float cool_down: 线程空闲多久后退出（秒）
+
+        :param on_scale: 伸缩时的回调，需要一个参数用于接收 ``ScaleEvent``
+
+        :param bool daemon: 创建的是否是守护线程
+
+        :return: ``AutoScaler``
+
+        :raise AssertionError: 当已经开启了自动伸缩或者线程数的范围不正确时抛出
+        """
+        assert self.autoscaler is None, "{worker} 已经开启了自动伸缩".format(worker=self)
+        self.autoscaler = AutoScaler(self, min_threads, max_threads, backlog=backlog, queue_wait=queue_wait,
+                                     interval=interval, cool_down=cool_down, on_scale=on_scale, daemon=daemon)
+        return self.autoscaler.start()
+
+    def loop_work_stealing(self, *, time_out=None):
+        """
+        以工作窃取模式工作，直到收到停止信号或者 ``stop`` ，通常由 ``init_thread(scheduler="stealing")`` 创建的线程调用
+
+        退出时本地队列中剩余的内容会被放回 ``WorkArea`` 的队列
+
+        :param time_out: 与 ``loop_work`` 相同
+
+        :return: None
+        """
+        ident, local_deque = get_ident(), LocalDeque(self.work_area.queue)
+        # 在本地队列中wait时，本地队列中的内容需要先放回WorkArea的队列（flush_work_batch）
+        old_work_batch, _local.work_batch = getattr(_local, "work_batch", None), local_deque
+        self.loop_idents.add(ident)
+        self.work_area.worker_idents.add(ident)
+        self.local_deques.append(local_deque)
+        try:
+            flag = True
+            while flag and not self.stop_flag:
+                with AutoCallback(None, (Empty, StopIteration)):
+                    flag = self.work_stealing(local_deque, time_out)
+        finally:
+            self.local_deques.remove(local_deque)
+            self.loop_idents.discard(ident)
+            self.work_area.worker_idents.discard(ident)
+            _local.work_batch = old_work_batch
+            local_deque.flush()
+
+    def work_stealing(self, local_deque, time_out=None):
+        """
+        工作窃取模式下执行一次Work，不建议外部调用
+
+        :param LocalDeque local_deque: 当前线程的本地队列
+
+        :param time_out: 与 ``work_once`` 相同
+
+        :return: 与 ``work_once`` 相同
+
+        :raise Empty: 与 ``work_once`` 相同
+        """
+        items, something = local_deque.items, _nothing
+        local_deque.tick += 1
+        if items:
+            if local_deque.tick % self.global_interval == 0:
+                # 定期检查WorkArea的队列、定时器和io，避免他们在本地队列繁忙时得不到响应
+                try:
+                    something = self.fetch_work(0)
+                except Empty:
+                    pass
+            if something is _nothing:
+                try:
+                    something = items.popleft()
+                except IndexError:
+                    # 被窃取空了
+                    pass
+
+        if something is _nothing:
+            something = self.fetch_stealing(local_deque, time_out)
+
+        something = self.step_function()(something)
+        if something is None:
+            return True
+        if something is False:
+            return False
+
+        items.append(something)
+        if len(items) > 1 and self.idle_idents:
+            # 存在多余的内容且有线程空闲，唤醒一个让他来窃取
+            # 只唤醒工作窃取的线程，同样挂起在队列上的wait无法窃取
+            try:
+                ident = self.idle_idents.popleft()
+            except IndexError:
+                pass
+            else:
+                self.work_area.queue.wakeup(ident)
+        return True
+
+    def fetch_stealing(self, local_deque, time_out=None):
+        """
+        本地队列为空时获取内容：先检查 ``WorkArea`` 的队列，再从其他线程的本地队列中窃取，都没有时挂起在 ``WorkArea`` 的队列上
+
+        :return: 获取到的内容，窃取到的其余内容放入本地队列
+
+        :raise Empty: 与 ``work_once`` 相同
+        """
+        try:
+            return self.fetch_work(0)
+        except Empty:
+            pass
+
+        local_deques = tuple(self.local_deques)
+        start = randrange(len(local_deques)) if local_deques else 0
+        for i in range(len(local_deques)):
+            victim = local_deques[(start + i) % len(local_deques)]
+            if victim is local_deque:
+                continue
+            stolen = victim.steal()
+            if stolen:
+                local_deque.items.extend(stolen[1:])
+                return stolen[0]
+
+        ident = get_ident()
+        self.idle_idents.append(ident)
+        try:
+            return self.fetch_work(time_out)
+        finally:
+            try:
+                self.idle_idents.remove(ident)
+            except ValueError:
+                # 已经被唤醒者取出
+                pass
+
+    def stop(self, join=False, time_out=None):
+        """
+        停止此 ``AsyncWorker`` 创建的全部线程，挂起中的线程会被立即唤醒并退出
+
+        与 ``submit_thread_stop_flag`` 不同， ``stop`` 一次就可以停止全部线程，且不会被其他 ``Worker`` 接收
+
+        :param bool join: 是否阻塞等待线程退出
+
+        :param time_out: 等待每个线程退出的超时时长，只在 ``join`` 为True时有效
+
+        :return: None
+        """
+        if self.autoscaler is not None:
+            self.autoscaler.stop()
+        super(AsyncWorker, self).stop()
+        if join:
+            if self.autoscaler is not None and self.autoscaler.controller.is_alive():
+                self.autoscaler.controller.join(time_out)
+            for thread in tuple(self.__thread_list):
+                thread.join(time_out)
+            self.clear_dead_thread()
 
     def submit_thread_stop_flag(self):
         """
         向对应 ``WorkArea`` 提交约定的结束信号
 
+        每个结束信号只会结束一个线程，如果需要结束全部线程，建议使用 ``stop``
+
+        开启了自动伸缩时会同时停止 ``AutoScaler`` ，结束的线程不会被重新补足
+
         .. warning::
 
             约定的结束信号不一定能立马结束，因为队列中可能还有其他内容
@@ -161,5 +438,8 @@ class AsyncWorker(CoroutineWorker):
         """
         # 提交约定的结束信号，但注意，约定的结束信号不一定能立马结束，因为队列中可能还有其他内容
         # 同时可能被其他Worker接收，比如协程Worker，所以复杂情况下结果并不确定
-        self.submit_work(None, None, None)
+        if self.autoscaler is not None:
+            # 收到结束信号的线程不应再被补足
+            self.autoscaler.stop()
+        self.submit_work(None)
 
@@ -0,0 +1,232 @@
+from multiprocessing.dummy import Process, Lock
+from collections import deque
+from queue import Empty
+from threading import Event, get_ident
+from time import monotonic
+from uuid import uuid4
+
+
+class ScaleEvent(object):
+    """
+    ``AutoScaler`` 的一次伸缩，传递给 ``on_scale`` 并保存在 ``AutoScaler.events`` 中
+
+    :param str action: "grow" 或者 "retire"
+
+    :param str reason:
+
+        "min_threads"：线程数少于 ``min_threads``
+
+        "backlog"：队列中的数量超过了阈值
+
+        "queue_wait"：最近一个周期中每一步在队列中的平均等待时长超过了阈值
+
+        "idle"：线程空闲超过了 ``cool_down``
+
+    :param int threads: 伸缩后的线程数
+
+    :param int backlog: 伸缩时队列中的数量，线程退出时为None
+
+    :param queue_wait: 伸缩时最近一个周期的平均等待时长（秒），未知时为None
+    """
+    __slots__ = ("action", "reason", "threads", "backlog", "queue_wait", "time")
+
+    def __init__(self, action, reason, threads, backlog=None, queue_wait=None):
+        self.action, self.reason, self.threads = action, reason, threads
+        self.backlog, self.queue_wait = backlog, queue_wait
+        #: 发生的时间，以 ``time.monotonic`` 为准
+        self.time = monotonic()
+
+    def __repr__(self):
+        return "<ScaleEvent {action} to {threads} threads by {reason}>".format(
+            action=self.action, threads=self.threads, reason=self.reason)
+
+
+class AutoScaler(object):
+    """AutoScaler根据 ``WorkArea`` 的负载伸缩 ``AsyncWorker`` 的线程数，通过 ``AsyncWorker.autoscale`` 创建
+
+    一个控制线程每隔 ``interval`` 秒检查一次：
+
+        1. 线程数少于 ``min_threads`` 时补足
+
+        2. 队列中的数量不少于 ``backlog`` ，或者最近一个周期中每一步在队列中的平均等待时长超过 ``queue_wait`` 时，
+
+           线程数翻倍，但不超过 ``max_threads`` ；步骤阻塞线程时等待时长会随之上升
+
+    被创建的线程空闲超过 ``cool_down`` 秒后自行退出，但不会少于 ``min_threads``
+
+    每一次伸缩都会创建 ``ScaleEvent`` ，调用 ``on_scale`` 并保存在 ``events`` 中
+
+    .. code-block:: python
+
+        async_worker = AsyncWorker(work_area=work_area)
+        async_worker.autoscale(2, 32, on_scale=print)
+
+    .. note::
+
+        ``queue_wait`` 需要运行指标，设置时会开启 ``WorkArea`` 的运行指标（ ``enable_metrics`` ）
+
+    .. warning::
+
+        ``on_scale`` 在控制线程或者退出的线程中调用，应当尽快返回，其中的异常不会被捕获
+
+    :param AsyncWorker worker: 被伸缩的 ``AsyncWorker`` ，线程同样登记在他的 ``thread_list`` 中
+
+    :param int min_threads: 最少的线程数
+
+    :param int max_threads: 最多的线程数
+
+    :param int backlog: 队列中的数量的阈值，为None时不检查
+
+    :param float queue_wait: 平均等待时长的阈值（秒），为None时不检查
+
+    :param float interval: 检查的间隔（秒）
+
+    :param float cool_down: 线程空闲多久后退出（秒）
+
+    :param on_scale: 伸缩时的回调，需要一个参数用于接收 ``ScaleEvent``
+
+    :param bool daemon: 创建的是否是守护线程
+
+    :raise AssertionError: 当线程数的范围不正确时抛出
+    """
+
+    def __init__(self, worker, min_threads=1, max_threads=16, *, backlog=64, queue_wait=None, interval=0.05,
+                 cool_down=5.0, on_scale=None, daemon=True):
+        assert 0 <= min_threads <= max_threads and max_threads >= 1, \
+            "需要 0 <= min_threads <= max_threads 且 max_threads >= 1"
+        self.worker = worker
+        self.min_threads, self.max_threads = min_threads, max_threads
+        self.backlog, self.queue_wait = backlog, queue_wait
+        self.interval, self.cool_down = interval, cool_down
+        self.on_scale, self.daemon = on_scale, daemon
+        #: 当前由此 ``AutoScaler`` 创建且存活的线程数
+        self.threads = 0
+        #: 最近的伸缩记录
+        self.events = deque(maxlen=1000)
+        self.mutex = Lock()
+        self.stopped = Event()
+        # 上一次检查时 queue_wait 直方图的 (count, total)
+        self._last_wait = (0, 0.0)
+        if queue_wait is not None:
+            worker.work_area.enable_metrics()
+        self.controller = Process(target=self.control, name="consign_autoscaler_{name}".format(name=uuid4()))
+        self.controller.daemon = daemon
+
+    def start(self):
+        """
+        启动控制线程并立即补足 ``min_threads``
+
+        :return: self
+        """
+        self.check()
+        self.controller.start()
+        return self
+
+    def stop(self):
+        """
+        停止控制线程，之后不再增加线程，已经创建的线程由 ``AsyncWorker.stop`` 或者约定的结束信号停止
+
+        :return: None
+        """
+        with self.mutex:
+            # 与grow互斥，停止后不会再有新的线程
+            self.stopped.set()
+
+    def control(self):
+        while not self.stopped.wait(self.interval) and not self.worker.stop_flag:
+            self.check()
+
+    def mean_queue_wait(self):
+        """
+        :return: 自上一次调用以来每一步在队列中的平均等待时长，没有新的步骤或者未开启运行指标时为None
+        """
+        metrics = self.worker.work_area.metrics
+        if metrics is None:
+            return None
+        with metrics.mutex:
+            count, total = metrics.queue_wait.count, metrics.queue_wait.total
+        last_count, last_total = self._last_wait
+        self._last_wait = (count, total)
+        if count <= last_count:
+            return None
+        return (total - last_total) / (count - last_count)
+
+    def check(self):
+        """
+        检查一次负载并在需要时增加线程，由控制线程调用
+
+        :return: None
+        """
+        backlog, queue_wait = self.worker.qsize(), self.mean_queue_wait()
+        threads = self.threads
+        if threads < self.min_threads:
+            self.grow(self.min_threads - threads, "min_threads", backlog, queue_wait)
+        elif threads < self.max_threads:
+            if self.backlog is not None and backlog >= self.backlog:
+                reason = "backlog"
+            elif self.queue_wait is not None and queue_wait is not None and queue_wait > self.queue_wait:
+                reason = "queue_wait"
+            else:
+                return
+            self.grow(min(max(threads, 1), self.max_threads - threads), reason, backlog, queue_wait)
+
+    def grow(self, num, reason, backlog=None, queue_wait=None):
+        with self.mutex:
+            if self.stopped.is_set():
+                return
+            self.threads += num
+            event = ScaleEvent("grow", reason, self.threads, backlog, queue_wait)
+        for _ in range(num):
+            thread = Process(target=self.work, name="consign_{name}".format(name=uuid4()))
+            thread.daemon = self.daemon
+            self.worker.thread_list.append(thread)
+            thread.start()
+        self.emit(event)
+
+    def retire(self):
+        """
+        线程空闲超过 ``cool_down`` 时调用
+
+        :return: 返回bool类型，True 表示此线程可以退出
+        """
+        with self.mutex:
+            if self.threads <= self.min_threads:
+                return False
+            self.threads -= 1
+            event = ScaleEvent("retire", "idle", self.threads)
+        self.emit(event)
+        return True
+
+    def emit(self, event):
+        self.events.append(event)
+        if self.on_scale is not None:
+            self.on_scale(event)
+
+    def work(self):
+        """
+        被创建的线程的工作循环，与 ``loop_work`` 相同，但空闲超过 ``cool_down`` 时退出
+
+        :return: None
+        """
+        worker, ident = self.worker, get_ident()
+        work = worker.work_batch if worker.batch_size > 1 else worker.work_once
+        worker.loop_idents.add(ident)
+        worker.work_area.worker_idents.add(ident)
+        retired, last_busy = False, monotonic()
+        try:
+            while not worker.stop_flag:
+                try:
+                    if work(self.cool_down) is False:
+                        # 约定的结束信号
+                        break
+                    last_busy = monotonic()
+                except (Empty, StopIteration):
+                    if monotonic() - last_busy >= self.cool_down and self.retire():
+                        retired = True
+                        break
+        finally:
+            worker.loop_idents.discard(ident)
+            worker.work_area.worker_idents.discard(ident)
+            if not retired:
+                with self.mutex:
+                    self.threads -= 1
@@ -1,9 +1,64 @@
-from .iterationcontext import AutoReceipts, AutoCallback, CheckChainReaction
+from .iterationcontext import AutoCallback
+from .suspend import Suspend, Resume, AsyncioAwait
+from ..decorator.consigntask import Task, NO_START
 
 from queue import Empty
+from collections import deque
+from asyncio import isfuture
+from inspect import iscoroutine
+from threading import get_ident, local
+from time import perf_counter, thread_time
 import builtins
 
 
+# 每个线程正在执行的WorkBatch
+_local = local()
+
+# 这些类型的yield_value既不能调用也不会是Suspend、Task或者asyncio的对象，直接send给协程
+_plain_types = frozenset((type(None), type(...), bool, int, float, complex, str, bytes, tuple, list, dict, set))
+# 协程被挂起或者交给了链式反应，无需send
+_parked = object()
+
+
+class WorkBatch(object):
+    """
+    ``work_batch`` 一次取出的内容，以及执行后需要重新提交的内容
+
+    他们在执行期间只属于当前线程，其他线程不可见
+    """
+    __slots__ = ("queue", "items", "continuations")
+
+    def __init__(self, queue, items):
+        self.queue, self.items, self.continuations = queue, deque(items), []
+
+    def flush(self):
+        """
+        将还没有执行的内容以及需要重新提交的内容一次放回队列
+
+        :return: None
+        """
+        items, continuations = self.items, self.continuations
+        if items:
+            continuations[:0] = items
+            items.clear()
+        if continuations:
+            self.queue.put_many(continuations)
+            self.continuations = []
+
+
+def flush_work_batch():
+    """
+    将当前线程 ``work_batch`` 中的内容放回队列，不在 ``work_batch`` 中时什么都不做
+
+    在执行中阻塞等待其他协程前（例如 ``wait`` ）需要调用，否则被等待的协程可能正被当前线程持有而无法被执行
+
+    :return: None
+    """
+    work_batch = getattr(_local, "work_batch", None)
+    if work_batch is not None:
+        work_batch.flush()
+
+
 class CoroutineWorker(object):
     """CoroutineWorker协程Worker，CoroutineWorker能够以并发的方式执行特定的协程函数，是所有Worker的基石
 
@@ -44,19 +99,32 @@ class CoroutineWorker(object):
 
         可以直接指定 ``WorkArea`` ，如果直接指定，会跳过 ``work_area_name`` 的查找过程
 
+    :param int batch_size:
+
+        ``loop_work`` 每次从队列中取出的最大数量，默认为1
+
+        大于1时使用 ``work_batch`` ，线程较多时减少队列锁的竞争
+
     :raise AssertionError:
         当传入参数 ``work_area_name`` 无法被找到时抛出
 
     """
 
-    def __init__(self, work_area_name: str="DEFAULT_WORK_AREA", *, work_area=None):
+    def __init__(self, work_area_name: str="DEFAULT_WORK_AREA", *, work_area=None, batch_size: int=1):
         #: ``CoroutineWorker`` 为此 ``WorkArea`` 工作
         self.work_area = work_area or getattr(builtins, "WORK_AREA_DICT", {}).get(work_area_name, None)
         assert self.work_area, "WORK_AREA_DICT不存在 或 WORK_AREA_DICT中没有名为 {work_area_name} 的key".format(
             work_area_name=work_area_name)
 
-        self.show_str = "<CoroutineWork at {work_id} work in {work_area}>".format(
-            work_id=hex(id(self)), work_area=self.work_area)
+        # 在第一次__str__时才生成，wait等每次都会创建CoroutineWorker，格式化WorkArea的开销不可忽略
+        self.show_str = None
+
+        #: 为True时 ``loop_work`` 会退出，通过 ``stop`` 设置
+        self.stop_flag = False
+        #: 正在 ``loop_work`` 的线程标识， ``stop`` 时会唤醒他们
+        self.loop_idents = set()
+        #: ``loop_work`` 每次从队列中取出的最大数量，大于1时使用 ``work_batch``
+        self.batch_size = batch_size
 
     def qsize(self):
         """
@@ -79,19 +147,19 @@ class CoroutineWorker(object):
         """
         return self.work_area.queue.qsize()
 
-    def submit_work(self, *args):
+    def submit_work(self, task):
         """
         提交任务到 ``WorkArea`` 队列
 
         不建议外部调用， 如果调用需要明白自己正在做什么
 
-        :param args:
+        :param task:
 
-            按照规定 ``WorkArea`` 队列中是只应当put一个定义好的tuple
+            按照规定 ``WorkArea`` 队列中是只应当put ``Task`` ，他的 ``generator`` 与 ``yield_value`` 记录了协程的下一步
 
-            其格式为(yield_value, generator, receipts)
+            为None时表示约定的结束信号
 
-            这里因为不向外调用，所以使用可变参偷了个懒，就无需再手动创建tuple
+            旧版中队列的内容是(yield_value, generator, receipts)的tuple，每一步都需要重新创建，现在 ``Task`` 被重复使用
 
         :return: None
 
@@ -100,12 +168,75 @@ class CoroutineWorker(object):
             当 ``WorkArea`` 队列存放满时触发
 
         """
-        self.work_area.queue.put(args)
-        # 为什么改用上面这个？
-        # 因为我发现其实submit_work不应该给用户调用，即使是外部也是自己明白需要做什么而调用
-        # 那么通过args，直接转换成tuple，偷个懒
-        # 原来的代码：
-        # self.work_area.queue.put((yield_value, generator, receipts))
+        self.work_area.queue.put(task)
+
+    def wake_timer(self, time_out=None):
+        """
+        唤醒 ``WorkArea`` 定时器堆中所有已经到期的协程，让他们重新回到队列
+
+        :param time_out:
+
+            等待 ``WorkArea``  队列获取内容的等待超时时长
+
+        :return:
+
+            修正后的超时时长，保证不会超过定时器堆中最早的截止时间
+
+        """
+        timer = self.work_area.timer
+        if not timer:
+            return time_out
+
+        for suspend in timer.pop_expired():
+            suspend.expire()
+        # 只有一个线程负责按照最早的截止时间等待，其余空闲的线程无需因定时器被反复唤醒
+        return timer.time_out(time_out) if timer.watch() else time_out
+
+    def poll_io(self, io_poller, time_out=None):
+        """
+        获取 ``WorkArea`` 队列中的内容，队列为空时以 ``time_out`` 作为超时时长 ``select`` 并唤醒io就绪的协程
+
+        同一时刻只有一个线程 ``select`` ，其余的线程依旧挂起在队列上
+
+        ``select`` 期间有新的内容进入队列时会被立即唤醒
+
+        :param IOPoller io_poller: ``WorkArea`` 的io就绪等待器
+
+        :param time_out: 等待的超时时长
+
+        :return: 队列中的内容
+
+        :raise Empty: 队列为空时总会抛出，被唤醒的协程会在下一次Work时从队列中获取
+        """
+        queue, poll_lock = self.work_area.queue, io_poller.poll_lock
+        io_poller.tick += 1
+        try:
+            something = queue.get_nowait()
+        except Empty:
+            pass
+        else:
+            if io_poller.tick % io_poller.busy_interval == 0 and poll_lock.acquire(False):
+                # 繁忙时也需要偶尔不等待的select，避免io就绪的协程得不到响应
+                try:
+                    io_poller.poll(0)
+                finally:
+                    poll_lock.release()
+            return something
+
+        if not poll_lock.acquire(False):
+            # 已经有线程在select了，像往常一样挂起在队列上
+            return queue.get(timeout=time_out)
+
+        try:
+            # 挂起io_poller代替挂起线程，有新的内容时唤醒select
+            if queue.park(io_poller):
+                try:
+                    io_poller.poll(time_out)
+                finally:
+                    queue.unpark(io_poller)
+        finally:
+            poll_lock.release()
+        raise Empty
 
     def work_once(self, time_out=None):
         """
@@ -115,7 +246,7 @@ class CoroutineWorker(object):
 
         :param time_out:
 
-            等待 ``WorkArea``  队列获取内容的等待超时时长
+            等待 ``WorkArea``  队列获取内容的等待超时时长，None表示一直等待直到有新的内容或者被唤醒
 
         :return:
 
@@ -127,56 +258,300 @@ class CoroutineWorker(object):
 
         :raise Empty:
 
-            当 ``WorkArea`` 队列为空时阻塞时长超过参数 ``time_out`` 时抛出
+            当 ``WorkArea`` 队列为空时阻塞时长超过参数 ``time_out`` 时，或者等待中被唤醒时抛出
 
         :raise ValueError:
 
             当参数 ``time_out`` 不正确时抛出
 
         """
+        something = self.fetch_work(time_out)
+        something = self.step_function()(something)
+        if something is None:
+            return True
+        if something is False:
+            return False
+
+        self.work_area.queue.put(something)
+        return True
+
+    def fetch_work(self, time_out=None, max_num=None):
+        """
+        从 ``WorkArea`` 队列中获取内容，获取前会唤醒到期的定时器，存在等待io就绪的协程时会 ``select``
+
+        :param time_out: 等待 ``WorkArea``  队列获取内容的等待超时时长
+
+        :param max_num: 为None时获取一个内容，否则获取至多 ``max_num`` 个内容的列表
+
+        :return: 队列中的内容
+
+        :raise Empty: 与 ``work_once`` 相同
+        """
+        work_area = self.work_area
+        try:
+            io_poller = work_area.io_poller
+            if io_poller is not None and io_poller.waiting:
+                # 存在等待io就绪的协程，队列为空时select代替挂起在队列上
+                something = self.poll_io(io_poller, self.wake_timer(time_out))
+                return something if max_num is None else [something]
+            if max_num is None:
+                return work_area.queue.get(timeout=self.wake_timer(time_out))
+            return work_area.queue.get_many(max_num, timeout=self.wake_timer(time_out))
+        finally:
+            if work_area.timer.unwatch():
+                # 不再等待时交出定时器，唤醒另一个挂起中的线程接替等待
+                work_area.queue.wakeup()
+
+    def work_local(self):
+        """
+        单线程 ``WorkArea`` 中，消费线程不加锁的连续执行本地队列中的内容，直到本地队列为空
+
+        与重复 ``work_once`` 的效果相同，但省去了每次的加锁、定时器的等待交接以及超时的计算，队列为空时不会等待
+
+        存在等待io就绪的协程时直接返回，交给 ``work_once`` 处理
+
+        :return:
+
+            返回bool类型
+
+            False 意味着收到了约定的结束信号
+
+            True 表示本地队列已经为空，或者需要交给 ``work_once``
+
+        :raise RuntimeError: 当前线程不是此区域的消费线程时抛出
+        """
+        work_area = self.work_area
+        queue, timer = work_area.queue, work_area.timer
+        local = queue.local
+        run_step = self.step_function()
+        popleft, append = local.popleft, local.append
+        queue.bind()
+        while not self.stop_flag:
+            if queue.queue:
+                # 其他线程提交的内容
+                queue.transfer()
+            if timer:
+                for suspend in timer.pop_expired():
+                    suspend.expire()
+            if not local or work_area.io_poller is not None and work_area.io_poller.waiting:
+                return True
+
+            something = run_step(popleft())
+            if something is False:
+                return False
+            if something is not None:
+                append(something)
+        return True
+
+    def work_batch(self, time_out=None):
+        """
+        ``CoroutineWorker`` 一次获取 ``WorkArea`` 队列中至多 ``batch_size`` 个内容并依次执行
+
+        与重复 ``work_once`` 的效果相同，但取出与重新提交都只获取一次队列的锁，多线程时减少锁的竞争
+
+        执行期间，取出的内容与需要重新提交的内容只属于当前线程，执行完毕后按顺序一次放回队列
+
+        :param time_out:
+
+            等待 ``WorkArea``  队列获取内容的等待超时时长，None表示一直等待直到有新的内容或者被唤醒
+
+        :return:
+
+            返回bool类型
+
+            False 意味着收到了约定的结束信号
+
+            True 表示正常结束Work
+
+        :raise Empty:
+
+            与 ``work_once`` 相同
+        """
+        work_batch = WorkBatch(self.work_area.queue, self.fetch_work(time_out, self.batch_size))
+        items = work_batch.items
+        run_step = self.step_function()
+        old_work_batch, _local.work_batch = getattr(_local, "work_batch", None), work_batch
+        try:
+            while items:
+                something = run_step(items.popleft())
+                if something is False:
+                    return False
+                if something is not None:
+                    # flush后continuations会被替换，所以每次都重新获取
+                    work_batch.continuations.append(something)
+        finally:
+            work_batch.flush()
+            _local.work_batch = old_work_batch
+
+        return True
+
+    def run_step(self, task):
+        """
+        执行一次从 ``WorkArea`` 队列中获取的内容
+
+        不建议外部调用， ``work_once`` 与 ``work_batch`` 都通过他执行
+
+        :param Task task: ``Task`` 的 ``yield_value`` 与 ``generator`` 记录了协程的下一步，为None时是约定的停止信号
+
+        :return:
+
+            False 意味着收到了约定的结束信号
+
+            None 意味着协程已经完成、被挂起或者交给了链式反应，无需重新提交
+
+            否则返回需要重新提交到 ``WorkArea`` 队列的 ``Task``
+        """
         # yield_value是由yield传递出来的值, 尽可能的是一个callable
         #   新版和旧版的区别在于：不在要求一定是一个callable，如果callable，那么调用，否则原样返回
         # generator是返回的生成器，用于send和执行下一步并得到yield_value
-        # receipts是定义好的回执函数，一个特殊的generator, 用于触发两次回调和获取函数的最终结果
-        yield_value, generator, receipts = self.work_area.queue.get(timeout=time_out)
-
-        if generator is None or receipts is None:
+        # 他们都记录在Task中，Task在每一步被重复使用，不再为每一步创建tuple和上下文管理器
+        if task is None:
             # 约定的停止信号
             return False
+        if task.cancel_exception is not None:
+            # 被取消的协程在yield处抛出并完成，不再重新提交
+            task.throw_cancel()
+            return None
+
+        yield_value = task.yield_value
+        if yield_value.__class__ in _plain_types:
+            # 最常见的情况：yield一个普通的值（例如 yield 或者 yield ...），无需调用、挂起或者检查链式反应
+            if task.state == NO_START:
+                # 表明此generator还未开始迭代, 进行初始化
+                # 选择提交而不是继续执行的原因是希望这样可以更快的轮询queue
+                task.start()
+                try:
+                    task.yield_value = next(task.generator)
+                except StopIteration as e:
+                    task.finish(e.value)
+                    return None
+                return task
+        elif yield_value.__class__ is Resume:
+            # 被挂起的协程被唤醒，唤醒的值直接交给生成器，不再调用或检查链式反应
+            try:
+                task.yield_value = yield_value.send_to(task.generator)
+            except StopIteration as e:
+                task.finish(e.value)
+                return None
+            return task
+        else:
+            yield_value = self.dispatch(yield_value, task)
+            if yield_value is _parked:
+                return None
+
+        try:
+            task.yield_value = task.generator.send(yield_value)
+        except StopIteration as e:
+            # 协程返回，记录返回值并触发回调
+            task.finish(e.value)
+            return None
+        return task
+
+    def step_function(self):
+        """
+        :return: ``WorkArea`` 开启了运行指标、性能分析或者时间线记录时返回 ``measured_step`` ，否则返回 ``run_step``
+        """
+        work_area = self.work_area
+        if work_area.metrics is None and work_area.profiler is None and work_area.tracer is None:
+            return self.run_step
+        return self.measured_step
 
-        if yield_value is None and generator.gi_frame.f_lasti == -1:
-            # 表明此generator还未开始迭代, 进行初始化(此处是适配旧版）
-            _, yield_value = next(receipts), next(generator)
-            # 选择提交而不是继续执行的原因是希望这样可以更快的轮询queue
-            self.submit_work(yield_value, generator, receipts)
-            return True
+    def measured_step(self, task):
+        """
+        ``WorkArea`` 开启了运行指标、性能分析或者时间线记录时代替 ``run_step`` ，额外记录此步的耗时、CPU时间、在队列中的等待时长与时间线
 
-        # 新版本不再需要链式反应，或者说链式反应将会显著的、手动的启用
-        # 链式反应是比主动轮询+补偿工作更好的设计
-        #   主动轮询+补偿工作是提交一个轮询任务（循环判断是否完成）并将自身作为补偿的工作者进行工作并阻塞，等待结果
-        #       直到轮询任务得到的结果是满意的结果，工作者结束工作，主动轮询并不精确，但补偿工作使得线程资源不会浪费
-        #   而链式反应更胜一筹，因为链式反应的存在必须是一个嵌套yield的情况，所以链式反应可以先暂停父生成器的执行，转而
-        #       执行子生成器，当子生成器完成时，通过将父生成器重新提交进入队列来重启父生成器，更加的高效
+        :param Task task: 与 ``run_step`` 相同
 
+        :return: 与 ``run_step`` 相同
+        """
+        work_area = self.work_area
+        profiler, tracer = work_area.profiler, work_area.tracer
+        start = perf_counter()
+        cpu_start = 0.0 if profiler is None else thread_time()
+        queued_at = None if task is None else task.queued_at
+        if tracer is not None and task is not None:
+            tracer.step_begin(task, start)
+        result = self.run_step(task)
+        end = perf_counter()
+
+        if profiler is not None and task is not None:
+            profiler.step_done(task, end - start, thread_time() - cpu_start)
+        if tracer is not None and task is not None:
+            tracer.step_done(task, start, end)
+        metrics = work_area.metrics
+        if metrics is not None:
+            if result is not None and result is not False:
+                # 需要重新提交，从现在开始在队列中等待
+                result.queued_at = end
+            metrics.step_done(None if queued_at is None else start - queued_at, end - start)
+        return result
+
+    def dispatch(self, yield_value, task):
+        """
+        处理不是普通值的 ``yield_value`` ，不建议外部调用
+
+        :param yield_value: 协程yield出的值
+
+        :param Task task: 协程此次调用的 ``Task``
+
+        :return: 需要send给协程的值，协程被挂起或者交给了链式反应时返回 ``_parked``
+        """
         # 新版本同样不再强调yield_value是一个callable，但如果他是，它会被调用
-        result = yield_value() if callable(yield_value) else yield_value
-
-        with CheckChainReaction(result) as try_set_chain_reaction:
-            is_chain_reaction = try_set_chain_reaction(generator, receipts)
-            # 如果不是链式反应，通过抛出自定义异常, 被CheckChainReaction捕获同时跳过return
-            if is_chain_reaction:
-                # 其实在逻辑上，这个if是没有意义的，因为不是chain_reaction通过触发异常跳过return
-                # 但这样写编辑器不会报警告，我以为会很简洁，是我考虑不周了
-                return True
+        # 注意callable是在Worker中直接调用的，阻塞的callable应当使用 in_thread/in_process 交给执行器
+        if callable(yield_value):
+            profiler = self.work_area.profiler
+            result = yield_value() if profiler is None else profiler.call(yield_value, task)
+        else:
+            result = yield_value
+
+        if isinstance(result, Suspend):
+            # 挂起协程，协程交由Suspend保管，直到被唤醒前都不会再回到队列
+            # yield_value记录挂起的对象，取消时通过他唤醒
+            task.yield_value = result
+            result.park(self.work_area, task)
+            return _parked
+
+        if result.__class__ is Task:
+            # 新版本不再需要链式反应，或者说链式反应将会显著的、手动的启用
+            # 链式反应可以先暂停父生成器的执行，转而执行子生成器
+            # 当子生成器完成时，通过将父生成器重新提交进入队列来重启父生成器
+            order = result.order
+            if order.chain_reaction_flag is True:
+                # 按约定提供父协程的Task以供子协程完成时回调，只对此次执行链式反应
+                # yield_value记录子协程，取消时一同取消，需要在子协程可能完成并回调之前记录
+                task.yield_value = result
+                result._chain_reaction = task
+                order.chain_reaction_flag = False
+                if self.work_area.tracer is not None:
+                    self.work_area.tracer.park(task, "chain_reaction")
+                return _parked
+        elif isfuture(result) or iscoroutine(result):
+            # asyncio的Future或者协程，挂起直到在事件循环中完成
+            task.yield_value = result = AsyncioAwait(result)
+            result.park(self.work_area, task)
+            return _parked
+
+        return result
+
+    def stop(self):
+        """
+        停止此 ``Worker`` 的 ``loop_work`` ，并立即唤醒所有挂起中的线程
 
-        with AutoReceipts(receipts):
-            yield_value = generator.send(result)
-            # 倘若 generator.send 触发了 StopIteration, AutoReceipts会捕获异常、执行receipts且不会往下执行submit_work
-            self.submit_work(yield_value, generator, receipts)
+        与约定的结束信号不同， ``stop`` 一次就可以停止此 ``Worker`` 的所有线程，且不会被其他 ``Worker`` 接收
 
-        return True
+        .. warning::
 
-    def loop_work(self, *, time_out=0.1, forever=True):
+            正在执行中的线程需要执行完当前手头内容才会退出
+
+            ``stop`` 之后此 ``Worker`` 不再工作，如果需要重新工作请创建新的 ``Worker``
+
+        :return: None
+        """
+        self.stop_flag = True
+        # 指定唤醒，即使线程正处于检查stop_flag与挂起之间，也会在挂起前响应
+        self.work_area.queue.wakeup_all(tuple(self.loop_idents))
+
+    def loop_work(self, *, time_out=None, forever=True):
         """
 
         ``loop_work`` 阻塞并完成当前队列中的全部内容 或者 收到停止信号
@@ -195,13 +570,15 @@ class CoroutineWorker(object):
 
             等待 ``WorkArea``  队列获取内容的等待超时时长
 
+            默认为None，空闲时线程会一直挂起，直到有新的内容、定时器到期或者 ``stop`` ，不会被周期性的唤醒
+
         :param forever:
 
             是否永久阻塞
 
             如果 ``forever`` 为False，那么 ``loop_work`` 会考虑队列的 ``qsize`` 是否<=0
 
-            如果队列的 ``qsize`` <=0，那么退出循环
+            如果队列的 ``qsize`` <=0 且没有被挂起的协程（例如 ``asleep`` 中的协程），那么退出循环
 
             如果你需要指定某个任务完成并阻塞，那么建议使用 ``wait`` 来确保完成优于直接使用 ``forever`` =True
 
@@ -212,16 +589,33 @@ class CoroutineWorker(object):
             当参数 ``time_out`` 不正确时抛出
 
         """
-        flag = True
-        while flag:
-            # AutoCallback用于捕获异常，callback为None，默认不做处理
-            with AutoCallback(None, (Empty, StopIteration)):
-                # 当work_once返回false，说明要结束loop_work了
-                flag = self.work_once(time_out)
-
-            flag = flag and (forever or self.qsize() > 0)
+        parking, ident = self.work_area.parking, get_ident()
+        work = self.work_batch if self.batch_size > 1 else self.work_once
+        work_local = self.work_local if self.work_area.single_thread else None
+        # 先登记再检查stop_flag，保证stop不会错过此线程
+        self.loop_idents.add(ident)
+        self.work_area.worker_idents.add(ident)
+        try:
+            flag = True
+            while flag and not self.stop_flag:
+                # AutoCallback用于捕获异常，callback为None，默认不做处理
+                with AutoCallback(None, (Empty, StopIteration)):
+                    # 当work_once返回false，说明要结束loop_work了
+                    # 单线程的区域先不加锁的执行完本地队列，随后的work负责等待
+                    flag = work_local is None or work_local()
+                    # forever为False时，只有存在被挂起的协程才值得等待，否则不等待
+                    flag = flag and work(time_out if forever or parking else 0)
+
+                # 队列为空时，如果依旧存在被挂起的协程，同样需要等待他们完成
+                flag = flag and (forever or self.qsize() > 0 or len(parking) > 0)
+        finally:
+            self.loop_idents.discard(ident)
+            self.work_area.worker_idents.discard(ident)
 
     def __str__(self):
+        if self.show_str is None:
+            self.show_str = "<CoroutineWork at {work_id} work in {work_area}>".format(
+                work_id=hex(id(self)), work_area=self.work_area)
         return self.show_str
 
     __repr__ = __str__
@@ -51,17 +51,17 @@ class CheckChainReaction(AutoCallback):
     def raise_error_func(self, *args, **kwargs):
         raise NoChainReactionError
 
-    def set_chain_reaction(self, parent_generator, parent_receipts):
+    def set_chain_reaction(self, parent_task):
         # 获取order是避免每次都通过result去获取order，聊胜于无吧
         order = self.result.order
         # 如果符合要求，那么按约定提供他的父类的生成器和回执以供他回调时用到，他指的是链式反应标注携带者
-        setattr(self.result, "_chain_reaction", (parent_generator, parent_receipts))
-        # 设置flag为False和还原complete_callback
+        setattr(self.result, "_chain_reaction", parent_task)
+        # 设置flag为False
         # 这是因为chain_reaction现在更加的自由，他可能不知是修饰器，也可能函数调用
         # 如果是修饰器，被修饰的函数其实永远会链式反应，下面的步骤不是必须的
         # 但如果函数调用，那么我们应当只需要此次执行链式反应，而下次依旧原样，所以有此代码
+        # complete_callback无需还原，没有设置_chain_reaction的Task只会调用原本的complete_callback
         order.chain_reaction_flag = False
-        order.complete_callback = order.old_complete_callback
         # 象征意义的返回，事实上你返回任意值只有在是链式反应时才有作用
         return True
 
@@ -92,24 +92,18 @@ class AutoClosing(AutoCallback):
 
 class AutoReceipts(AutoCallback):
 
-    def __init__(self, receipts):
+    def __init__(self, task):
         """
         AutoReceipts 是一个上下文类，他的作用是：
-            遇到 StopIteration 时，自动调用 receipts.send(value) 其中的 value 是 exc_val.value
-            并且关闭 receipts -> 调用 receipts.close()
+            遇到 StopIteration 时，自动调用 task.finish(value) 其中的 value 是 exc_val.value
             tips: 使用 AutoReceipts 能够获得相比于原版代码更好的代码可读性
-        :param receipts: 通过Task类创建的单次调用回执
+        :param task: 单次调用的Task，旧版中是通过Task类创建的回执
         """
-        self.receipts = receipts
+        self.task = task
         super(AutoReceipts, self).__init__(callback=self.send_receipts, exceptions=StopIteration)
 
     def send_receipts(self, exc_type, exc_val, exc_tb):
-        receipts = self.receipts
-
-        with AutoClosing(receipts, StopIteration):
-            # 由于receipts是约定好的，所以理论上只有一次yield
-            # 当receipts触发StopIteration时，AutoClosing会自动捕获异常并关闭receipts
-            receipts.send(exc_val.value)
-
+        # 旧版的回执是一个只yield一次的生成器，现在由Task直接记录返回值并发出完成信号
+        self.task.finish(exc_val.value)
         return True
 
@@ -0,0 +1,363 @@
+import builtins
+from collections import deque
+from multiprocessing.dummy import Lock
+from queue import Empty, Full
+from threading import get_ident, local
+from time import monotonic
+
+from ..decorator.consigntask import Task, NO_START
+# 导入时 coroutineworker 可能尚未初始化完成（经由 decorator 循环导入），使用时再获取其中的内容
+from . import coroutineworker
+from .iterationcontext import AutoCallback
+from .suspend import Suspend
+
+# Admit 已经为当前线程接下来创建的Task占用了名额时，记录其WorkArea
+_admitted = local()
+
+
+class Semaphore(object):
+    """Semaphore是协程的信号量，限制同时执行某段代码的协程数量
+
+    与 ``threading.Semaphore`` 不同，获取不到时协程被挂起而不是阻塞线程，挂起中的协程不在队列中，不会被轮询
+
+    被挂起的协程按先后顺序获取， ``release`` 时直接交给最早的等待者
+
+    .. code-block:: python
+
+        semaphore = Semaphore(10)
+
+        @coroutine
+        def call_api(url):
+            yield semaphore.acquire()
+            try:
+                ...
+            finally:
+                semaphore.release()
+
+    也可以通过 ``coroutine(max_concurrency=...)`` 限制整个协程函数
+
+    :param int value: 同时可以获取的数量
+
+    :raise AssertionError: 当 ``value`` 小于1时抛出
+    """
+
+    def __init__(self, value: int=1):
+        assert value >= 1, "value 必须大于等于1"
+        self.value = value
+        # 挂起中的SemaphoreAcquire，先进先出
+        self.waiters = deque()
+        self.mutex = Lock()
+
+    def acquire(self):
+        """
+        :return: ``SemaphoreAcquire`` ，需要被协程yield，获取到之后协程才会继续执行
+        """
+        return SemaphoreAcquire(self)
+
+    def try_acquire(self):
+        """
+        不挂起的尝试获取
+
+        :return: 返回bool类型，True 表示获取成功
+        """
+        with self.mutex:
+            if self.value > 0 and not self.waiters:
+                self.value -= 1
+                return True
+            return False
+
+    def release(self):
+        """
+        释放一次，存在等待者时直接交给最早的等待者
+
+        :return: None
+        """
+        while True:
+            with self.mutex:
+                if not self.waiters:
+                    self.value += 1
+                    return
+                waiter = self.waiters.popleft()
+            # 等待者可能已经被取消了，此时交给下一个等待者
+            if waiter.resume():
+                return
+
+    def locked(self):
+        """
+        :return: 返回bool类型，True 表示此时获取会被挂起
+        """
+        return self.value <= 0
+
+    def __len__(self):
+        # 挂起中的等待者数量，包含已经被取消但还没有被跳过的
+        return len(self.waiters)
+
+
+class SemaphoreAcquire(Suspend):
+    """
+    挂起协程直到获取到 ``Semaphore`` ，通过 ``Semaphore.acquire`` 创建
+
+    :param Semaphore semaphore: 需要获取的 ``Semaphore``
+    """
+
+    def __init__(self, semaphore):
+        self.semaphore = semaphore
+
+    def suspend(self):
+        semaphore = self.semaphore
+        with semaphore.mutex:
+            if semaphore.value <= 0 or semaphore.waiters:
+                semaphore.waiters.append(self)
+                return
+            semaphore.value -= 1
+        self.resume()
+
+    def abandon(self, resume):
+        if resume.exception is None:
+            # 已经获取到了但协程在继续执行前被取消，归还
+            self.semaphore.release()
+
+
+class TokenBucket(object):
+    """TokenBucket是协程的令牌桶，限制每秒执行某段代码的次数
+
+    令牌以每秒 ``rate`` 个的速度放入桶中，桶中最多存放 ``capacity`` 个，每次获取消耗令牌，不足时协程被挂起直到令牌足够
+
+    挂起中的协程存放在 ``WorkArea`` 的定时器堆中，不在队列中，不会被轮询；令牌按获取的先后顺序预留，不会被后来者抢走
+
+    .. code-block:: python
+
+        bucket = TokenBucket(100)
+
+        @coroutine
+        def call_api(url):
+            yield bucket.acquire()
+            ...
+
+    也可以通过 ``coroutine(rate=...)`` 限制整个协程函数
+
+    :param float rate: 每秒放入的令牌数量
+
+    :param float capacity: 桶的容量，即允许的突发数量，默认为 ``rate`` 且至少为1
+
+    :raise AssertionError: 当 ``rate`` 不大于0时抛出
+    """
+
+    def __init__(self, rate: float, capacity: float=None):
+        assert rate > 0, "rate 必须大于0"
+        self.rate = rate
+        self.capacity = max(rate, 1) if capacity is None else capacity
+        # 当前的令牌数量，为负数时表示已经被预留的数量
+        self.tokens = self.capacity
+        self.updated = monotonic()
+        self.mutex = Lock()
+
+    def reserve(self, tokens=1):
+        """
+        预留 ``tokens`` 个令牌
+
+        :param tokens: 令牌数量，不能大于 ``capacity``
+        :return: 需要等待的时长（秒），为0时表示可以立即执行
+        """
+        assert tokens <= self.capacity, "tokens 不能大于 capacity"
+        with self.mutex:
+            now = monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate) - tokens
+            self.updated = now
+            return 0 if self.tokens >= 0 else -self.tokens / self.rate
+
+    def refund(self, tokens=1):
+        """
+        归还预留后没有使用的令牌
+
+        :param tokens: 令牌数量
+        :return: None
+        """
+        with self.mutex:
+            self.tokens = min(self.capacity, self.tokens + tokens)
+
+    def acquire(self, tokens=1):
+        """
+        :param tokens: 令牌数量，不能大于 ``capacity``
+        :return: ``TokenAcquire`` ，需要被协程yield，令牌足够后协程才会继续执行
+        """
+        return TokenAcquire(self, tokens)
+
+
+class TokenAcquire(Suspend):
+    """
+    挂起协程直到预留的令牌可用，通过 ``TokenBucket.acquire`` 创建
+
+    :param TokenBucket bucket: 需要获取的 ``TokenBucket``
+    :param tokens: 令牌数量
+    """
+
+    def __init__(self, bucket, tokens=1):
+        self.bucket, self.tokens = bucket, tokens
+
+    def suspend(self):
+        delay = self.bucket.reserve(self.tokens)
+        if delay <= 0:
+            self.resume()
+        else:
+            self.expire_at(monotonic() + delay)
+
+    def abandon(self, resume):
+        if resume.exception is not None:
+            # 等待中被取消，预留的令牌没有被使用
+            self.bucket.refund(self.tokens)
+
+
+def throttle(generator, semaphore=None, bucket=None):
+    """
+    ``coroutine(max_concurrency=..., rate=...)`` 使用，包装协程的生成器，先获取令牌与信号量再执行，完成时释放信号量
+
+    :param generator: 协程的生成器
+    :param Semaphore semaphore: 限制同时执行的数量，为None时不限制
+    :param TokenBucket bucket: 限制每秒开始执行的数量，为None时不限制
+    :return: 生成器
+    """
+    if bucket is not None:
+        yield bucket.acquire()
+    if semaphore is None:
+        return (yield from generator)
+
+    yield semaphore.acquire()
+    try:
+        return (yield from generator)
+    finally:
+        semaphore.release()
+
+
+def _droppable(task):
+    # 只丢弃还没有开始且没有被取消的Task，停止信号与协程的后续步骤不受影响
+    return task is not None and task.state == NO_START and task.cancel_exception is None
+
+
+def admit_new_task(work_area):
+    """
+    由 ``coroutine`` 在有界的 ``WorkArea`` （ ``WorkArea(capacity=...)`` ）中创建 ``Task`` 前调用，占用一个名额
+
+    名额已满时按照 ``overflow`` 处理，详情请查看 ``Admission``
+
+    :param WorkArea work_area: 新的 ``Task`` 所在的 ``WorkArea``
+    :return: None
+
+    :raise Full: ``overflow`` 为 "reject" 且名额已满时抛出
+    """
+    admission = work_area.admission
+    if getattr(_admitted, "work_area", None) is work_area:
+        # Admit 已经占用了名额
+        _admitted.work_area = None
+        return
+    if admission.try_admit():
+        return
+
+    if admission.overflow == "reject":
+        with admission.mutex:
+            admission.rejected += 1
+        raise Full("{work_area} 已满，最多 {capacity} 个等待开始的Task".format(
+            work_area=work_area, capacity=admission.capacity))
+
+    if admission.overflow == "drop_oldest":
+        dropped = work_area.queue.remove_first(_droppable)
+        if dropped is not None:
+            # 被丢弃的Task的名额直接交给新的Task
+            dropped.cancel_exception = exception = Full("{task} 在开始前被丢弃".format(task=dropped))
+            dropped.generator.close()
+            dropped.finish(exception)
+            with admission.mutex:
+                admission.dropped += 1
+            return
+        # 队列中没有可以丢弃的Task（例如都被其他线程取走了），等待空位
+
+    ident, stop_num = get_ident(), 0
+    coroutine_worker = coroutineworker.CoroutineWorker(work_area=work_area)
+    # 与 wait 相同，当前线程持有的内容需要先放回队列
+    coroutineworker.flush_work_batch()
+    try:
+        while not admission.try_admit(ident):
+            with AutoCallback(None, (Empty, StopIteration)):
+                if coroutine_worker.work_once() is False:
+                    stop_num += 1
+    finally:
+        admission.unblock(ident)
+        # 将结束信号原路返回
+        for _ in range(stop_num):
+            coroutine_worker.submit_work(None)
+
+
+class Admit(Suspend):
+    """
+    挂起协程直到有界的 ``WorkArea`` 有空位，随后调用 ``func`` ，通过 ``admit`` 创建
+
+    空出的名额按挂起的先后顺序直接交给等待者，协程以新的 ``Task`` 作为yield的返回值
+
+    :param func: 被 ``coroutine`` 修饰的函数
+    :param args: ``func`` 的参数
+    :param kwargs: ``func`` 的参数
+    """
+
+    def __init__(self, func, args, kwargs):
+        self.func, self.args, self.kwargs = func, args, kwargs
+        # 新的Task所在的WorkArea，与直接调用时相同
+        self.target = builtins.DEFAULT_WORK_AREA.get()
+
+    def suspend(self):
+        admission = self.target.admission
+        if admission is None or admission.admit_or_wait(self):
+            self.create()
+
+    def grant(self):
+        """
+        ``Admission.release`` 将空出的名额交给此等待者时调用
+
+        :return: 返回bool类型，False 表示协程已经被取消，名额没有被使用
+        """
+        if self not in self.work_area.parking:
+            return False
+        self.create()
+        return True
+
+    def create(self):
+        target = self.target
+        _admitted.work_area = target
+        try:
+            with target:
+                task = self.func(*self.args, **self.kwargs)
+        except Exception as e:
+            self.resume(exception=e)
+            return
+        finally:
+            if _admitted.work_area is not None:
+                # func 没有创建Task，名额没有被使用
+                _admitted.work_area = None
+                if target.admission is not None:
+                    target.admission.release()
+        if not self.resume(task) and isinstance(task, Task):
+            # 创建的同时协程被取消了
+            task.cancel()
+
+    def abandon(self, resume):
+        if resume.exception is None and isinstance(resume.value, Task):
+            # 协程在收到新的Task前被取消，新的Task同样不再需要
+            resume.value.cancel()
+
+
+def admit(func, *args, **kwargs):
+    """
+    协程中调用有界的 ``WorkArea`` （ ``WorkArea(capacity=...)`` ）中的协程函数，名额已满时挂起而不是阻塞线程
+
+    .. code-block:: python
+
+        @coroutine
+        def producer(urls):
+            for url in urls:
+                task = yield admit(download, url)
+
+    :param func: 被 ``coroutine`` 修饰的函数
+    :param args: ``func`` 的参数
+    :param kwargs: ``func`` 的参数
+    :return: ``Admit`` ，需要被协程yield，协程以 ``func`` 返回的 ``Task`` 作为yield的返回值
+    """
+    return Admit(func, args, kwargs)
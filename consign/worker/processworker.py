@@ -0,0 +1,127 @@
+from concurrent.futures import ProcessPoolExecutor
+from os import getpid
+
+from ..decorator.consigndecorator import coroutine
+from ..workarea import WorkArea
+from ..utils.offload import Offload
+from .coroutineworker import CoroutineWorker
+from .wait import wait
+
+
+def run_in_process(func, args, kwargs):
+    """
+    子进程中执行的函数，一般不建议外部调用
+
+    子进程在独立的 ``WorkArea`` 中调用 ``func`` ，并使用 ``wait`` 以当前进程作为 ``CoroutineWorker`` 工作直到完成
+
+    使用独立的 ``WorkArea`` 是因为fork出的子进程会复制父进程中的 ``WorkArea`` ，其中的队列与锁并不可信
+
+    :param func: 被 ``coroutine`` 修饰的委托函数，或者普通的函数
+    :param tuple args: 参数
+    :param dict kwargs: 参数
+    :return: 协程函数的返回值
+    """
+    with WorkArea("ProcessWorker_{pid}".format(pid=getpid())):
+        return wait(func(*args, **kwargs))
+
+
+@coroutine
+def process_consign(executor, func, args, kwargs):
+    """
+    父进程中代表子进程任务的协程，挂起直到子进程返回
+
+    :return: 子进程中协程函数的返回值
+    """
+    return (yield Offload(executor, run_in_process, func, args, kwargs))
+
+
+class ProcessWorker(CoroutineWorker):
+    """ProcessWorker进程协程Worker，ProcessWorker能够将协程函数交给多个子进程执行，以应对cpu密集的协程
+
+    ``AsyncWorker`` 的线程受到GIL的限制，cpu密集的协程无论有多少线程都只能使用一个cpu
+
+    ``ProcessWorker`` 将 **协程函数以及参数** 交给子进程，每个子进程以独立的 ``WorkArea`` 和 ``CoroutineWorker`` 执行协程
+
+    同时在父进程的 ``WorkArea`` 中返回一个 ``Task`` ，子进程返回后 ``Task`` 以子进程的返回值完成
+
+    .. warning::
+
+        协程函数以及参数、返回值都需要能被 ``pickle`` 序列化
+
+        通常这意味着协程函数需要定义在模块的顶层，被 ``coroutine`` 修饰的委托函数在模块顶层时是可以被序列化的
+
+    .. note::
+
+        子进程中的协程与父进程 **不共享** ``WorkArea`` ，所以子进程中的 ``Task`` 无法被父进程 ``wait``
+
+        父进程中的 ``Task`` 同样需要有 ``Worker`` 工作，例如 ``wait`` 或者 ``AsyncWorker``
+
+    ----
+
+    例子
+
+    .. code-block:: python
+
+        @coroutine
+        def cpu_bound(n):
+            yield ...
+            return sum(i * i for i in range(n))
+
+        process_worker = ProcessWorker(4)
+        tasks = [process_worker.submit(cpu_bound, 10 ** 7) for _ in range(4)]
+        print([wait(task) for task in tasks])
+
+    :param int process_num: 子进程的数量，为None时使用cpu数量
+
+    :param str work_area_name:
+
+        ``WorkArea`` 的名字，父进程中的 ``Task`` 会在此 ``WorkArea`` 中
+
+    :param WorkArea work_area:
+
+        work_area是显式参数，需要显式调用
+
+        可以直接指定 ``WorkArea`` ，如果直接指定，会跳过 ``work_area_name`` 的查找过程
+
+    :param mp_context: 子进程的 ``multiprocessing`` 上下文，例如 ``multiprocessing.get_context("spawn")``
+
+    :raise AssertionError:
+        当传入参数 ``work_area_name`` 无法被找到时抛出
+
+    """
+
+    def __init__(self, process_num=None, work_area_name: str = "DEFAULT_WORK_AREA", *, work_area=None,
+                 mp_context=None):
+        super(ProcessWorker, self).__init__(work_area_name, work_area=work_area)
+        self.show_str = "<ProcessWorker at {work_id} work in {work_area}>".format(
+            work_id=hex(id(self)), work_area=self.work_area)
+
+        #: 子进程池
+        # mp_context 在python3.7后才被支持，所以只在传入时使用
+        self.executor = ProcessPoolExecutor(process_num) if mp_context is None else \
+            ProcessPoolExecutor(process_num, mp_context=mp_context)
+
+    def submit(self, func, *args, **kwargs):
+        """
+        将协程函数的调用交给子进程执行
+
+        :param func: 被 ``coroutine`` 修饰的委托函数，普通的函数同样可以
+
+        :param args: 参数
+
+        :param kwargs: 参数
+
+        :return: 父进程 ``WorkArea`` 中的 ``Task`` ，子进程返回后以子进程的返回值完成
+        """
+        with WorkArea(self.work_area.name):
+            return process_consign(self.executor, func, args, kwargs)
+
+    def shutdown(self, wait_done=True):
+        """
+        关闭子进程池
+
+        :param bool wait_done: 是否阻塞等待已经提交的协程在子进程中执行完毕
+
+        :return: None
+        """
+        self.executor.shutdown(wait=wait_done)
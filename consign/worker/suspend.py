@@ -0,0 +1,217 @@
+from asyncio import ensure_future, isfuture, CancelledError
+from inspect import iscoroutine
+from time import perf_counter
+
+
+class Resume(object):
+    """
+    唤醒凭证，被挂起的协程被唤醒时， ``Task`` 的 ``yield_value`` 被设置为 ``Resume`` 并重新提交到 ``WorkArea`` 队列
+
+    ``Worker`` 遇到 ``Resume`` 时不会调用或检查链式反应，而是直接将 ``value`` send 给生成器
+
+    如果 ``exception`` 不为None，那么会将 ``exception`` throw 给生成器
+
+    ``suspend`` 是发出此凭证的 ``Suspend`` ，协程在收到凭证前被取消时，通过他的 ``abandon`` 归还已经获取的资源
+    """
+    __slots__ = ("value", "exception", "suspend")
+
+    def __init__(self, value=None, exception=None, suspend=None):
+        self.value = value
+        self.exception = exception
+        self.suspend = suspend
+
+    def send_to(self, generator):
+        if self.exception is not None:
+            return generator.throw(self.exception)
+        return generator.send(self.value)
+
+
+class Suspend(object):
+    """Suspend是挂起的基类，协程yield一个Suspend时，协程会被挂起(停车)直到被唤醒
+
+    被挂起的协程既不在 ``WorkArea`` 的队列中，也不会被轮询，所以挂起中的协程 **不会占用任何一次Work**
+
+    ``Worker`` 在遇到 ``Suspend`` 时会调用 ``park`` ，将协程的生成器和 ``Task`` 交给 ``Suspend`` 保管
+
+    随后 ``Suspend`` 负责在合适的时候调用 ``resume`` 将协程重新提交回 ``WorkArea`` 队列
+
+    .. tip::
+
+        继承 ``Suspend`` 并实现 ``suspend`` 方法，就可以实现自定义的挂起方式
+
+        ``suspend`` 方法需要保证未来的某个时候 ``resume`` 会被调用
+
+    ``resume`` 只有第一次调用会生效，所以多个唤醒条件（例如超时与完成）相互竞争是安全的
+
+    """
+
+    def park(self, work_area, task):
+        """
+        由 ``Worker`` 调用，挂起协程
+
+        :param WorkArea work_area: 协程所在的 ``WorkArea``
+        :param Task task: 协程此次调用的 ``Task`` ，其中记录了协程的生成器
+        :return: None
+        """
+        self.work_area, self.task = work_area, task
+        work_area.parking.add(self)
+        if work_area.tracer is not None:
+            work_area.tracer.park(task, self.__class__.__name__)
+        if task.cancel_exception is not None:
+            # 挂起前已经被取消了，不再等待
+            self.resume(exception=task.cancel_exception)
+            return
+        self.suspend()
+
+    def suspend(self):
+        """
+        需要被子类实现，安排在未来某个时刻调用 ``resume``
+
+        :return: None
+        """
+        raise NotImplementedError
+
+    def resume(self, value=None, exception=None):
+        """
+        唤醒被挂起的协程，协程会以 ``value`` 作为yield的返回值，或者在yield处抛出 ``exception``
+
+        :param value: 协程yield的返回值
+        :param exception: 如果不为None，那么在协程yield处抛出
+        :return:
+
+            返回bool类型，False 表示协程已经被唤醒过了，此次调用没有生效
+        """
+        try:
+            # set.remove 是原子的，保证多个唤醒条件竞争时只有一个生效
+            self.work_area.parking.remove(self)
+        except KeyError:
+            return False
+
+        self.task.yield_value = Resume(value, exception, self)
+        if self.work_area.metrics is not None:
+            self.task.queued_at = perf_counter()
+        if self.work_area.tracer is not None:
+            self.work_area.tracer.wake(self.task, self.__class__.__name__)
+        self.work_area.queue.put(self.task)
+        return True
+
+    def abandon(self, resume):
+        """
+        协程已经被唤醒，但在收到 ``resume`` 前被取消时由 ``Task.throw_cancel`` 调用，默认什么都不做
+
+        需要归还资源的子类（例如 ``SemaphoreAcquire`` ）可以实现此方法
+
+        :param Resume resume: 没有被送达的唤醒凭证
+        :return: None
+        """
+
+    def expire_at(self, deadline):
+        """
+        将自身放入 ``WorkArea`` 的定时器堆，截止时间到达后 ``expire`` 会被调用
+
+        :param float deadline: 截止时间，以 ``time.monotonic`` 为准
+        :return: None
+        """
+        work_area = self.work_area
+        if work_area.timer.push(deadline, self):
+            # 成为最早到期的对象时，唤醒正在按截止时间等待的线程重新计算等待时长
+            work_area.queue.wakeup(work_area.timer.watcher, keep=True)
+
+    def expire(self):
+        """
+        定时器到期时被 ``Worker`` 调用，默认直接唤醒协程
+
+        :return: None
+        """
+        self.resume()
+
+
+class SleepUntil(Suspend):
+    """
+    挂起协程直到截止时间到达，截止时间以 ``time.monotonic`` 为准
+
+    被挂起的协程存放在 ``WorkArea`` 的 ``TimerHeap`` 中，由 ``Worker`` 在截止时间到达后唤醒
+
+    :param float deadline: 截止时间
+    """
+
+    def __init__(self, deadline):
+        self.deadline = deadline
+
+    def suspend(self):
+        self.expire_at(self.deadline)
+
+
+class AsyncioAwait(Suspend):
+    """
+    挂起协程直到asyncio的 ``Future`` 或者协程完成
+
+    协程中直接yield一个 asyncio 的 ``Future`` 或者 ``async def`` 协程时， ``Worker`` 会自动使用 ``AsyncioAwait``
+
+    asyncio 的 ``Future`` 在他所属的事件循环中等待
+
+    ``async def`` 协程在 ``loop`` 中执行，``loop`` 为None时使用正在驱动此 ``WorkArea`` 的事件循环（ ``AsyncioWorker`` ）
+
+    :param awaitable: asyncio 的 ``Future`` 或者 ``async def`` 协程
+
+    :param loop: 执行 ``awaitable`` 的事件循环
+
+    :raise RuntimeError: 挂起时找不到可以执行 ``awaitable`` 的事件循环时抛出
+    """
+
+    def __init__(self, awaitable, loop=None):
+        self.awaitable, self.loop = awaitable, loop
+
+    @staticmethod
+    def is_awaitable(something):
+        """
+        :return: 返回bool类型，True 表示 ``something`` 是 asyncio 的 ``Future`` 或者 ``async def`` 协程
+        """
+        return isfuture(something) or iscoroutine(something)
+
+    def suspend(self):
+        # Future 自带所属的事件循环，get_loop 在python3.7后才被支持
+        loop = self.loop or getattr(self.awaitable, "_loop", None) or self.work_area.event_loop
+        if loop is None:
+            self.resume(exception=RuntimeError(
+                "{awaitable} 没有可以执行的事件循环，请使用 AsyncioWorker 驱动此 WorkArea 或者指定 loop".format(
+                    awaitable=self.awaitable)))
+            return
+
+        # 事件循环不是线程安全的，所以总是交给事件循环所在的线程执行
+        loop.call_soon_threadsafe(self.schedule, loop)
+
+    def schedule(self, loop):
+        ensure_future(self.awaitable, loop=loop).add_done_callback(self.future_done)
+
+    def future_done(self, future):
+        if future.cancelled():
+            self.resume(exception=CancelledError())
+        elif future.exception() is not None:
+            self.resume(exception=future.exception())
+        else:
+            self.resume(future.result())
+
+
+class AwaitDone(Suspend):
+    """
+    挂起协程直到 ``Completion`` 或者 ``Task`` 完成，协程以完成时的值作为yield的返回值，被取消（失败）时在yield处抛出
+
+    通常使用 ``agather`` 、 ``await_any`` 、 ``AsCompleted.anext`` 与 ``cached_coroutine`` 的 ``acall``
+
+    与 ``chain_reaction`` 不同，同一个 ``Task`` 可以同时被任意多个协程等待
+
+    :param completion: 等待的完成信号，拥有 ``add_done_callback`` 与 ``cancelled`` 方法
+    """
+
+    def __init__(self, completion):
+        self.completion = completion
+
+    def suspend(self):
+        self.completion.add_done_callback(self.completion_done)
+
+    def completion_done(self, completion):
+        if completion.cancelled():
+            self.resume(exception=completion.value)
+        else:
+            self.resume(completion.value)
@@ -1,15 +1,10 @@
 from queue import Empty
+from threading import get_ident
+from time import perf_counter, monotonic
 
-from ..decorator.consigntask import Task, TaskResult, TaskState
-from ..decorator.consigndecorator import coroutine
-from .coroutineworker import CoroutineWorker
+from ..decorator.consigntask import Task, TaskResult
+from .coroutineworker import CoroutineWorker, flush_work_batch
 from .iterationcontext import AutoCallback
-from ..workarea import WorkArea
-
-
-def pass_func():
-    # 后期考虑添加其他逻辑，帮助其他任务等
-    pass
 
 
 class Supervisor:
@@ -20,11 +15,13 @@ class Supervisor:
 
     ``Supervisor`` 能够阻塞等待一个 ``Task`` 任务完成，并在期间参与工作
 
-    ``Supervisor``  的原理是： ``Supervisor`` 向此 ``Task`` 类中的 ``WorkArea`` 提交 一个 *轮询* 任务
+    ``Supervisor``  的原理是： ``Supervisor`` 向此 ``Task`` 添加完成信号的回调（ ``Task.add_done_callback`` ）
+
+    等待期间 ``Supervisor`` 作为一个 ``Worker`` 参与工作，不会向队列提交任何轮询任务
 
-    *轮询* 任务的作用就是每次执行控制权切换前判断 ``Task`` 的状态是否是已完成
+    队列为空时， ``Supervisor`` 与其他空闲的线程一样挂起在 ``WorkArea`` 的队列上
 
-    当 ``Supervisor`` 在接收到 ``Task`` 完成信号后，会在执行完当前手头内容后退出阻塞并返回返回值
+    当 ``Task`` 完成时，完成信号会立即唤醒 ``Supervisor`` ，随后在执行完当前手头内容后退出阻塞并返回返回值
 
     更多详情请查看 wait 函数
 
@@ -38,16 +35,29 @@ class Supervisor:
         self.task = task
         self.wait_flag = True
         self.value = TaskResult.NoGet
+        #: 等待中的线程，完成信号会唤醒此线程
+        self.ident = get_ident()
         self.coroutine_worker = CoroutineWorker(work_area=task.work_area)
-        self.show_str = "<Supervisor at {work_id} wait in {work_area}>".format(
-            work_id=hex(id(self)), work_area=task.work_area)
+        # 与CoroutineWorker相同，在第一次__str__时才生成
+        self.show_str = None
 
-        with WorkArea(task.work_area.name):
-            self.polling_func()
+        task.add_done_callback(self.task_done)
 
-    def run_until_complete(self, time_out=0.1):
+    def task_done(self, task):
+        """
+        ``Task`` 的完成信号回调，记录返回值并唤醒挂起中的 ``Supervisor``
+
+        :param Task task: 完成的 ``Task``
+        :return: None
         """
-        阻塞、工作直到轮询任务完成
+        self.wait_flag, self.value = False, task.value
+        if self.ident != get_ident():
+            # 如果是在等待的线程中完成的，那么他并没有挂起，无需唤醒
+            self.coroutine_worker.work_area.queue.wakeup(self.ident)
+
+    def run_until_complete(self, time_out=None, timeout=None):
+        """
+        阻塞、工作直到 ``Task`` 完成
 
         :param time_out:
 
@@ -55,50 +65,66 @@ class Supervisor:
 
             等待 ``WorkArea``  队列获取内容的等待超时时长
 
-            也是最短轮询的间隔，他一般用在多线程中，当对应 ``WorkArea`` 的 ``queue`` 为空时，``time_out`` 才会触发
+            默认为None，``Task`` 完成时会立即唤醒，不受 ``time_out`` 影响
+
+        :param timeout:
+
+            最多等待的时长（秒），默认为None表示一直等待
 
         :return:
 
             ``Task`` 类中的value，也就是对应协程的返回值
-        """
-        while self.wait_flag:
-            with AutoCallback(None, (Empty, StopIteration)):
-                # 当work_once返回false，说明是结束信号,但Supervisor暂时不考虑作处理，不然可能卡死
-                _ = self.coroutine_worker.work_once(time_out)
-                # 现在临时添加逻辑，当获取停止信号时，原路返回，这样可以保证不会吞结束信号
-                # 但依旧可能存在协程异常退出而异步没收到的情况
-                if _ is False:
-                    self.coroutine_worker.submit_work(None, None, None)
-        return self.value
 
-    @coroutine
-    def polling_func(self):
-        """
-        轮询任务，用于判断 ``Task`` 的状态
+        :raise TimeoutError: 超过 ``timeout`` 时 ``Task`` 依旧没有完成时抛出
 
-        他是一个 ``coroutine`` 修饰的协程函数
+        :raise CancelledError: ``Task`` 被取消时抛出取消时的异常，详情请查看 ``Task.cancel``
+        """
+        coroutine_worker, stop_num = self.coroutine_worker, 0
+        deadline = None if timeout is None else monotonic() + timeout
+        tracer, start = coroutine_worker.work_area.tracer, perf_counter()
+        # 在work_batch中wait时，当前线程持有的内容需要先放回队列，被等待的协程可能就在其中
+        flush_work_batch()
+        try:
+            while self.wait_flag:
+                poll_time_out = time_out
+                if deadline is not None:
+                    remaining = deadline - monotonic()
+                    if remaining <= 0:
+                        raise TimeoutError("等待 {task} 超时".format(task=self.task))
+                    poll_time_out = remaining if time_out is None else min(time_out, remaining)
+                with AutoCallback(None, (Empty, StopIteration)):
+                    # 当work_once返回false，说明是结束信号, 但Supervisor暂时不考虑作处理，不然可能卡死
+                    if coroutine_worker.work_once(poll_time_out) is False:
+                        stop_num += 1
+        finally:
+            # 等待结束后将结束信号原路返回，这样可以保证不会吞结束信号
+            for _ in range(stop_num):
+                coroutine_worker.submit_work(None)
+            if tracer is not None:
+                tracer.span("wait", start, perf_counter(), self.task)
+        if self.task.cancelled():
+            raise self.value
+        return self.value
 
-        ``Supervisor`` 会自动继承 ``Task`` 中的 ``WorkArea`` 并在此提交
+    def __str__(self):
+        if self.show_str is None:
+            self.show_str = "<Supervisor at {work_id} wait in {work_area}>".format(
+                work_id=hex(id(self)), work_area=self.task.work_area)
+        return self.show_str
 
-        每次执行控制权切换前判断 ``Task`` 的状态是否是已完成，完成会告知 ``Supervisor``
+    __repr__ = __str__
 
-        :return: None
-        """
-        while self.task.task_state is not TaskState.TaskDone:
-            yield pass_func
-        self.wait_flag, self.value = False, self.task.value
 
-
-def wait(task, *, time_out=0.1):
+def wait(task, *, time_out=None, timeout=None):
     """wait阻塞等待一个Task任务完成，并在期间参与工作
 
     ``wait`` 是 ``Supervisor`` 类的上层封装
 
-    简单的讲，他的作用就是轮询等待一个 ``Task``
+    简单的讲，他的作用就是等待一个 ``Task`` 的完成信号
 
     当这一个 ``Task`` 的状态转变为结束后 :abbr:`返回此 Task 的value (也就是对应协程函数的返回值)`
 
-    期间他会将自身代入成为一个 ``Worker`` 进行 ``loop_work``
+    期间他会将自身代入成为一个 ``Worker`` 参与工作
 
     某种程度上看，``wait`` 相当于特别一点的 ``loop_work`` ，主要在于他的 ``WorkArea`` 继承机制
 
@@ -107,11 +133,11 @@ def wait(task, *, time_out=0.1):
     ``wait`` 一个 ``Task`` 时，他会继承 ``Task`` 中的 ``WorkArea`` 并生成对应的 ``CoroutineWorker`` 进行 ``loop_work``
 
     ``wait``  不对 :abbr:`约定的结束信号 (是自定义的一种情况，使用者基本无需关心)` 做处理
-    碰到结束信号时他会重新提交回原 ``WorkArea``
+    碰到结束信号时他会在等待结束后重新提交回原 ``WorkArea``
 
-    ``wait``  轮询的时间是 **不精确的** ，受到当前任务量和阻塞时间的影响
+    ``wait``  返回的时间是 **不精确的** ，受到当前任务量和阻塞时间的影响
 
-        因为 ``wait`` 的轮询任务在转移控制权的过程中，队列里依旧存在其余任务
+        因为 ``wait`` 在参与工作的过程中，需要执行完当前手头内容才能返回
 
         你无法保证下一个任务是不是阻塞的
 
@@ -121,9 +147,9 @@ def wait(task, *, time_out=0.1):
 
         你可以通过创建 **充足的线程** 以应对这个问题，同时 **尽可能的切分函数控制权** 提高控制权转换的频率
 
-    ``wait``  的原理是： ``wait`` 向此 ``Task`` 类中的 ``WorkArea`` 提交 一个 *轮询* 任务
+    ``wait``  的原理是： ``wait`` 向此 ``Task`` 添加完成信号的回调，不会向队列提交任何 *轮询* 任务
 
-    *轮询* 任务的作用就是每次执行控制权切换前判断 ``Task`` 的状态是否是已完成
+    队列为空时 ``wait`` 挂起在队列上，所以同时存在许多 ``wait`` 也不会占用任何一次Work
 
     当 ``wait`` 在接收到 ``Task`` 完成信号后，会在执行完当前手头内容后退出阻塞并返回返回值
 
@@ -133,14 +159,22 @@ def wait(task, *, time_out=0.1):
 
     :param time_out:
 
-        最短轮询的间隔，他一般用在多线程中，当对应 ``WorkArea`` 的 ``queue`` 为空时，``time_out`` 才会触发
+        等待 ``WorkArea``  队列获取内容的等待超时时长，当对应 ``WorkArea`` 的 ``queue`` 为空时，``time_out`` 才会触发
+
+        默认为None， ``Task`` 完成、有新的内容或者定时器到期时都会立即唤醒，无需设置
+
+    :param timeout:
 
-        .. warning::
+        最多等待的时长（秒），默认为None表示一直等待直到 ``Task`` 完成
 
-            尽可能不要设置 ``time_out`` 为 ``None``
+        .. note::
 
-            这或许会导致 ``wait`` 被阻塞没法正常退出
+            超时只是不再等待， ``Task`` 依旧会继续执行，不再需要时请使用 ``Task.cancel``
 
     :return: 目标 ``Task`` 中的 ``value``
+
+    :raise TimeoutError: 超过 ``timeout`` 时 ``Task`` 依旧没有完成时抛出
+
+    :raise CancelledError: ``Task`` 被取消时抛出取消时的异常（ ``coroutine(timeout=...)`` 超时时为 ``TimeoutError`` ）
     """
-    return Supervisor(task).run_until_complete(time_out) if isinstance(task, Task) else task
+    return Supervisor(task).run_until_complete(time_out, timeout) if isinstance(task, Task) else task
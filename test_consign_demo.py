@@ -1,9 +1,26 @@
+import os
+import json
+import pstats
+import functools
 import time
+import asyncio
+import socket
 import threading
+import queue
+import gc
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
 
 from consign import WorkArea
-from consign import coroutine, asleep, wait
-from consign import CoroutineWorker, AsyncWorker
+from consign.decorator.consigntask import TaskState
+from consign.workarea.runqueue import RunQueue
+from consign import coroutine, asleep, wait, in_thread, readable, Offload
+from consign import gather, agather, wait_any, await_any, as_completed, Semaphore, TokenBucket, admit
+from consign import cached_coroutine, chain_reaction, Channel, ChannelClosed, imap_unordered
+import consign
+from consign import CoroutineWorker, AsyncWorker, ProcessWorker, AsyncioWorker
 
 
 DEBUG = False
@@ -67,3 +84,879 @@ def test_async_worker():
         AsyncWorker().init_thread(4)
         time_sleep_run("time_sleep_run task1")
         assert wait(time_sleep_run("time_sleep_run task2")) == "time_sleep_run task2"
+
+
+@coroutine(DEBUG)
+def asleep_return(secs: float):
+    yield asleep(secs)
+    return secs
+
+
+def test_asleep_parking():
+    with WorkArea("test_asleep_parking") as work_area:
+        tasks = [asleep_return(0.2) for _ in range(100)]
+        worker = CoroutineWorker(work_area=work_area)
+
+        while worker.qsize() > 0:
+            worker.work_once(0)
+        # 休眠中的协程全部挂起在定时器堆中，不再占用队列
+        assert len(work_area.parking) == len(work_area.timer) == 100
+
+        worker.loop_work(forever=False)
+        assert [task.value for task in tasks] == [0.2] * 100
+        assert len(work_area.parking) == len(work_area.timer) == 0
+
+    # 定时器没有watcher且没有线程挂起时，唤醒留给下一个挂起的线程，刚检查过定时器的线程不会一直挂起
+    run_queue = RunQueue()
+    run_queue.wakeup()
+    start = time.monotonic()
+    with pytest.raises(queue.Empty):
+        run_queue.get(timeout=0.1)
+    assert time.monotonic() - start >= 0.1
+    run_queue.wakeup(keep=True)
+    start = time.monotonic()
+    with pytest.raises(queue.Empty):
+        run_queue.get(timeout=5)
+    assert time.monotonic() - start < 1 and not run_queue.pending_wakeup
+
+
+def test_wait_done_signal():
+    with WorkArea("test_wait_done_signal") as work_area:
+        task = asleep_return(0.1)
+        assert wait(task) == 0.1
+        # wait 不再提交轮询任务，完成后队列与挂起中都不会残留内容
+        assert work_area.queue.qsize() == 0 and len(work_area.parking) == 0
+
+        done_tasks = []
+        task.add_done_callback(done_tasks.append)
+        assert done_tasks == [task]
+
+
+def test_async_worker_stop():
+    with WorkArea("test_async_worker_stop") as work_area:
+        async_worker = AsyncWorker(work_area=work_area)
+        async_worker.init_thread(8)
+        # 空闲的线程挂起在队列上，提交的任务会被立即接收
+        assert wait(asleep_return(0.05)) == 0.05
+
+        start = time.monotonic()
+        async_worker.stop(join=True, time_out=1)
+        assert time.monotonic() - start < 0.5
+        assert len(async_worker.thread_list) == 0
+
+
+@coroutine(DEBUG)
+def batch_wait_run(holder: list):
+    yield
+    # 被等待的协程在同一批次中，wait前会被放回队列
+    return wait(holder[0]) + 1
+
+
+def test_work_batch():
+    with WorkArea("test_work_batch") as work_area:
+        holder = []
+        first = batch_wait_run(holder)
+        holder.append(asleep_return(0))
+        tasks = [asleep_return(i / 1000) for i in range(32)]
+
+        coroutine_worker = CoroutineWorker(work_area=work_area, batch_size=16)
+        coroutine_worker.loop_work(forever=False)
+        assert wait(first) == 1
+        assert [wait(task) for task in tasks] == [i / 1000 for i in range(32)]
+        assert work_area.queue.qsize() == 0
+
+
+def test_single_thread_work_area():
+    with WorkArea("test_single_thread_work_area", single_thread=True) as work_area:
+        holder = []
+        first = batch_wait_run(holder)
+        holder.append(asleep_return(0.01))
+        # in_thread在其他线程中唤醒协程
+        offload = offload_run(0.01)
+        tasks = [asleep_return(i / 1000) for i in range(16)]
+
+        CoroutineWorker(work_area=work_area).loop_work(forever=False)
+        assert wait(first) == 1.01
+        assert wait(offload) == 0.01
+        assert [wait(task) for task in tasks] == [i / 1000 for i in range(16)]
+        assert work_area.queue.qsize() == 0
+
+        # 其他线程只能提交，不能消费
+        results = []
+
+        def other_thread():
+            with WorkArea("test_single_thread_work_area"):
+                results.append(asleep_return(0))
+            try:
+                work_area.queue.get_nowait()
+            except RuntimeError as e:
+                results.append(e)
+
+        thread = threading.Thread(target=other_thread)
+        thread.start()
+        thread.join()
+        assert isinstance(results[1], RuntimeError)
+        assert wait(results[0]) == 0
+
+
+@coroutine(DEBUG, priority=-1)
+def priority_run(name: str, step_num: int, finished: list):
+    for _ in range(step_num):
+        yield
+    finished.append(name)
+
+
+def test_priority_work_area():
+    with WorkArea("test_priority_work_area", prioritized=True) as work_area:
+        finished = []
+        for i in range(20):
+            priority_run("background_{i}".format(i=i), 10, finished)
+        # 后提交的高优先级协程先于所有后台协程完成，同一优先级先进先出
+        urgent = [priority_run.with_priority(5)("urgent_{i}".format(i=i), 10, finished) for i in range(2)]
+        assert urgent[0].priority == 5 and priority_run.order.priority == -1
+        CoroutineWorker(work_area=work_area).loop_work(forever=False)
+        assert finished[:3] == ["urgent_0", "urgent_1", "background_0"]
+
+    with WorkArea("test_priority_aging", prioritized=True, aging=4) as work_area:
+        finished = []
+        priority_run("background", 3, finished)
+        for i in range(8):
+            priority_run.with_priority(1)("urgent_{i}".format(i=i), 10, finished)
+        # 老化后低优先级的协程不会被饿死
+        CoroutineWorker(work_area=work_area).loop_work(forever=False)
+        assert finished.index("background") < len(finished) - 1
+
+
+def test_work_stealing():
+    with WorkArea("test_work_stealing") as work_area:
+        async_worker = AsyncWorker(work_area=work_area)
+        async_worker.init_thread(4, scheduler="stealing")
+        tasks = [asleep_return(i / 1000) for i in range(64)]
+        # 被等待的协程可能在本地队列中，wait前会被放回WorkArea的队列
+        holder = []
+        waiter = batch_wait_run(holder)
+        holder.append(asleep_return(0.01))
+        assert [wait(task) for task in tasks] == [i / 1000 for i in range(64)]
+        assert wait(waiter) == 1.01
+
+        async_worker.stop(join=True, time_out=1)
+        assert len(async_worker.thread_list) == 0 and len(async_worker.local_deques) == 0
+
+    with WorkArea("test_work_stealing_stop_flag") as work_area:
+        async_worker = AsyncWorker(work_area=work_area)
+        async_worker.init_thread(1, scheduler="stealing")
+        running = [True]
+        task = spin_run(running)
+        time.sleep(0.05)
+        # 本地队列繁忙时，定期检查WorkArea的队列取到的结束信号同样生效
+        async_worker.submit_thread_stop_flag()
+        thread = async_worker.thread_list[0]
+        thread.join(1)
+        running[0] = False
+        assert not thread.is_alive()
+        CoroutineWorker(work_area=work_area).loop_work(forever=False)
+        assert task.value == "stopped"
+
+
+@coroutine(DEBUG)
+def spin_run(running: list):
+    while running[0]:
+        yield ...
+    return "stopped"
+
+
+def test_compact_task():
+    with WorkArea("test_compact_task") as work_area:
+        task = asleep_return(0)
+        # Task没有__dict__，回调与原函数从ConsignOrder中获取
+        assert not hasattr(task, "__dict__") and not hasattr(task.order, "__dict__")
+        assert task.consignor_func is task.order.consignor_func
+        assert task.task_state is TaskState.NoStart
+        CoroutineWorker(work_area=work_area).loop_work(forever=False)
+        assert task.task_state is TaskState.TaskDone and task.value == 0
+
+        # 在调用处重复使用chain_reaction，complete_callback只会被包装一次
+        task = call_site_chain_run(3000)
+        CoroutineWorker(work_area=work_area).loop_work(forever=False)
+        assert task.value == sum(range(3000))
+        assert chain_child_run.order.complete_callback.chain_reaction_order is chain_child_run.order
+        assert chain_child_run.order.old_complete_callback is None
+
+
+@coroutine(DEBUG)
+def chain_child_run(value):
+    yield
+    return value
+
+
+@coroutine(DEBUG)
+def call_site_chain_run(num: int):
+    total = 0
+    for i in range(num):
+        total += yield chain_reaction(chain_child_run)(i)
+    return total
+
+
+def test_work_area_metrics():
+    with WorkArea("test_work_area_metrics") as work_area:
+        assert work_area.metrics is None
+        metrics = work_area.enable_metrics()
+        tasks = [asleep_return(0.01) for _ in range(10)]
+        CoroutineWorker(work_area=work_area).loop_work(forever=False)
+        assert all(wait(task) == 0.01 for task in tasks)
+
+        snapshot = metrics.snapshot()
+        # asleep 本身也是协程，所以每个 asleep_return 创建两个 Task
+        assert snapshot["tasks_created"] == snapshot["tasks_completed"] == 20
+        # asleep_return：初始化、yield asleep、返回；asleep：初始化、yield SleepUntil、被唤醒后返回
+        assert snapshot["steps"] == snapshot["step_duration"]["count"] == snapshot["queue_wait"]["count"] == 50
+        assert snapshot["queue_depth"] == 0 and snapshot["parked"] == 0 and snapshot["workers"] == 0
+        assert snapshot["task_duration"]["count"] == 20 and snapshot["task_duration"]["p50"] >= 0.01
+
+        assert work_area.disable_metrics() is metrics and work_area.metrics is None
+
+
+@coroutine(DEBUG)
+def endless_run(cleaned: list):
+    try:
+        while True:
+            yield
+    finally:
+        cleaned.append(True)
+
+
+@coroutine(DEBUG, timeout=0.05)
+def timeout_run(secs: float):
+    yield asleep(secs)
+    return secs
+
+
+@chain_reaction
+@coroutine(DEBUG, timeout=0.05)
+def chain_timeout_child(secs: float):
+    yield asleep(secs)
+    return secs
+
+
+@coroutine(DEBUG)
+def chain_timeout_parent(secs: float):
+    try:
+        return "returned", (yield chain_timeout_child(secs))
+    except TimeoutError as e:
+        return "raised", e
+
+
+def test_task_cancel():
+    with WorkArea("test_task_cancel") as work_area:
+        cleaned = []
+        task = endless_run(cleaned)
+        threading.Timer(0.05, task.cancel).start()
+        CoroutineWorker(work_area=work_area).loop_work(forever=False)
+        # 协程在yield处收到取消并被释放
+        assert task.cancelled() and cleaned == [True] and not task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            wait(task)
+
+        # 超时时被挂起的协程与链式反应中的子协程一同被取消
+        start = time.monotonic()
+        with pytest.raises(TimeoutError):
+            wait(timeout_run(10))
+        assert time.monotonic() - start < 1 and len(work_area.parking) == 0
+        assert wait(timeout_run(0.01)) == 0.01
+
+        # 定时器堆不会保留提前完成的Task
+        timers = len(work_area.timer)
+        task = yield_return([0] * 1000)
+        task.cancel_after(100)
+        CoroutineWorker(work_area=work_area).loop_work(forever=False)
+        task_ref, task = weakref.ref(task), None
+        gc.collect()
+        assert task_ref() is None and len(work_area.timer) == timers + 1
+        for timeout in work_area.timer.pop_expired(time.monotonic() + 100):
+            timeout.expire()
+
+        # 链式反应中的子协程超时时，在父协程的yield处抛出而不是作为返回值
+        task = chain_timeout_parent(10)
+        CoroutineWorker(work_area=work_area).loop_work(forever=False)
+        assert task.value[0] == "raised" and isinstance(task.value[1], TimeoutError) and not task.cancelled()
+        assert wait(chain_timeout_parent(0.01)) == ("returned", 0.01)
+
+        task = asleep_return(10)
+        with pytest.raises(TimeoutError):
+            wait(task, timeout=0.05)
+        # wait超时只是不再等待
+        assert task.task_state is not TaskState.TaskDone
+        assert task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            wait(task)
+        assert len(work_area.parking) == 0 and work_area.queue.qsize() == 0
+
+
+@coroutine(DEBUG)
+def yield_return(value):
+    # 不创建子协程，在 AsyncWorker 的线程中执行时也不依赖线程的默认区域
+    yield
+    return value
+
+
+@coroutine(DEBUG)
+def gather_run(secs_list: list):
+    values = yield agather([asleep_return(secs) for secs in secs_list])
+    first = yield await_any([asleep_return(secs) for secs in secs_list])
+    completed = as_completed([asleep_return(secs) for secs in secs_list])
+    order = []
+    while True:
+        task = yield completed.anext()
+        if task is None:
+            break
+        order.append(task.value)
+    return values, first.value, order
+
+
+def test_gather():
+    with WorkArea("test_gather") as work_area:
+        secs_list = [0.05, 0.01, 0.03, 0.02, 0.04]
+        assert gather([asleep_return(secs) for secs in secs_list]) == secs_list
+        assert wait_any([asleep_return(secs) for secs in secs_list]).value == 0.01
+        assert [task.value for task in as_completed([asleep_return(secs) for secs in secs_list])] == sorted(secs_list)
+        assert wait(gather_run(secs_list)) == (secs_list, 0.01, sorted(secs_list))
+
+        # 一次等待成千上万的Task
+        async_worker = AsyncWorker(work_area=work_area)
+        async_worker.init_thread(2)
+        assert gather([yield_return(0.01) for _ in range(2000)]) == [0.01] * 2000
+        async_worker.stop(join=True, time_out=1)
+
+        tasks = [asleep_return(10), asleep_return(0.01)]
+        with pytest.raises(TimeoutError):
+            gather(tasks, timeout=0.05)
+        completed = as_completed(tasks, timeout=0.05)
+        assert next(completed) is tasks[1]
+        with pytest.raises(TimeoutError):
+            next(completed)
+        tasks[0].cancel()
+        assert next(completed) is tasks[0] and len(completed) == 0
+        with pytest.raises(asyncio.CancelledError):
+            gather(tasks)
+
+        # 没有Task时立即返回
+        assert gather([]) == [] and list(as_completed([])) == []
+        assert wait(agather_empty_run()) == []
+        with pytest.raises(ValueError):
+            wait_any([])
+
+
+@coroutine(DEBUG)
+def agather_empty_run():
+    return (yield agather([]))
+
+
+@coroutine(DEBUG, max_concurrency=3)
+def limited_run(running: list, peak: list):
+    running.append(True)
+    peak.append(len(running))
+    yield asleep(0.01)
+    running.pop()
+
+
+@coroutine(DEBUG, rate=TokenBucket(50, capacity=1))
+def rate_run():
+    return time.monotonic()
+
+
+def test_throttle():
+    with WorkArea("test_throttle") as work_area:
+        running, peak = [], []
+        tasks = [limited_run(running, peak) for _ in range(30)]
+        CoroutineWorker(work_area=work_area).loop_work(forever=False)
+        assert all(task.task_state is TaskState.TaskDone for task in tasks)
+        assert max(peak) == 3 and len(peak) == 30
+        assert limited_run.order.semaphore.value == 3
+
+        start = time.monotonic()
+        tasks = [rate_run() for _ in range(10)]
+        CoroutineWorker(work_area=work_area).loop_work(forever=False)
+        # 容量为1时每秒50个，第一个立即执行
+        assert time.monotonic() - start >= 9 / 50
+        assert tasks[-1].value - tasks[0].value >= 9 / 50 * 0.9
+
+        # 等待中被取消的协程不会占用信号量
+        semaphore = Semaphore(1)
+        assert semaphore.try_acquire() and not semaphore.try_acquire()
+
+        @coroutine(DEBUG)
+        def acquire_run():
+            yield semaphore.acquire()
+            semaphore.release()
+            return True
+
+        waiting = [acquire_run() for _ in range(3)]
+        coroutine_worker = CoroutineWorker(work_area=work_area)
+        for _ in range(6):
+            # 初始化、yield acquire 后被挂起
+            coroutine_worker.work_once(0)
+        assert len(semaphore) == 3 and len(work_area.parking) == 3
+        waiting[1].cancel()
+        semaphore.release()
+        coroutine_worker.loop_work(forever=False)
+        assert waiting[0].value is True and waiting[1].cancelled() and waiting[2].value is True
+        assert semaphore.value == 1 and len(semaphore) == 0
+
+        # 下一步是还没有被执行的Suspend时被取消，协程同样在yield处收到取消
+        task = acquire_run()
+        coroutine_worker.work_once(0)
+        assert task.cancel()
+        coroutine_worker.loop_work(forever=False)
+        assert task.cancelled() and semaphore.value == 1 and len(work_area.parking) == 0
+
+
+def test_work_area_tracer(tmp_path):
+    with WorkArea("test_work_area_tracer") as work_area:
+        tracer = work_area.enable_tracer()
+        async_worker = AsyncWorker(work_area=work_area)
+        async_worker.init_thread(2)
+        assert [wait(asleep_return(0.01)) for _ in range(3)] == [0.01] * 3
+        async_worker.stop(join=True, time_out=1)
+
+        tracer.dump(str(tmp_path / "consign.trace.json"))
+        with open(str(tmp_path / "consign.trace.json"), encoding="utf-8") as file:
+            events = json.load(file)["traceEvents"]
+        steps = [event for event in events if event["ph"] == "X" and event["cat"] == "step"]
+        # 与 test_work_area_metrics 相同，每个 asleep_return 执行5步
+        assert len(steps) == 15 and {event["name"] for event in steps} == {"asleep_return", "asleep"}
+        details = [event["args"]["detail"] for event in events if event["name"] in ("park", "wake")]
+        assert details.count("chain_reaction") == details.count("SleepUntil") == 6
+        assert len([event for event in events if event["name"] == "done"]) == 6
+        # 创建到第一步、SleepUntil唤醒到下一步；chain_reaction 唤醒的父协程直接在子协程的步中返回
+        assert len([event for event in events if event["ph"] == "f"]) == 9
+        assert len([event for event in events if event["name"] == "wait"]) == 3
+        assert work_area.disable_tracer() is tracer and work_area.tracer is None
+
+    with WorkArea("test_work_area_tracer_capacity") as work_area:
+        tracer = work_area.enable_tracer(capacity=10)
+        [asleep_return(0) for _ in range(10)]
+        CoroutineWorker(work_area=work_area).loop_work(forever=False)
+        # 环形缓冲只保留最新的记录
+        assert len(tracer.records) == 10 and tracer.records[-1][:3] == ("X", "asleep", "step")
+
+
+def blocking_sleep(secs: float):
+    time.sleep(secs)
+    return secs
+
+
+@coroutine(DEBUG)
+def profiled_run(secs: float):
+    yield
+    return (yield functools.partial(blocking_sleep, secs))
+
+
+def test_work_area_profiler(tmp_path):
+    with WorkArea("test_work_area_profiler") as work_area:
+        profiler = work_area.enable_profiler()
+        tasks = [profiled_run(0.01) for _ in range(5)]
+        CoroutineWorker(work_area=work_area).loop_work(forever=False)
+        assert [task.value for task in tasks] == [0.01] * 5
+
+        snapshot = profiler.snapshot()
+        [order], [func] = snapshot["orders"], snapshot["callables"]
+        # 初始化、yield、yield callable 后返回
+        assert order["name"] == "profiled_run" and order["steps"] == 15
+        # 阻塞在Worker中的时间记录在callable上，CPU时间远小于耗时
+        assert func["name"] == "blocking_sleep" and func["steps"] == 5
+        assert order["wall"] >= func["wall"] >= 0.05 and order["cpu"] < order["wall"] / 2
+        assert order["own_wall"] < func["wall"] and order["max_step"] >= 0.01
+        assert "profiled_run" in profiler.report()
+
+        profiler.dump_stats(str(tmp_path / "consign.prof"))
+        stats = pstats.Stats(str(tmp_path / "consign.prof"))
+        assert stats.total_calls == 20
+        assert work_area.disable_profiler() is profiler and work_area.profiler is None
+
+
+@coroutine(DEBUG)
+def offload_run(secs: float):
+    yield in_thread(time.sleep, secs)
+    try:
+        yield in_thread(int, "not a number")
+    except ValueError:
+        return secs
+
+
+@coroutine(DEBUG)
+def offload_submit_fail_run(executor):
+    try:
+        yield Offload(executor, time.sleep, 0)
+    except RuntimeError as e:
+        return e
+
+
+def test_offload_in_thread():
+    with WorkArea("test_offload_in_thread") as work_area:
+        tasks = [offload_run(0.2) for _ in range(8)]
+
+        start = time.monotonic()
+        CoroutineWorker(work_area=work_area).loop_work(forever=False)
+        # 阻塞的调用在线程池中执行，单线程的Worker不会被阻塞
+        assert time.monotonic() - start < 0.2 * 8 / 2
+        assert [task.value for task in tasks] == [0.2] * 8
+
+        # 提交失败时在yield处抛出，协程不会一直挂起
+        executor = ThreadPoolExecutor(1)
+        executor.shutdown()
+        task = offload_submit_fail_run(executor)
+        CoroutineWorker(work_area=work_area).loop_work(forever=False)
+        assert isinstance(task.value, RuntimeError) and not work_area.parking
+
+
+@coroutine(DEBUG)
+def cpu_bound_run(n: int):
+    total = 0
+    for i in range(n):
+        total += i * i
+        if i % 1000 == 0:
+            yield ...
+    return total, os.getpid()
+
+
+def test_process_worker():
+    with WorkArea("test_process_worker") as work_area:
+        process_worker = ProcessWorker(2, work_area=work_area)
+        tasks = [process_worker.submit(cpu_bound_run, 10000) for _ in range(4)]
+        results = [wait(task) for task in tasks]
+        process_worker.shutdown()
+
+        assert [total for total, _ in results] == [sum(i * i for i in range(10000))] * 4
+        assert os.getpid() not in {pid for _, pid in results}
+
+
+async def asyncio_double(value):
+    await asyncio.sleep(0.05)
+    return value * 2
+
+
+@coroutine(DEBUG)
+def asyncio_bridge_run(value: int):
+    yield asyncio.sleep(0.05)
+    value = yield asyncio_double(value)
+    yield asleep(0.05)
+    return value
+
+
+def test_asyncio_worker():
+    work_area = WorkArea("test_asyncio_worker")
+
+    async def main():
+        worker = AsyncioWorker(work_area=work_area)
+        with work_area:
+            # driver复制此时的上下文，协程中的asleep才会在此区域中创建
+            driver = asyncio.ensure_future(worker.loop_work_async())
+            tasks = [asyncio_bridge_run(i) for i in range(10)]
+        values = [await task for task in tasks]
+        worker.stop()
+        await driver
+        return values
+
+    loop = asyncio.new_event_loop()
+    try:
+        assert loop.run_until_complete(main()) == [i * 2 for i in range(10)]
+    finally:
+        loop.close()
+    assert work_area.event_loop is None
+
+
+@coroutine(DEBUG)
+def readable_recv(sock, timeout=None):
+    try:
+        yield readable(sock, timeout)
+    except TimeoutError:
+        return None
+    return sock.recv(1024)
+
+
+@coroutine(DEBUG)
+def asleep_send(sock, secs: float, data: bytes):
+    yield asleep(secs)
+    sock.send(data)
+
+
+def test_readable():
+    with WorkArea("test_readable") as work_area:
+        socket_pairs = [socket.socketpair() for _ in range(50)]
+        recv_tasks = [readable_recv(reader) for reader, _ in socket_pairs]
+        [asleep_send(writer, 0.05, str(i).encode()) for i, (_, writer) in enumerate(socket_pairs)]
+        socket_pairs.append(socket.socketpair())
+        timeout_task = readable_recv(socket_pairs[-1][0], 0.1)
+
+        CoroutineWorker(work_area=work_area).loop_work(forever=False)
+        assert [task.value for task in recv_tasks] == [str(i).encode() for i in range(50)]
+        # 超时的协程在yield处收到TimeoutError
+        assert timeout_task.task_state is TaskState.TaskDone and timeout_task.value is None
+        assert len(work_area.io_poller) == 0
+
+        # 被取消的协程不再登记在IOPoller中
+        cancel_task = readable_recv(socket_pairs[-1][0])
+        worker = CoroutineWorker(work_area=work_area)
+        while not work_area.parking:
+            worker.work_once(0)
+        assert len(work_area.io_poller) == 1 and cancel_task.cancel()
+        worker.loop_work(forever=False)
+        assert cancel_task.cancelled() and len(work_area.io_poller) == 0
+
+        for reader, writer in socket_pairs:
+            reader.close()
+            writer.close()
+
+
+@coroutine(DEBUG)
+def bounded_run(value):
+    yield
+    return value
+
+
+@coroutine(DEBUG)
+def bounded_producer(count: int):
+    tasks = []
+    for value in range(count):
+        tasks.append((yield admit(bounded_run, value)))
+    return (yield agather(tasks))
+
+
+def test_bounded_work_area():
+    with WorkArea("test_bounded_reject", capacity=2, overflow="reject") as work_area:
+        tasks = [bounded_run(value) for value in range(2)]
+        with pytest.raises(queue.Full):
+            bounded_run(2)
+        assert work_area.admission.rejected == 1
+        # 开始前被取消同样归还名额
+        tasks[0].cancel()
+        CoroutineWorker(work_area=work_area).loop_work(forever=False)
+        assert tasks[0].cancelled() and tasks[1].value == 1 and len(work_area.admission) == 0
+
+    with WorkArea("test_bounded_drop_oldest", capacity=2, overflow="drop_oldest") as work_area:
+        tasks = [bounded_run(value) for value in range(5)]
+        assert work_area.admission.dropped == 3 and len(work_area.admission) == 2
+        CoroutineWorker(work_area=work_area).loop_work(forever=False)
+        assert all(task.cancelled() and isinstance(task.value, queue.Full) for task in tasks[:3])
+        assert [task.value for task in tasks[3:]] == [3, 4]
+
+    with WorkArea("test_bounded_block", capacity=3) as work_area:
+        admission, tasks, pending = work_area.admission, [], []
+        for value in range(20):
+            # 名额已满时在当前线程中参与工作直到有空位
+            tasks.append(bounded_run(value))
+            pending.append(len(admission))
+        assert max(pending) == 3
+        CoroutineWorker(work_area=work_area).loop_work(forever=False)
+        assert [task.value for task in tasks] == list(range(20)) and len(admission) == 0
+
+        # 协程中挂起而不是阻塞
+        producer = bounded_producer(20)
+        CoroutineWorker(work_area=work_area).loop_work(forever=False)
+        assert producer.value == list(range(20))
+        assert len(admission) == 0 and not admission.waiters and not admission.blocked
+
+
+@coroutine(DEBUG)
+def blocking_run(secs: float):
+    # 阻塞线程的步骤，线程不足时队列中的内容会积压
+    time.sleep(secs)
+    yield
+    return secs
+
+
+def test_autoscale():
+    with WorkArea("test_autoscale") as work_area:
+        events = []
+        async_worker = AsyncWorker(work_area=work_area)
+        autoscaler = async_worker.autoscale(1, 4, backlog=4, interval=0.01, cool_down=0.1, on_scale=events.append)
+        assert autoscaler.threads == 1 and events[0].reason == "min_threads"
+
+        start = time.monotonic()
+        tasks = [blocking_run(0.02) for _ in range(40)]
+        assert gather(tasks, timeout=5) == [0.02] * 40
+        # 1个线程需要0.8秒
+        assert time.monotonic() - start < 0.6
+        grows = [event for event in events if event.action == "grow" and event.reason == "backlog"]
+        assert grows and max(event.threads for event in grows) == 4
+
+        deadline = time.monotonic() + 2
+        while autoscaler.threads > 1 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert autoscaler.threads == 1 and events[-1].action == "retire" and events[-1].reason == "idle"
+        assert list(autoscaler.events) == events
+
+        async_worker.stop(join=True, time_out=1)
+        assert not async_worker.thread_list and autoscaler.threads == 0
+
+        # 结束信号停止的线程不会被重新补足
+        async_worker = AsyncWorker(work_area=work_area)
+        autoscaler = async_worker.autoscale(1, 4, backlog=4, interval=0.01)
+        thread = async_worker.thread_list[0]
+        async_worker.submit_thread_stop_flag()
+        thread.join(1)
+        time.sleep(0.05)
+        assert not thread.is_alive() and autoscaler.threads == 0 and not async_worker.thread_list
+        autoscaler.controller.join(1)
+        assert not autoscaler.controller.is_alive()
+        async_worker.stop(join=True, time_out=1)
+
+
+CACHED_CALLS = []
+
+
+@cached_coroutine(DEBUG, maxsize=2, ttl=0.2)
+def cached_lookup(key: int):
+    CACHED_CALLS.append(key)
+    yield asleep(0.01)
+    return key * 10
+
+
+@coroutine(DEBUG)
+def cached_caller(key: int):
+    return (yield cached_lookup.acall(key))
+
+
+def test_cached_coroutine():
+    with WorkArea("test_cached_coroutine") as work_area:
+        # 执行中的相同调用共用同一个Task
+        tasks = [cached_lookup(1) for _ in range(50)]
+        callers = [cached_caller(1) for _ in range(50)]
+        assert all(task is tasks[0] for task in tasks)
+        CoroutineWorker(work_area=work_area).loop_work(forever=False)
+        assert [task.value for task in callers] == [10] * 50 and CACHED_CALLS == [1]
+        info = cached_lookup.cache_info()
+        assert (info.hits, info.misses, info.coalesced, info.currsize, info.inflight) == (0, 1, 99, 1, 0)
+
+        # 完成后命中缓存，超过maxsize时淘汰最久未使用的
+        assert cached_lookup(1) is tasks[0] and cached_lookup.cache_info().hits == 1
+        gather([cached_lookup(2), cached_lookup(3)])
+        assert cached_lookup.cache_info().currsize == 2
+        assert wait(cached_lookup(1)) == 10 and CACHED_CALLS == [1, 2, 3, 1]
+
+        # 超过ttl后重新执行
+        time.sleep(0.2)
+        assert wait(cached_lookup(3)) == 30 and CACHED_CALLS == [1, 2, 3, 1, 3]
+
+        # 被取消的Task不会被缓存
+        task = cached_lookup(4)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            wait(task)
+        assert wait(cached_lookup(4)) == 40 and CACHED_CALLS == [1, 2, 3, 1, 3, 4]
+
+        cached_lookup.cache_clear()
+        assert cached_lookup.cache_info() == (0, 0, 0, 2, 0, 0)
+
+
+@coroutine(DEBUG)
+def channel_producer(channel, count: int, peak: list):
+    for item in range(count):
+        yield channel.put(item)
+        peak.append(len(channel))
+    channel.close()
+
+
+@coroutine(DEBUG)
+def channel_consumer(channel):
+    items = []
+    while True:
+        try:
+            items.append((yield channel.get()))
+        except ChannelClosed:
+            return items
+
+
+def test_channel():
+    with WorkArea("test_channel") as work_area:
+        metrics = work_area.enable_metrics()
+        channel, peak = Channel(2), []
+        consumers = [channel_consumer(channel) for _ in range(3)]
+        producer = channel_producer(channel, 100, peak)
+        CoroutineWorker(work_area=work_area).loop_work(forever=False)
+        assert sorted(sum((task.value for task in consumers), [])) == list(range(100))
+        assert max(peak) <= 2 and producer.task_state is TaskState.TaskDone
+        # 每次放入与取出只需要挂起与唤醒两步，不会轮询
+        assert metrics.steps <= 2 * (100 + 100 + 3) + 10
+
+        # 线程中迭代，协程放入
+        channel = Channel(0)
+        producer = channel_producer(channel, 20, [])
+        assert list(channel) == list(range(20)) and producer.task_state is TaskState.TaskDone
+        with pytest.raises(ChannelClosed):
+            channel.put_nowait(1)
+
+        # 线程中放入，协程取出
+        channel = Channel(1)
+        consumer = channel_consumer(channel)
+        for item in range(10):
+            channel.put_wait(item)
+        channel.close()
+        assert wait(consumer) == list(range(10))
+
+        channel = Channel(1)
+        channel.put_nowait(0)
+        with pytest.raises(queue.Full):
+            channel.put_nowait(1)
+        with pytest.raises(TimeoutError):
+            channel.put_wait(1, timeout=0.01)
+        assert channel.get_nowait() == 0 and len(channel.putters) == 0
+        with pytest.raises(queue.Empty):
+            channel.get_nowait()
+        with pytest.raises(TimeoutError):
+            channel.get_wait(timeout=0.01)
+
+        # 被取消的取出者不会取走内容
+        consumers = [channel_consumer(channel) for _ in range(2)]
+        coroutine_worker = CoroutineWorker(work_area=work_area)
+        for _ in range(4):
+            coroutine_worker.work_once(0)
+        assert len(channel.getters) == 2
+        consumers[0].cancel()
+        channel.put_nowait("item")
+        channel.close()
+        coroutine_worker.loop_work(forever=False)
+        assert consumers[0].cancelled() and consumers[1].value == ["item"]
+
+
+@coroutine(DEBUG)
+def mapped_run(value: int, in_flight: list):
+    in_flight.append(value)
+    yield asleep(0.001 * (value % 3))
+    in_flight.remove(value)
+    return value * 2
+
+
+def test_map():
+    with WorkArea("test_map"):
+        # 惰性的取出，同时存在的Task不超过concurrency
+        in_flight, pulled, peak = [], [], []
+
+        def records(count):
+            for value in range(count):
+                pulled.append(value)
+                peak.append(len(in_flight))
+                yield value
+
+        results = consign.map(functools.partial(mapped_run, in_flight=in_flight), records(200), concurrency=5)
+        assert next(results) == 0 and len(pulled) <= 6
+        assert [0] + list(results) == [value * 2 for value in range(200)] and max(peak) <= 5
+
+        assert sorted(imap_unordered(lambda value: mapped_run(value, []), range(100), concurrency=7)) == \
+            [value * 2 for value in range(100)]
+
+        # chunksize大于1时在同一个Task中处理，普通函数同样可以使用
+        assert list(consign.map(yield_return, range(50), concurrency=2, chunksize=8)) == list(range(50))
+        assert list(consign.map(lambda value: value + 1, range(50), chunksize=8)) == list(range(1, 51))
+
+        # 提前结束时取消剩余的Task
+        results = consign.map(functools.partial(mapped_run, in_flight=in_flight), range(100), concurrency=4)
+        assert next(results) == 0
+        results.close()
+        with pytest.raises(StopIteration):
+            next(results)
+
+    # 与内置函数同名的map不会被 from consign import * 导入
+    namespace = {}
+    exec("from consign import *", namespace)
+    assert "map" not in namespace and namespace["imap_unordered"] is imap_unordered